@@ -0,0 +1,101 @@
+"""
+Shared helpers for the adminserver benchmarks.
+
+Run benchmarks from the adminserver directory (with the usual KEYS_DIR / key paths exported), i.e.
+    python -m benchmarks.bench_login
+`configure()` points DATABASE_URI at a throw-away SQLite file, so it must run before anything from `src` is imported.
+"""
+import os
+import json
+import time
+import tempfile
+import statistics
+
+
+def configure(db_path: str = None) -> str:
+    db_path = db_path or os.path.join(tempfile.mkdtemp(prefix="adminserver-bench-"), "bench.db")
+    os.environ["DATABASE_URI"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    return db_path
+
+
+def quiet():
+    """
+    Silence SQL echo and request logging so they don't dominate the measurements.
+    """
+    import logging
+    from src import db
+    db.engine.echo = False
+    for name in ("quart.app", "quart.serving", "src", "sqlalchemy.engine"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float], elapsed: float = None) -> dict:
+    """
+    Latency summary (in milliseconds) of samples given in seconds.
+    """
+    result = {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
+    if elapsed:
+        result["per_sec"] = round(len(samples) / elapsed, 1)
+    return result
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def report(name: str, **results):
+    print(json.dumps({"benchmark": name, **results}, indent=2, default=str))
+
+
+async def seed(users: int = 10, accounts: int = 1, password: str = "benchmark", hash_method: str = None) -> dict:
+    """
+    Create the schema and a small tenant: `accounts` accounts, one admin role, and `users` users granted that role
+    on every account. Every user shares one pre-computed password hash.
+    :param hash_method: werkzeug hash method of that hash; werkzeug's default (as in production) if not given.
+    :return: Dict with the user names, account IDs and the shared password.
+    """
+    from werkzeug.security import generate_password_hash
+    from src.db import setup_db, get_session
+    from src.models.models import Account, Grant, Permission, Role, User
+
+    await setup_db()
+    password_hash = generate_password_hash(password, **({"method": hash_method} if hash_method else {}))
+    async with get_session() as session:
+        read = Permission(name="account.read", display_name="Account Read", scope="read")
+        write = Permission(name="account.write", display_name="Account Write", scope="write")
+        role = Role(name="account.admin", display_name="Account Admin", permissions=[read, write])
+        account_rows = [Account(name=f"bench-account-{i}", display_name=f"Bench Account {i}") for i in range(accounts)]
+        session.add_all([read, write, role, *account_rows])
+        user_rows = []
+        for i in range(users):
+            user = User(name=f"bench-user-{i}", password=None, email=f"bench-user-{i}@local.host",
+                        password_hash=password_hash)
+            user_rows.append(user)
+            session.add_all([user, *(Grant(user=user, role=role, account=account) for account in account_rows)])
+        await session.commit()
+        return {
+            "users": [user.name for user in user_rows],
+            "accounts": [account.id for account in account_rows],
+            "password": password
+        }
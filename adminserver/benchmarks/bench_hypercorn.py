@@ -0,0 +1,98 @@
+"""
+Throughput of /api/v1/liveness and an authenticated /api/v1/user/me under Hypercorn, with lazy per-request DB
+sessions (the default) and with a session eagerly opened for every request (the previous behaviour).
+The server runs in a separate process; the load generator uses httpx.
+
+    python -m benchmarks.bench_hypercorn [--requests 2000] [--concurrency 20] [--port 8089]
+"""
+import time
+import asyncio
+import argparse
+import multiprocessing
+import httpx
+from benchmarks._common import configure, seed, summarize, report, Timer
+
+
+def serve(port: int, eager: bool):
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+    from quart import g
+    from benchmarks._common import quiet
+    from src.app import create_app
+
+    app = create_app()
+    quiet()
+    if eager:
+        @app.before_request
+        async def open_session():
+            g.db_session  # touch it, as create_app used to for every request
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.accesslog = None
+    config.errorlog = None
+    asyncio.run(hypercorn_serve(app, config))
+
+
+async def wait_until_up(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            await client.get("/api/v1/liveness")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def measure(client, path: str, headers: dict, requests: int, concurrency: int) -> dict:
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            with Timer() as timer:
+                response = await client.get(path, headers=headers)
+            response.raise_for_status()
+            samples.append(timer.elapsed)
+
+    with Timer() as timer:
+        await asyncio.gather(*(call() for _ in range(requests)))
+    return summarize(samples, timer.elapsed)
+
+
+async def run_mode(args, eager: bool, tenant: dict) -> dict:
+    server = multiprocessing.get_context("spawn").Process(target=serve, args=(args.port, eager))
+    server.start()
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits) as client:
+            await wait_until_up(client)
+            response = await client.post("/auth/login", json={"username": tenant["users"][0],
+                                                              "password": tenant["password"]})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            return {
+                "liveness": await measure(client, "/api/v1/liveness", {}, args.requests, args.concurrency),
+                "user_me": await measure(client, "/api/v1/user/me", headers, args.requests, args.concurrency),
+            }
+    finally:
+        server.terminate()
+        server.join()
+        time.sleep(0.5)
+
+
+async def main(args):
+    configure()
+    tenant = await seed(users=1)
+    results = {
+        "lazy_session": await run_mode(args, False, tenant),
+        "eager_session": await run_mode(args, True, tenant),
+    }
+    report("hypercorn", requests=args.requests, concurrency=args.concurrency, **results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8089)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""
+/auth/login latency, and /api/v1/user/me latency while `--logins` logins are in flight, with password hashing run
+inline on the event loop vs in the password hashing process pool.
+
+    python -m benchmarks.bench_login [--logins 200] [--workers 4]
+"""
+import time
+import asyncio
+import argparse
+from benchmarks._common import configure, quiet, seed, summarize, report, Timer
+
+
+async def measure(app, tenant, logins: int) -> dict:
+    login_samples, me_samples = [], []
+    async with app.test_app() as test_app:
+        client = test_app.test_client()
+        response = await client.post("/auth/login", json={"username": tenant["users"][0],
+                                                          "password": tenant["password"]})
+        headers = {"Authorization": f"Bearer {(await response.get_json())['access_token']}"}
+
+        async def login(i):
+            start = time.perf_counter()
+            response = await client.post("/auth/login", json={"username": tenant["users"][i % len(tenant["users"])],
+                                                              "password": tenant["password"]})
+            login_samples.append(time.perf_counter() - start)
+            return response.status_code
+
+        async def poll_me(done: asyncio.Event):
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/api/v1/user/me", headers=headers)
+                me_samples.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        done = asyncio.Event()
+        poller = asyncio.create_task(poll_me(done))
+        with Timer() as timer:
+            statuses = await asyncio.gather(*(login(i) for i in range(logins)))
+        done.set()
+        await poller
+    return {
+        "statuses": {str(code): statuses.count(code) for code in set(statuses)},
+        "login": summarize(login_samples, timer.elapsed),
+        "user_me_during_logins": summarize(me_samples),
+    }
+
+
+async def main(args):
+    configure()
+    from src.app import create_app
+    from src.services.hashing import password_hasher
+
+    app = create_app()
+    quiet()
+    tenant = await seed(users=50)
+    password_hasher.max_pending = max(password_hasher.max_pending, args.logins)
+
+    results = {}
+    for mode, workers in (("inline", 0), ("process_pool", args.workers)):
+        password_hasher.workers = workers
+        results[mode] = await measure(app, tenant, args.logins)
+        password_hasher.shutdown()
+    report("login_hashing", logins=args.logins, workers=args.workers, **results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
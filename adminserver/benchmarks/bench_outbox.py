@@ -0,0 +1,80 @@
+"""
+Email delivery throughput: one SMTP connection per message (the previous ship_email behaviour) versus the outbox
+worker with pooled connections, against a simulated SMTP server with `--connect-ms` handshake + login latency and
+`--send-ms` per message. Also reports the enqueue latency a request now waits for.
+
+    python -m benchmarks.bench_outbox [--messages 500] [--connect-ms 150] [--send-ms 10] [--pool-sizes 1,2,4]
+"""
+import time
+import asyncio
+import argparse
+from email.message import EmailMessage
+from benchmarks._common import configure, quiet, summarize, report, Timer
+
+
+class SimulatedSMTP:
+    def __init__(self, connect_s: float, send_s: float):
+        self.send_s = send_s
+        time.sleep(connect_s)
+
+    def sendmail(self, sender, recipient, message):
+        time.sleep(self.send_s)
+
+    def quit(self):
+        pass
+
+
+def make_message(i: int) -> EmailMessage:
+    message = EmailMessage()
+    message["To"] = f"user{i}@example.com"
+    message["Subject"] = "Validate your email"
+    message.set_content("Follow the link to validate your email address. " * 20)
+    return message
+
+
+async def main(args):
+    configure()
+    from src.db import setup_db
+    from src.services.outbox import OutboxWorker, SMTPConnectionPool
+    quiet()
+    await setup_db()
+    connect_s, send_s = args.connect_ms / 1000, args.send_ms / 1000
+
+    def per_message_send():
+        SimulatedSMTP(connect_s, send_s).sendmail("admin@test.dev", "user@example.com", "")
+
+    # Previous behaviour, sequential as each request did it; sampled, since it is slow by design
+    sample = min(args.messages, 50)
+    with Timer() as timer:
+        for _ in range(sample):
+            await asyncio.to_thread(per_message_send)
+    results = {"connection_per_message": {"messages": sample, "per_sec": round(sample / timer.elapsed, 1)}}
+
+    for size in args.pool_sizes:
+        pool = SMTPConnectionPool(lambda: SimulatedSMTP(connect_s, send_s), size=size)
+        worker = OutboxWorker(pool=pool, batch_size=args.batch_size)
+        enqueue_samples = []
+        for i in range(args.messages):
+            with Timer() as timer:
+                await worker.enqueue(make_message(i), f"user{i}@example.com")
+            enqueue_samples.append(timer.elapsed)
+        with Timer() as timer:
+            delivered = await worker.drain()
+        results[f"outbox_pool_{size}"] = {
+            "messages": delivered,
+            "per_sec": round(delivered / timer.elapsed, 1),
+            "smtp_connects": pool.connects,
+            "enqueue": summarize(enqueue_samples),
+        }
+        await worker.stop()
+    report("outbox", connect_ms=args.connect_ms, send_ms=args.send_ms, batch_size=args.batch_size, **results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--connect-ms", type=float, default=150)
+    parser.add_argument("--send-ms", type=float, default=10)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--pool-sizes", type=lambda value: [int(size) for size in value.split(",")], default=[1, 2, 4])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,59 @@
+"""
+Access-token size, signing/verification time and permission-check time for the full, compact and active permission
+claim formats, for an operator with `--accounts` accounts.
+
+    python -m benchmarks.bench_permission_claims [--accounts 300] [--permissions 12] [--iterations 2000]
+"""
+import random
+import asyncio
+import argparse
+from benchmarks._common import configure, report, Timer
+
+
+def operator_permissions(accounts: int, permissions: int) -> dict:
+    rng = random.Random(42)
+    names = [f"resource{i // 4}.{('read', 'write', 'delete', 'admin')[i % 4]}" for i in range(permissions)]
+    return {
+        f"{rng.getrandbits(128):032x}": sorted(rng.sample(names, rng.randint(1, permissions)))
+        for _ in range(accounts)
+    }
+
+
+async def main(args):
+    configure()
+    from src.services.auth_manager import auth_manager
+    from src.services.permission_claims import encode_permissions, has_any_permission, FORMATS
+
+    permissions = operator_permissions(args.accounts, args.permissions)
+    account_id = next(iter(permissions))
+    required = ("resource0.write", "resource1.admin")
+    identity = {"sub": "operator", "username": "operator", "account_id": account_id}
+    auth_manager.token_cache.enabled = False
+
+    results = {}
+    for fmt in FORMATS:
+        with Timer() as encode_timer:
+            for _ in range(args.iterations):
+                claims = {**identity, **encode_permissions(permissions, fmt, account_id)}
+        token = auth_manager.create_access_token(claims)
+        with Timer() as verify_timer:
+            for _ in range(args.iterations):
+                payload = auth_manager.verify_token(token)
+        with Timer() as check_timer:
+            for _ in range(args.iterations):
+                has_any_permission(payload, account_id, required)
+        results[fmt] = {
+            "token_bytes": len(token),
+            "encode_claims_us": round(encode_timer.elapsed / args.iterations * 1e6, 2),
+            "verify_token_us": round(verify_timer.elapsed / args.iterations * 1e6, 2),
+            "permission_check_us": round(check_timer.elapsed / args.iterations * 1e6, 3),
+        }
+    report("permission_claims", accounts=args.accounts, permissions=args.permissions, **results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=300)
+    parser.add_argument("--permissions", type=int, default=12)
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
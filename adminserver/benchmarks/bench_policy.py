@@ -0,0 +1,68 @@
+"""
+Authorization decision rate of the compiled policy (src/services/policy.py) against the direct claim check it replaces,
+for tokens in the full and compact permission claim formats, plus the time to compile a policy document.
+
+    python -m benchmarks.bench_policy [--accounts 300] [--permissions 48] [--rules 200] [--iterations 100000]
+"""
+import random
+import asyncio
+import argparse
+from benchmarks._common import configure, report, Timer
+from benchmarks.bench_permission_claims import operator_permissions
+
+
+def policy_document(permissions: int, rules: int) -> dict:
+    rng = random.Random(7)
+    names = [f"resource{i // 4}.{('read', 'write', 'delete', 'admin')[i % 4]}" for i in range(permissions)]
+    roles = {f"role{i}": sorted(rng.sample(names, 4)) for i in range(8)}
+    return {
+        "permissions": names,
+        "roles": roles,
+        "rules": [
+            {"service": "adminserver", "method": ("GET", "POST", "PUT", "DELETE")[i % 4],
+             "path": f"/api/v1/resource{i // 4}", "permissions": rng.sample(names, 2) + [f"role:{rng.choice(list(roles))}"]}
+            for i in range(rules)
+        ],
+    }
+
+
+async def main(args):
+    configure()
+    from src.services.policy import Policy
+    from src.services.permission_claims import encode_permissions, has_any_permission, FULL, COMPACT
+
+    document = policy_document(args.permissions, args.rules)
+    with Timer() as compile_timer:
+        policy = Policy(document, "adminserver")
+    permissions = operator_permissions(args.accounts, args.permissions)
+    account_id = next(iter(permissions))
+    rule = document["rules"][-1]
+    required = tuple(name for name in rule["permissions"] if not name.startswith("role:"))
+
+    results = {"compile_ms": round(compile_timer.elapsed * 1000, 3)}
+    for fmt in (FULL, COMPACT):
+        claims = encode_permissions(permissions, fmt, account_id)
+        with Timer() as direct_timer:
+            for _ in range(args.iterations):
+                has_any_permission(claims, account_id, required)
+        with Timer() as rule_timer:
+            for _ in range(args.iterations):
+                policy.allows(claims, account_id, rule["method"], rule["path"])
+        with Timer() as default_timer:
+            for _ in range(args.iterations):
+                policy.allows(claims, account_id, "GET", "/api/v1/unruled", required)
+        results[fmt] = {
+            "direct_check_per_s": round(args.iterations / direct_timer.elapsed),
+            "policy_rule_per_s": round(args.iterations / rule_timer.elapsed),
+            "policy_default_per_s": round(args.iterations / default_timer.elapsed),
+        }
+    report("policy", accounts=args.accounts, permissions=args.permissions, rules=args.rules, **results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=300)
+    parser.add_argument("--permissions", type=int, default=48)
+    parser.add_argument("--rules", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=100000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,67 @@
+"""
+Serializing role lists of 1k / 10k / 100k rows: awaiting `to_dict` per row (sequentially and via asyncio.gather)
+and encoding with Quart's jsonify, versus the synchronous serializers encoded straight to bytes with `dumps`.
+
+    python -m benchmarks.bench_serializers [--sizes 1000,10000,100000] [--repeat 3]
+"""
+import asyncio
+import argparse
+import datetime
+from benchmarks._common import configure, quiet, report, Timer
+
+
+def make_roles(count: int):
+    from src.models.models import Permission, Role
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    permissions = [Permission(name=f"resource.{scope}", scope=scope, created_date=now, modified_date=now)
+                   for scope in ("read", "write", "delete")]
+    return [Role(id=f"{i:036d}", name=f"role-{i}", display_name=f"Role {i}", active=True,
+                 created_date=now, modified_date=now, permissions=permissions) for i in range(count)]
+
+
+async def best_of(repeat: int, func) -> float:
+    times = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            await func()
+        times.append(timer.elapsed)
+    return round(min(times) * 1000, 2)
+
+
+async def main(args):
+    configure()
+    from quart import jsonify
+    from src.app import create_app
+    from src.services.serializers import role_dict, json_response, orjson
+
+    app = create_app()
+    quiet()
+    results = {}
+    async with app.app_context():
+        for size in args.sizes:
+            roles = make_roles(size)
+
+            async def sequential():
+                await jsonify([await role.to_dict() for role in roles]).get_data()
+
+            async def gathered():
+                await jsonify(await asyncio.gather(*(role.to_dict() for role in roles))).get_data()
+
+            async def synchronous():
+                await json_response([role_dict(role) for role in roles]).get_data()
+
+            results[f"rows_{size}"] = {
+                "to_dict_sequential_jsonify_ms": await best_of(args.repeat, sequential),
+                "to_dict_gather_jsonify_ms": await best_of(args.repeat, gathered),
+                "serializer_dumps_ms": await best_of(args.repeat, synchronous),
+                "body_bytes": len(await json_response([role_dict(role) for role in roles]).get_data()),
+            }
+    report("serializers", encoder="orjson" if orjson else "json", **results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,59 @@
+"""
+Requests/sec on /api/v1/user/me with the verified-token cache on and off, plus raw verify_token throughput.
+
+    python -m benchmarks.bench_token_cache [--requests 2000] [--concurrency 20]
+"""
+import asyncio
+import argparse
+from benchmarks._common import configure, quiet, seed, summarize, report, Timer
+
+
+async def measure(client, headers, requests: int, concurrency: int) -> dict:
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            with Timer() as timer:
+                await client.get("/api/v1/user/me", headers=headers)
+            samples.append(timer.elapsed)
+
+    with Timer() as timer:
+        await asyncio.gather(*(call() for _ in range(requests)))
+    return summarize(samples, timer.elapsed)
+
+
+async def main(args):
+    configure()
+    from src.app import create_app
+    from src.services.auth_manager import auth_manager
+
+    app = create_app()
+    quiet()
+    tenant = await seed(users=1)
+    results = {}
+    async with app.test_app() as test_app:
+        client = test_app.test_client()
+        response = await client.post("/auth/login", json={"username": tenant["users"][0],
+                                                          "password": tenant["password"]})
+        token = (await response.get_json())["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for enabled in (False, True):
+            auth_manager.token_cache.enabled = enabled
+            auth_manager.token_cache.clear()
+            label = "cache_on" if enabled else "cache_off"
+            with Timer() as timer:
+                for _ in range(args.requests):
+                    auth_manager.verify_token(token)
+            results[f"verify_token_{label}_per_sec"] = round(args.requests / timer.elapsed, 1)
+            results[f"user_me_{label}"] = await measure(client, headers, args.requests, args.concurrency)
+        results["cache_stats"] = auth_manager.token_cache.stats()
+    report("token_cache", requests=args.requests, concurrency=args.concurrency, **results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,65 @@
+"""
+Token issuance microbenchmark: tokens/sec signing with the raw PEM on every call (the old behaviour) vs the
+pre-parsed key, and login-style access+refresh pairs created on the event loop vs via `create_token_pair`.
+
+    python -m benchmarks.bench_tokens [--tokens 2000] [--concurrency 50]
+"""
+import asyncio
+import argparse
+import jwt
+from benchmarks._common import configure, report, Timer
+
+
+def claims(i: int) -> dict:
+    return {
+        "sub": f"user-{i}",
+        "username": f"bench-user-{i}",
+        "account_id": "bench-account",
+        "permissions": {"bench-account": ["account.read", "account.write"]}
+    }
+
+
+async def main(args):
+    configure()
+    import config as cfg
+    from src.services.auth_manager import auth_manager
+
+    results = {}
+    # Parsing the PEM dominates, so a smaller sample is plenty for the baseline
+    raw_tokens = min(args.tokens, 200)
+    with Timer() as timer:
+        for i in range(raw_tokens):
+            payload = auth_manager._build_payload(claims(i), auth_manager.access_token_expiry, "access")
+            jwt.encode(payload, cfg.PRIVATE_KEY, algorithm=auth_manager.key_algorithm)
+    results["raw_pem_tokens_per_sec"] = round(raw_tokens / timer.elapsed, 1)
+
+    with Timer() as timer:
+        for i in range(args.tokens):
+            auth_manager.create_access_token(claims(i))
+    results["parsed_key_tokens_per_sec"] = round(args.tokens / timer.elapsed, 1)
+
+    pairs = args.tokens // 2
+    with Timer() as timer:
+        for i in range(pairs):
+            auth_manager.create_access_token(claims(i))
+            auth_manager.create_refresh_token(claims(i))
+    results["pairs_on_loop_per_sec"] = round(pairs / timer.elapsed, 1)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def pair(i):
+        async with semaphore:
+            return await auth_manager.create_token_pair(claims(i))
+
+    with Timer() as timer:
+        await asyncio.gather(*(pair(i) for i in range(pairs)))
+    results["pairs_via_executor_per_sec"] = round(pairs / timer.elapsed, 1)
+
+    report("token_signing", tokens=args.tokens, concurrency=args.concurrency, **results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
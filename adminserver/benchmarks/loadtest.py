@@ -0,0 +1,328 @@
+"""
+Load test of the adminserver auth and profile flows against a seeded SQLite database.
+
+Virtual users log in once, then loop over a weighted mix of flows until `--duration` has passed:
+    login           POST /auth/login
+    refresh         POST /auth/refresh (rotating the refresh token)
+    switch_account  POST /auth/switch_account to another of the user's accounts
+    me              GET  /api/v1/user/me
+    account_users   GET  /api/v1/account/user?limit=50
+
+`--mode inprocess` drives the Quart app through its test client on the load generator's event loop, so the event-loop
+lag is the app's own. `--mode hypercorn` serves the app with Hypercorn in a separate process on localhost; the lag is
+then measured inside the server process (and the load generator's own lag is reported to spot a saturated client).
+
+The report (JSON, also written to `--output`) has throughput and p50/p95/p99 latency per flow and overall, status
+counts, event-loop lag, the parameters and the git commit, so runs can be compared across commits.
+
+    python -m benchmarks.loadtest [--mode inprocess|hypercorn] [--duration 30] [--concurrency 20] [--users 200]
+                                  [--accounts 3] [--mix me=10,account_users=4,refresh=3,switch_account=2,login=1]
+                                  [--hash-method pbkdf2:sha256:600000] [--output loadtest.json]
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import multiprocessing
+from http.cookies import SimpleCookie
+from collections import Counter, defaultdict
+from benchmarks._common import configure, quiet, seed, summarize, report, Timer
+
+FLOWS = ("login", "refresh", "switch_account", "me", "account_users")
+DEFAULT_MIX = "me=10,account_users=4,refresh=3,switch_account=2,login=1"
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a task that sleeps `interval` seconds wakes up.
+    """
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[tuple[float, float]] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append((time.time(), max(0.0, loop.time() - expected)))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def summary(self, start: float = 0.0, end: float = float("inf")) -> dict:
+        return summarize([lag for at, lag in self.samples if start <= at <= end])
+
+
+def _refresh_cookie(set_cookie_headers) -> str | None:
+    for header in set_cookie_headers:
+        cookie = SimpleCookie()
+        cookie.load(header)
+        if "refresh_token" in cookie:
+            return cookie["refresh_token"].value or None
+    return None
+
+
+class QuartTransport:
+    """Requests through the Quart test client (no cookie jar: the refresh token is sent explicitly)."""
+    def __init__(self, app):
+        self.client = app.test_client(use_cookies=False)
+
+    async def request(self, method: str, path: str, headers: dict = None, json: dict = None):
+        response = await self.client.open(path, method=method, headers=headers or {}, json=json)
+        body = await response.get_json(silent=True) if response.mimetype == "application/json" else None
+        return response.status_code, body, _refresh_cookie(response.headers.getlist("Set-Cookie"))
+
+    async def close(self):
+        pass
+
+
+class HttpTransport:
+    """Requests over HTTP with httpx, one connection per virtual user."""
+    def __init__(self, base_url: str):
+        import httpx
+        self.client = httpx.AsyncClient(base_url=base_url, limits=httpx.Limits(max_connections=1), timeout=60)
+
+    async def request(self, method: str, path: str, headers: dict = None, json: dict = None):
+        response = await self.client.request(method, path, headers=headers, json=json)
+        self.client.cookies.clear()
+        body = response.json() if response.headers.get("content-type", "").startswith("application/json") else None
+        return response.status_code, body, _refresh_cookie(response.headers.get_list("set-cookie"))
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class VirtualUser:
+    def __init__(self, transport, username: str, password: str, accounts: list[str], rng: random.Random):
+        self.transport = transport
+        self.username = username
+        self.password = password
+        self.accounts = accounts
+        self.rng = rng
+        self.access_token = None
+        self.refresh_token = None
+        self.account_id = accounts[0]
+
+    @property
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+    async def login(self) -> int:
+        status, body, refresh_token = await self.transport.request(
+            "POST", "/auth/login",
+            json={"username": self.username, "password": self.password, "account": self.account_id}
+        )
+        if status == 200:
+            self.access_token, self.refresh_token = body["access_token"], refresh_token
+        return status
+
+    async def refresh(self) -> int:
+        status, body, refresh_token = await self.transport.request(
+            "POST", "/auth/refresh", headers={"Cookie": f"refresh_token={self.refresh_token}"}
+        )
+        if status == 200:
+            self.access_token, self.refresh_token = body["access_token"], refresh_token
+        return status
+
+    async def switch_account(self) -> int:
+        others = [account for account in self.accounts if account != self.account_id] or self.accounts
+        account_id = self.rng.choice(others)
+        status, body, _ = await self.transport.request(
+            "POST", "/auth/switch_account", headers=self.auth,
+            json={"account_id": account_id, "request_id": f"{self.rng.getrandbits(64):016x}", "client_version": "load"}
+        )
+        if status == 200:
+            self.access_token, self.account_id = body["access_token"], account_id
+        return status
+
+    async def me(self) -> int:
+        return (await self.transport.request("GET", "/api/v1/user/me", headers=self.auth))[0]
+
+    async def account_users(self) -> int:
+        return (await self.transport.request("GET", "/api/v1/account/user?limit=50", headers=self.auth))[0]
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in FLOWS:
+            raise argparse.ArgumentTypeError(f"Unknown flow {name!r}; expected one of {', '.join(FLOWS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+async def run_load(make_transport, tenant: dict, args) -> dict:
+    """
+    Run the virtual users until the deadline.
+    :return: Results per flow, overall, and the wall-clock window of the run.
+    """
+    weights = parse_mix(args.mix)
+    flows, flow_weights = list(weights), list(weights.values())
+    samples = defaultdict(list)
+    statuses = defaultdict(Counter)
+    errors = Counter()
+
+    async def virtual_user(i: int, deadline: float):
+        rng = random.Random(args.seed * 1000003 + i)
+        transport = make_transport()
+        user = VirtualUser(transport, tenant["users"][i % len(tenant["users"])], tenant["password"],
+                           tenant["accounts"], rng)
+        try:
+            await user.login()
+            while time.perf_counter() < deadline:
+                flow = rng.choices(flows, flow_weights)[0]
+                start = time.perf_counter()
+                try:
+                    status = await getattr(user, flow)()
+                except Exception as exc:
+                    errors[f"{flow}:{type(exc).__name__}"] += 1
+                    continue
+                samples[flow].append(time.perf_counter() - start)
+                statuses[flow][status] += 1
+                if status == 401 and flow != "login":
+                    await user.login()
+        finally:
+            await transport.close()
+
+    started = time.time()
+    with Timer() as timer:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(virtual_user(i, deadline) for i in range(args.concurrency)))
+    every = [sample for flow in flows for sample in samples[flow]]
+    return {
+        "window": (started, time.time()),
+        "overall": summarize(every, timer.elapsed),
+        "flows": {
+            flow: {**summarize(samples[flow], timer.elapsed),
+                   "statuses": {str(code): count for code, count in sorted(statuses[flow].items())}}
+            for flow in flows
+        },
+        "errors": dict(errors),
+    }
+
+
+async def run_inprocess(tenant: dict, args) -> dict:
+    from src.app import create_app
+    app = create_app()
+    quiet()
+    lag = LoopLagMonitor()
+    async with app.test_app() as test_app:
+        lag.start()
+        results = await run_load(lambda: QuartTransport(test_app.app), tenant, args)
+        lag.stop()
+    results["event_loop_lag"] = lag.summary(*results.pop("window"))
+    return results
+
+
+def serve(port: int, stop, commands, lag_results):
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+    from src.app import create_app
+
+    app = create_app()
+    quiet()
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.accesslog = None
+    config.errorlog = None
+
+    async def main():
+        lag = LoopLagMonitor()
+        lag.start()
+
+        async def shutdown_trigger():
+            while not stop.is_set():
+                await asyncio.sleep(0.1)
+
+        await hypercorn_serve(app, config, shutdown_trigger=shutdown_trigger)
+        lag.stop()
+        lag_results.put(lag.summary(*commands.get()))
+
+    asyncio.run(main())
+
+
+async def run_hypercorn(tenant: dict, args) -> dict:
+    import httpx
+    context = multiprocessing.get_context("spawn")
+    stop, commands, lag_results = context.Event(), context.Queue(), context.Queue()
+    server = context.Process(target=serve, args=(args.port, stop, commands, lag_results))
+    server.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as probe:
+            for _ in range(100):
+                try:
+                    await probe.get("/api/v1/liveness")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("server did not start")
+        client_lag = LoopLagMonitor()
+        client_lag.start()
+        results = await run_load(lambda: HttpTransport(base_url), tenant, args)
+        client_lag.stop()
+        window = results.pop("window")
+        commands.put(window)
+        stop.set()
+        results["event_loop_lag"] = lag_results.get(timeout=30)
+        results["client_event_loop_lag"] = client_lag.summary(*window)
+    finally:
+        stop.set()
+        server.join(timeout=10)
+        if server.is_alive():
+            server.terminate()
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    parse_mix(args.mix)
+    configure(args.db)
+    tenant = await seed(users=args.users, accounts=args.accounts, hash_method=args.hash_method)
+    started = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    runner = run_inprocess if args.mode == "inprocess" else run_hypercorn
+    results = {
+        "commit": git_commit(),
+        "started": started,
+        "parameters": {key: getattr(args, key) for key in
+                       ("mode", "duration", "concurrency", "users", "accounts", "mix", "hash_method", "seed")},
+        **await runner(tenant, args),
+    }
+    report("loadtest", **results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "loadtest", **results}, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("inprocess", "hypercorn"), default="inprocess")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Flow weights, name=weight,...")
+    parser.add_argument("--hash-method", default=None,
+                        help="werkzeug method for the seeded password hashes (default: werkzeug's, as in production)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the virtual users")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--db", default=None, help="SQLite file to seed (default: a temporary file)")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -13,23 +13,90 @@ SECURITY_PASSWORD_SALT = os.getenv("APP_PASSWORD_SALT", secrets.SystemRandom().g
 ENCRYPT_ALGORITHM = "RS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_MINUTES = 10080
+JWT_SIGNING_WORKERS = int(os.getenv("JWT_SIGNING_WORKERS", 2))
+# Permission claim format in access tokens: full | compact | active (see src/services/permission_claims.py)
+TOKEN_PERMISSION_FORMAT = os.getenv("TOKEN_PERMISSION_FORMAT", "full").lower()
 CORS_ORIGIN = (os.getenv("CORS_ORIGIN", "http://localhost:3000"))
 
+# Password hashing pool (0 workers hashes inline on the event loop)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(os.cpu_count() or 1, 4)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+
+# In-process caches
+PERMISSION_CACHE_SIZE = int(os.getenv("PERMISSION_CACHE_SIZE", 10000))
+PERMISSION_CACHE_TTL_SECONDS = int(os.getenv("PERMISSION_CACHE_TTL_SECONDS", 300))
+# ETag'd GET responses for roles and accounts (src/services/response_cache.py)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 60))
+TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "true").lower() == "true"
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+# Seconds between loads of refresh-token revocations made by other worker processes
+REVOCATION_SYNC_SECONDS = int(os.getenv("REVOCATION_SYNC_SECONDS", 30))
+# Seconds between reloads of the authorization policy (changes made in this process reload it at once)
+POLICY_RELOAD_SECONDS = int(os.getenv("POLICY_RELOAD_SECONDS", 60))
+# Bearer credential other services send to read /auth/.well-known/policy.json; the document is not served without it
+POLICY_TOKEN = os.getenv("POLICY_TOKEN", "")
+# Deletion of expired token events and revocations (src/services/sweeper.py)
+EXPIRY_SWEEP_SECONDS = int(os.getenv("EXPIRY_SWEEP_SECONDS", 3600))
+EXPIRY_SWEEP_BATCH_SIZE = int(os.getenv("EXPIRY_SWEEP_BATCH_SIZE", 500))
+EXPIRY_SWEEP_PAUSE_SECONDS = float(os.getenv("EXPIRY_SWEEP_PAUSE_SECONDS", 0.05))  # between batches
+
 # Email Sending Configs
 SMTP_SERVER = os.getenv("SMTP_SERVER", "http://127.0.0.1")
 SMTP_PORT = os.getenv("SMTP_PORT", 465)
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS", "admin@test.dev")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "emailpassword")
 EMAIL_ENABLED = bool(os.getenv("EMAIL_ENABLED", False))
+SMTP_TIMEOUT_SECONDS = int(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 50))
+EMAIL_OUTBOX_POLL_SECONDS = int(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", 5))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 8))
+EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", 30))
 
 # Handle Async vs Sync Database issues for Alembic
 DATABASE_URI = os.getenv("DATABASE_URI", "sqlite+aiosqlite:///adminserver.db")
 
+# Engine & connection pool (pool sizing is ignored for in-memory SQLite)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+# Seconds after which pooled connections are replaced (-1 never), e.g. below a server-side idle timeout
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+
+# Read replicas (comma separated URIs, same pool settings as the primary). Read-only requests use one of them,
+# except for a user who wrote within the last READ_YOUR_WRITES_SECONDS, whose requests stay on the primary
+REPLICA_DATABASE_URIS = [uri.strip() for uri in os.getenv("REPLICA_DATABASE_URIS", "").split(",") if uri.strip()]
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 10))
+
 if DATABASE_URI.startswith("sqlite+aiosqlite"):
     SYNC_DATABASE_URI = DATABASE_URI.replace("sqlite+aiosqlite", "sqlite", 1)
 else:
     SYNC_DATABASE_URI = DATABASE_URI.replace("+asyncpg", "+psycopg2")  # for postgres
 
+# Per-request SQL statistics (src/services/query_stats.py)
+QUERY_STATS_HEADERS = os.getenv("QUERY_STATS_HEADERS", "false").lower() == "true"  # X-DB-* response headers
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 500))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", 10))  # same statement shape, per request
+
+# Prometheus metrics at /metrics (src/services/metrics.py)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_DIR = os.getenv("METRICS_DIR", "")  # shared by the worker processes of one server; "" for a single process
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+
+# Keyset pagination of list endpoints (src/services/pagination.py)
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", 100))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 1000))
+# Bulk user provisioning (POST /api/v1/user/bulk)
+BULK_USER_MAX = int(os.getenv("BULK_USER_MAX", 10000))  # users per request
+# Plain-text passwords per request, each a full pbkdf2 hash; migrations should send password_hash instead
+BULK_PASSWORD_MAX = int(os.getenv("BULK_PASSWORD_MAX", 100))
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", 1000))  # rows per INSERT statement
+GRANT_BATCH_MAX = int(os.getenv("GRANT_BATCH_MAX", 5000))  # grants + revocations per POST /api/v1/grant/batch
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 500))  # users per fetch of a streamed account export
+
 # Public and Private Key Paths
 KEYS_DIR = pathlib.Path(os.getenv("KEYS_DIR", "keys"))
 
@@ -51,6 +118,13 @@ def _read_required(path: pathlib.Path, name: str) -> str:
 PRIVATE_KEY = _read_required(PRIVATE_KEY_PATH, "private_key")
 PUBLIC_KEY = _read_required(PUBLIC_KEY_PATH, "public_key")
 
+# Previous public keys still published in the JWKS (and accepted) while rotating keys, comma separated paths
+ADDITIONAL_PUBLIC_KEYS = [
+    _read_required(pathlib.Path(path.strip()), "additional_public_key")
+    for path in os.getenv("ADDITIONAL_PUBLIC_KEY_PATHS", "").split(",") if path.strip()
+]
+JWKS_MAX_AGE_SECONDS = int(os.getenv("JWKS_MAX_AGE_SECONDS", 300))
+
 LOG_CONFIG = {
     "version": 1,
     "disable_existing_loggers": False,
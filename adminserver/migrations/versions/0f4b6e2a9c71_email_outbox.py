@@ -0,0 +1,47 @@
+"""email_outbox table for background email delivery
+
+Revision ID: 0f4b6e2a9c71
+Revises: e6a03b8c5d12
+Create Date: 2026-10-18 11:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0f4b6e2a9c71'
+down_revision: Union[str, Sequence[str], None] = 'e6a03b8c5d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('email_outbox'):
+        op.create_table('email_outbox',
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('recipient', sa.String(length=255), nullable=False),
+            sa.Column('subject', sa.String(length=255), nullable=True),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('status', sa.String(length=16), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('claim', sa.String(length=36), nullable=True),
+            sa.Column('last_error', sa.String(length=255), nullable=True),
+            sa.Column('created_date', sa.DateTime(), nullable=False),
+            sa.Column('next_attempt_date', sa.DateTime(), nullable=False),
+            sa.Column('sent_date', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id', name=op.f('pk_email_outbox'))
+        )
+    op.create_index('ix_email_outbox_status_next_attempt_date', 'email_outbox', ['status', 'next_attempt_date'],
+                    if_not_exists=True)
+    op.create_index(op.f('ix_email_outbox_claim'), 'email_outbox', ['claim'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_email_outbox_claim'), table_name='email_outbox')
+    op.drop_index('ix_email_outbox_status_next_attempt_date', table_name='email_outbox')
+    op.drop_table('email_outbox')
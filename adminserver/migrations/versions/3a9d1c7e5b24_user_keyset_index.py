@@ -0,0 +1,36 @@
+"""indexes for keyset pagination of user listings
+
+Revision ID: 3a9d1c7e5b24
+Revises: 0f4b6e2a9c71
+Create Date: 2026-10-18 12:20:00.000000
+
+- user (created_date, id): the page order, seeked from the cursor
+- grant (account_id, active) gains user_id, so the per-user membership probe of a page is one index seek; it still
+  serves everything the two-column index did
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a9d1c7e5b24'
+down_revision: Union[str, Sequence[str], None] = '0f4b6e2a9c71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_user_created_date_id', 'user', ['created_date', 'id'], if_not_exists=True)
+    op.create_index('ix_grant_account_id_active_user_id', 'grant', ['account_id', 'active', 'user_id'],
+                    if_not_exists=True)
+    op.drop_index('ix_grant_account_id_active', table_name='grant', if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_grant_account_id_active', 'grant', ['account_id', 'active'], if_not_exists=True)
+    op.drop_index('ix_grant_account_id_active_user_id', table_name='grant')
+    op.drop_index('ix_user_created_date_id', table_name='user')
@@ -0,0 +1,126 @@
+"""baseline schema
+
+Revision ID: 5b1e8d2f7a40
+Revises: 90027ec7471c
+Create Date: 2026-10-18 11:20:00.000000
+
+The application has been creating its tables with `Base.metadata.create_all` at startup, so this revision
+creates the tables as they stood at 90027ec7471c only where they are missing; databases created by
+create_all are left untouched and continue with the revisions after this one.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e8d2f7a40'
+down_revision: Union[str, Sequence[str], None] = '90027ec7471c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_table(name, *columns):
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def _lookup_columns(name):
+    """Columns shared by account, permission and role."""
+    return (
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('display_name', sa.String(length=255), nullable=True),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('created_date', sa.DateTime(), nullable=False),
+        sa.Column('modified_date', sa.DateTime(), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f(f'pk_{name}')),
+        sa.UniqueConstraint('id', name=op.f(f'uq_{name}_id')),
+        sa.UniqueConstraint('name', name=op.f(f'uq_{name}_name')),
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _create_table('account', *_lookup_columns('account'))
+    _create_table('permission', *_lookup_columns('permission'),
+        sa.Column('scope', sa.String(length=255), nullable=False)
+    )
+    _create_table('role', *_lookup_columns('role'))
+    _create_table('user',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('personal_name', sa.String(length=255), nullable=True),
+        sa.Column('family_names', sa.String(length=255), nullable=True),
+        sa.Column('display_name', sa.String(length=255), nullable=True),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('created_date', sa.DateTime(), nullable=False),
+        sa.Column('modified_date', sa.DateTime(), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_user')),
+        sa.UniqueConstraint('id', name=op.f('uq_user_id')),
+        sa.UniqueConstraint('name', name=op.f('uq_user_name'))
+    )
+    _create_table('email',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('primary', sa.Boolean(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('created_date', sa.DateTime(), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.Column('validated', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], name=op.f('fk_email_user_id_user')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_email')),
+        sa.UniqueConstraint('email', name=op.f('uq_email_email')),
+        sa.UniqueConstraint('id', name=op.f('uq_email_id'))
+    )
+    _create_table('grant',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('granted_date', sa.DateTime(), nullable=False),
+        sa.Column('role_id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('account_id', sa.String(length=36), nullable=True),
+        sa.Column('revoked_date', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['account.id'], name=op.f('fk_grant_account_id_account')),
+        sa.ForeignKeyConstraint(['role_id'], ['role.id'], name=op.f('fk_grant_role_id_role')),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], name=op.f('fk_grant_user_id_user')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_grant')),
+        sa.UniqueConstraint('id', name=op.f('uq_grant_id'))
+    )
+    _create_table('role_permission',
+        sa.Column('role_id', sa.Integer(), nullable=False),
+        sa.Column('permission_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['permission_id'], ['permission.id'],
+                                name=op.f('fk_role_permission_permission_id_permission')),
+        sa.ForeignKeyConstraint(['role_id'], ['role.id'], name=op.f('fk_role_permission_role_id_role')),
+        sa.PrimaryKeyConstraint('role_id', 'permission_id', name=op.f('pk_role_permission'))
+    )
+    _create_table('token_event',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('event_type', sa.String(length=255), nullable=False),
+        sa.Column('event_key', sa.String(length=255), nullable=False),
+        sa.Column('created_by', sa.String(length=36), nullable=False),
+        sa.Column('created_for', sa.String(length=36), nullable=False),
+        sa.Column('token', sa.String(length=255), nullable=False),
+        sa.Column('created_date', sa.DateTime(), nullable=False),
+        sa.Column('expire_date', sa.DateTime(), nullable=False),
+        sa.Column('validated', sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(['created_by'], ['user.id'], name=op.f('fk_token_event_created_by_user')),
+        sa.ForeignKeyConstraint(['created_for'], ['user.id'], name=op.f('fk_token_event_created_for_user')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_token_event')),
+        sa.UniqueConstraint('event_key', name=op.f('uq_token_event_event_key')),
+        sa.UniqueConstraint('id', name=op.f('uq_token_event_id')),
+        sa.UniqueConstraint('token', name=op.f('uq_token_event_token'))
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('token_event', 'role_permission', 'grant', 'email', 'user', 'role', 'permission', 'account'):
+        op.drop_table(table)
@@ -0,0 +1,28 @@
+"""token_event (expire_date) index for the expiry sweeper
+
+Revision ID: 8d4f2b6a1e93
+Revises: 3a9d1c7e5b24
+Create Date: 2026-10-18 12:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f2b6a1e93'
+down_revision: Union[str, Sequence[str], None] = '3a9d1c7e5b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_token_event_expire_date'), 'token_event', ['expire_date'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_token_event_expire_date'), table_name='token_event')
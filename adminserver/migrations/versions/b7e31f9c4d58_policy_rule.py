@@ -0,0 +1,40 @@
+"""policy_rule table for editable endpoint authorization rules
+
+Revision ID: b7e31f9c4d58
+Revises: 8d4f2b6a1e93
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e31f9c4d58'
+down_revision: Union[str, Sequence[str], None] = '8d4f2b6a1e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('policy_rule'):
+        op.create_table('policy_rule',
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('service', sa.String(length=64), nullable=False),
+            sa.Column('method', sa.String(length=10), nullable=False),
+            sa.Column('path', sa.String(length=255), nullable=False),
+            sa.Column('permissions', sa.JSON(), nullable=False),
+            sa.Column('attributes', sa.JSON(), nullable=True),
+            sa.Column('active', sa.Boolean(), nullable=False),
+            sa.Column('modified_date', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id', name=op.f('pk_policy_rule')),
+            sa.UniqueConstraint('service', 'method', 'path', name=op.f('uq_policy_rule_service'))
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('policy_rule')
@@ -0,0 +1,41 @@
+"""revoked_token table for refresh-token revocation
+
+Revision ID: c2d7f4a91e38
+Revises: 5b1e8d2f7a40
+Create Date: 2026-10-18 11:21:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d7f4a91e38'
+down_revision: Union[str, Sequence[str], None] = '5b1e8d2f7a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('revoked_token'):
+        op.create_table('revoked_token',
+            sa.Column('token_id', sa.String(length=64), nullable=False),
+            sa.Column('kind', sa.String(length=16), nullable=False),
+            sa.Column('user_id', sa.String(length=36), nullable=True),
+            sa.Column('reason', sa.String(length=32), nullable=True),
+            sa.Column('revoked_date', sa.DateTime(), nullable=False),
+            sa.Column('expire_date', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('token_id', name=op.f('pk_revoked_token'))
+        )
+    op.create_index(op.f('ix_revoked_token_expire_date'), 'revoked_token', ['expire_date'], if_not_exists=True)
+    op.create_index(op.f('ix_revoked_token_revoked_date'), 'revoked_token', ['revoked_date'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_revoked_token_revoked_date'), table_name='revoked_token')
+    op.drop_index(op.f('ix_revoked_token_expire_date'), table_name='revoked_token')
+    op.drop_table('revoked_token')
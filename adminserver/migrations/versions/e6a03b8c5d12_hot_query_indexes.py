@@ -0,0 +1,57 @@
+"""indexes for the hot queries, string keys on role_permission
+
+Revision ID: e6a03b8c5d12
+Revises: c2d7f4a91e38
+Create Date: 2026-10-18 11:22:00.000000
+
+- grant (user_id, active) and (account_id, active): token issuance, account user lists
+- email (user_id): selectin loads of User.emails
+- email (user_id) WHERE primary: at most one primary email per user
+- role_permission keys become String(36) like the role/permission ids they reference; with INTEGER affinity
+  SQLite cannot use permission's primary key for the role -> permission join and scans the table instead.
+  Email, token, event key and user name lookups are already served by their unique constraints.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a03b8c5d12'
+down_revision: Union[str, Sequence[str], None] = 'c2d7f4a91e38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_grant_user_id_active', 'grant', ['user_id', 'active'], if_not_exists=True)
+    op.create_index('ix_grant_account_id_active', 'grant', ['account_id', 'active'], if_not_exists=True)
+    op.create_index(op.f('ix_email_user_id'), 'email', ['user_id'], if_not_exists=True)
+    op.create_index(
+        'uq_email_user_id_primary', 'email', ['user_id'],
+        unique=True,
+        if_not_exists=True,
+        sqlite_where=sa.column('primary') == sa.true(),
+        postgresql_where=sa.column('primary') == sa.true(),
+    )
+    # Batch mode rebuilds the table on SQLite, which cannot ALTER a column type in place
+    with op.batch_alter_table('role_permission') as batch_op:
+        batch_op.alter_column('role_id', existing_type=sa.Integer(), type_=sa.String(length=36),
+                              existing_nullable=False)
+        batch_op.alter_column('permission_id', existing_type=sa.Integer(), type_=sa.String(length=36),
+                              existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('role_permission') as batch_op:
+        batch_op.alter_column('permission_id', existing_type=sa.String(length=36), type_=sa.Integer(),
+                              existing_nullable=False)
+        batch_op.alter_column('role_id', existing_type=sa.String(length=36), type_=sa.Integer(),
+                              existing_nullable=False)
+    op.drop_index('uq_email_user_id_primary', table_name='email')
+    op.drop_index(op.f('ix_email_user_id'), table_name='email')
+    op.drop_index('ix_grant_account_id_active', table_name='grant')
+    op.drop_index('ix_grant_user_id_active', table_name='grant')
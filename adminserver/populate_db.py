@@ -1,60 +1,103 @@
+"""
+Create the schema and seed the database: the master service account with the demo account, and optionally a
+synthetic dataset of accounts, users, grants and pending TokenEvents for benchmarks and index work
+(see src/services/seeding.py).
+
+Run from the adminserver directory against DATABASE_URI (or --database-uri):
+    python populate_db.py                                   # service account + demo account only
+    python populate_db.py --accounts 2000 --users-per-account 250 --hash-method pbkdf2:sha256:1000
+                                                            # ~500k users, ~1M grants
+
+The service account is created when APP_ADMIN_USER / APP_ADMIN_PASSWORD (or --admin-user / --admin-password) are
+set and it doesn't exist yet.
+"""
+import os
+import time
+import json
+import argparse
 import sqlalchemy
 import sqlalchemy.orm
-# Import from the project
-import sys
-sys.path.append('./src')
 import config as cfg
-sys.path.append('./src/models')
-from models.models import *
+from src.db import Base
+from src.models.models import Account, Grant, Permission, Role, User
+from src.services.seeding import Seeder
 
-if __name__ == "__main__":
-    config_file = "./.env"
-    with open(config_file, "r") as f:
-        cfg_file = {x.split("=")[0].strip():x.split("=")[1].strip() for x in f.readlines()}
-    engine = sqlalchemy.create_engine(cfg.SYNC_DATABASE_URI, echo=True, pool_pre_ping=True)
 
+def bootstrap(session: sqlalchemy.orm.Session, admin_user: str, admin_password: str):
+    """
+    The master service account, the account.admin role and the demo account, granted to the service account.
+    """
+    if session.scalar(sqlalchemy.select(User).where(User.name == "master_service_account")):
+        return
+    permissions = {
+        name: session.scalar(sqlalchemy.select(Permission).where(Permission.name == name))
+        or Permission(name=name, display_name=display_name, scope=scope)
+        for name, display_name, scope in (("account.read", "Account Read", "read"),
+                                          ("account.write", "Account Write", "write"))
+    }
+    role = session.scalar(sqlalchemy.select(Role).where(Role.name == "account.admin")) \
+        or Role(name="account.admin", display_name="Account Admin", permissions=list(permissions.values()))
+    demo_account = session.scalar(sqlalchemy.select(Account).where(Account.name == "demo")) \
+        or Account(name="demo", display_name="Demo Account")
+    service_account = User(name="master_service_account",
+                           display_name="Master Service Account",
+                           password=admin_password,
+                           email=f"{admin_user}@local.host",
+                           type="service",
+                           force_email=True)
+    session.add_all([*permissions.values(), role, demo_account, service_account,
+                     Grant(user=service_account, account=demo_account, role=role)])
+
+
+def main(args):
+    engine = sqlalchemy.create_engine(args.database_uri, pool_pre_ping=True)
+    if engine.dialect.name == "sqlite":
+        @sqlalchemy.event.listens_for(engine, "connect")
+        def fast_writes(dbapi_connection, _):
+            # A seeding run is redone rather than recovered, so skip fsyncs
+            dbapi_connection.execute("PRAGMA synchronous=OFF")
+            dbapi_connection.execute("PRAGMA journal_mode=MEMORY")
     Base.metadata.create_all(engine)
 
-    with sqlalchemy.orm.Session(engine) as session:
-        # Create Primary Service account
-        #sa_email = Email(email=f"{cfg_file['APP_ADMIN_USER']}@local.host")
-        #session.add(sa_email)
-        service_account = User(name="master_service_account",
-                               display_name="Master Service Account",
-                               password=cfg_file["APP_ADMIN_PASSWORD"],
-                               email=f"{cfg_file['APP_ADMIN_USER']}@local.host",
-                               type="service", 
-                               force_email=True)
-        session.add(service_account)
-        session.flush()
-        
-        # Create Admin Role & Permissions
-        account_read_permission = Permission(name="account.read", display_name="Account Read", scope="read")
-        account_write_permission = Permission(name="account.write", display_name="Account Write", scope="write")
-        session.add_all([account_read_permission, account_write_permission])
-        session.flush()
-        account_admin_role = Role(name="account.admin", display_name="Account Admin",
-                                  permissions=[account_read_permission, account_write_permission])
-        session.add(account_admin_role)
-        session.flush()
-        
-        # Create Demo Account
-        demo_account = Account(name="demo",
-                               display_name="Demo Account")
-        session.add(demo_account)
-        
-        # Grant SA the admin role for the demo account
-        sa_grant = Grant(user=service_account, account=demo_account, role=account_admin_role)
-        session.add(sa_grant)
-       
-        # session.commit()
-        print(f"users: {[x for x in session.scalars(sqlalchemy.select(User))]}")
-        print(f"accounts: {[x for x in session.scalars(sqlalchemy.select(Account))]}")
-        print(f"roles: {[x for x in session.scalars(sqlalchemy.select(Role))]}")
-        print(f"permissions: {[x for x in session.scalars(sqlalchemy.select(Permission))]}")
-        print(f"grants: {[x for x in session.scalars(sqlalchemy.select(Grant))]}")
-        print(f"emails: {[x for x in session.scalars(sqlalchemy.select(Email))]}")
-        session.commit()
-        print("Database populated successfully.")
+    if args.admin_password:
+        with sqlalchemy.orm.Session(engine) as session:
+            bootstrap(session, args.admin_user, args.admin_password)
+            session.commit()
+
+    if args.accounts:
+        seeder = Seeder(accounts=args.accounts, users_per_account=args.users_per_account,
+                        shared_users=args.shared_users, extra_accounts=args.extra_accounts,
+                        pending_events=args.pending_events, expired_events=args.expired_events,
+                        password=args.password, hash_method=args.hash_method, distinct_hashes=args.hashes,
+                        prefix=args.prefix, seed=args.seed, batch_size=args.batch_size)
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            counts = seeder.seed(connection)
+        elapsed = time.perf_counter() - start
+        print(json.dumps({"rows": counts, "seconds": round(elapsed, 1),
+                          "grants_per_sec": round(counts["grant"] / elapsed, 1),
+                          "password": args.password}, indent=2))
+    engine.dispose()
     print("Done.")
 
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", default=cfg.SYNC_DATABASE_URI)
+    parser.add_argument("--admin-user", default=os.getenv("APP_ADMIN_USER", "admin"))
+    parser.add_argument("--admin-password", default=os.getenv("APP_ADMIN_PASSWORD"))
+    parser.add_argument("--accounts", type=int, default=0, help="Synthetic accounts (0: none)")
+    parser.add_argument("--users-per-account", type=int, default=100)
+    parser.add_argument("--shared-users", type=float, default=0.1,
+                        help="Share of the users who are also members of other accounts")
+    parser.add_argument("--extra-accounts", type=int, default=2, help="Most other accounts a shared user joins")
+    parser.add_argument("--pending-events", type=float, default=0.05,
+                        help="Share of the users with a pending email validation")
+    parser.add_argument("--expired-events", type=float, default=0.2, help="Share of those already expired")
+    parser.add_argument("--password", default="password", help="Password of every synthetic user")
+    parser.add_argument("--hash-method", default=None, help="werkzeug hash method (default: werkzeug's)")
+    parser.add_argument("--hashes", type=int, default=1, help="Distinct password hashes shared between users")
+    parser.add_argument("--prefix", default="seed", help="Prefix of the synthetic names")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows per INSERT")
+    main(parser.parse_args())
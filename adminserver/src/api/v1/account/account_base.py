@@ -4,6 +4,8 @@ import sqlalchemy.orm
 from quart import Blueprint, jsonify, g, request
 from src.services.auth_manager import auth_manager
 from src.models.models import Account, User, Grant
+from src.services.serializers import account_dict
+from src.services.response_cache import response_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,12 +17,13 @@ account_v1_bp = Blueprint("account_v1", __name__, url_prefix="/account")
 async def get_account():
     account_id = g.user["account_id"]
     logger.info(f"User {g.user['sub']} retrieving the account details for account {account_id}")
-    session = g.db_session
-    account = await Account.get(account_id, session)
-    if not account:
+    async def load_account(session):
+        account = await Account.get(account_id, session)
+        return account_dict(account) if account else None
+    response = await response_cache.respond(("account", account_id), ("account",), load_account)
+    if response is None:
         return jsonify({"error": "Not found"}), 404
-    account_dict = await account.to_dict()
-    return jsonify(account_dict), 200
+    return response
 
 
 @account_v1_bp.route("", methods=["POST"])
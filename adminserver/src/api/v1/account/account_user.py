@@ -1,27 +1,28 @@
+import io
+import csv
 import asyncio
 import sqlalchemy
 import sqlalchemy.orm
-from quart import Blueprint, jsonify, g, request
+from quart import Blueprint, Response, jsonify, g, request
+from src.db import get_session
 from src.services.auth_manager import auth_manager
-from src.models.models import Account, User, Grant
+from src.models.models import Account, User, Grant, account_member_clause
+from src.services.serializers import json_response, dumps, grant_dict, isoformat_dates
+from src.services.pagination import PageRequest, InvalidPageRequest
+import config as cfg
 import logging
 
 logger = logging.getLogger(__name__)
 account_user_bp = Blueprint("account_user_v1", __name__, url_prefix="/user")
 
-@account_user_bp.route("", methods=["GET"])
-@account_user_bp.route("/", methods=["GET"])
-@auth_manager.jwt_required()
-#@auth_manager.require_permissions("account.read")
-async def get_account_users():
-    account_id = g.user["account_id"]
-    logger.info(f"User {g.user['sub']} retrieving the users for the account {account_id}")
-    session = g.db_session
-    result = await session.execute(
+def account_users_query(account_id: str, keyset: bool = False):
+    """
+    The active users holding an active grant on an account, with their emails and grants loaded.
+    :param keyset: Shape the query for keyset pagination (see account_member_clause).
+    """
+    return (
         sqlalchemy.select(User)
-        .join(Grant, Grant.user_id == User.id)
-        .where(Grant.account_id == account_id, 
-                Grant.active == True,
+        .where(account_member_clause(account_id, keyset),
                 User.active == True,
                 User.deleted == False)
         .options(
@@ -30,22 +31,118 @@ async def get_account_users():
                 .selectinload(Grant.role)
         )   
     )
-    users = result.scalars().unique().all()
-    async def user_record(user: User):
-        primary_email = next(
-            (e.email for e in user.emails if e.primary and e.active and not e.deleted), 
-            None
+
+
+def account_user_record(user: User, account_id: str) -> dict:
+    """
+    A user as listed for an account: identity, primary email and the grants on that account.
+    """
+    primary_email = next(
+        (e.email for e in user.emails if e.primary and e.active and not e.deleted), 
+        None
+    )
+    return {
+        'id': user.id,
+        'name': user.name,
+        'type': user.type,
+        'email': primary_email,
+        'created_date': user.created_date.isoformat(),
+        'modified_date': user.modified_date.isoformat(),
+        'grants': [grant_dict(grant) for grant in user.grants if grant.account_id == account_id]
+    }
+
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_COLUMNS = ("user_id", "name", "type", "email", "created_date", "modified_date", "grant_id", "role_id",
+               "role_name", "grant_active", "granted_date", "revoked_date")
+
+
+def _csv_rows(record: dict):
+    user = [record["id"], record["name"], record["type"], record["email"], record["created_date"],
+            record["modified_date"]]
+    for grant in record["grants"]:
+        grant = isoformat_dates(grant)
+        yield user + [grant["id"], grant["role_id"], grant["role_name"], grant["active"], grant["granted_date"],
+                      grant["revoked_date"]]
+
+
+async def export_account_users(account_id: str, export_format: str, batch_size: int = 500,
+                               session_factory=get_session):
+    """
+    Encoded chunks of an account's user export, one per batch of `batch_size` users.
+
+    Runs in its own session, since it is consumed after the handler has returned and the request session is closed.
+    Users are streamed from a server-side cursor and each batch is expunged once written, so memory holds one batch
+    whatever the size of the account.
+    :param export_format: "ndjson" or "csv".
+    """
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        yield buffer.getvalue().encode("utf-8")
+    async with session_factory() as session:
+        result = await session.stream_scalars(
+            account_users_query(account_id).execution_options(yield_per=batch_size)
         )
-        user_obj = {
-            'id': user.id,
-            'name': user.name,
-            'type': user.type,
-            'email': primary_email,
-            'created_date': user.created_date.isoformat(),
-            'modified_date': user.modified_date.isoformat(),
-            'grants': [await grant.to_dict() for grant in user.grants if grant.account_id == account_id]
-        }
-        return user_obj
-    users_dict = [await user_record(user) for user in users]
-
-    return jsonify(users_dict), 200
\ No newline at end of file
+        async for users in result.partitions():
+            records = [account_user_record(user, account_id) for user in users]
+            # Not expunge_all, which replaces the identity map the streaming result is still loading into
+            for instance in list(session.identity_map.values()):
+                if instance in session:  # Not already removed along with its parent (User.emails cascades)
+                    session.expunge(instance)
+            if export_format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                for record in records:
+                    writer.writerows(_csv_rows(record))
+                yield buffer.getvalue().encode("utf-8")
+            else:
+                yield b"".join(dumps(record) + b"\n" for record in records)
+
+
+@account_user_bp.route("", methods=["GET"])
+@account_user_bp.route("/", methods=["GET"])
+@auth_manager.jwt_required()
+#@auth_manager.require_permissions("account.read")
+async def get_account_users():
+    account_id = g.user["account_id"]
+    logger.info(f"User {g.user['sub']} retrieving the users for the account {account_id}")
+    session = g.db_session
+    try:
+        page = PageRequest.from_args(request.args, cfg.PAGE_SIZE_DEFAULT, cfg.PAGE_SIZE_MAX)
+    except InvalidPageRequest as exc:
+        return jsonify({"error": str(exc)}), 400
+    if page is not None:
+        query = page.apply(account_users_query(account_id, keyset=True), User.created_date, User.id)
+    else:
+        query = account_users_query(account_id)
+    result = await session.execute(query)
+    users = result.scalars().unique().all()
+    if page is not None:
+        users, next_cursor = page.split(users)
+        return json_response({"data": [account_user_record(user, account_id) for user in users], "next": next_cursor})
+    return json_response([account_user_record(user, account_id) for user in users])
+
+
+@account_user_bp.route("/export", methods=["GET"])
+@auth_manager.jwt_required()
+@auth_manager.require_permissions("account.read")
+async def export_users():
+    """
+    Stream every user of the account with their grants on it, as NDJSON (one user per line, the default) or CSV
+    (`?format=csv`, one row per grant).
+    """
+    account_id = g.user["account_id"]
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    logger.info(f"User {g.user['sub']} exporting the users of account {account_id} as {export_format}")
+    response = Response(
+        export_account_users(account_id, export_format, cfg.EXPORT_BATCH_SIZE),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="account-{account_id}-users.{export_format}"'
+    # An export of a large account can outlast RESPONSE_TIMEOUT; the client controls how long it reads for
+    response.timeout = None
+    return response
@@ -1,16 +1,60 @@
+import pydantic
 from quart import Blueprint, jsonify, g, request
 from src.services.auth_manager import auth_manager
+from src.services.grant_batch import apply_grant_changes, GrantBatchError, GRANTED, REVOKED
+from src.services.schema import GrantBatchRequest, validation_errors
+from src.services.serializers import json_response
 import logging
 
 logger = logging.getLogger(__name__)
 grants_bp = Blueprint("grants_v1", __name__, url_prefix="/grant")
 
 
+async def _apply(body: dict):
+    """
+    Validate a change set and apply it on the current account.
+    :return: (results, None) or (None, error response).
+    """
+    try:
+        changes = GrantBatchRequest.model_validate(body)
+    except pydantic.ValidationError as exc:
+        return None, (jsonify({"errors": validation_errors(exc)}), 400)
+    try:
+        results = await apply_grant_changes(changes, g.user["account_id"], g.db_session, granted_by=g.user["sub"])
+    except GrantBatchError as exc:
+        return None, (jsonify({"errors": exc.errors}), 400)
+    return results, None
+
+
+@grants_bp.route("/batch", methods=["POST"])
+@auth_manager.jwt_required()
+@auth_manager.require_permissions("account.write")
+async def batch_grants():
+    """
+    Grant and revoke roles on the current account in one transaction:
+    {"grant": [{"user_id", "role"}, ...], "revoke": [{"user_id", "role"}, ...]}.
+    The whole set is rejected if any change is invalid; see src/services/grant_batch.py.
+    """
+    results, error = await _apply(await request.get_json(silent=True))
+    if error:
+        return error
+    logger.info(f"User {g.user['sub']} changed {len(results['grant']) + len(results['revoke'])} grants "
+                f"on account {g.user['account_id']}")
+    return json_response(results)
+
+
 @grants_bp.route("", methods=["POST"])
+@auth_manager.jwt_required()
+@auth_manager.require_permissions("account.write")
 async def grant_role():
-    data = await request.get_json()
-    # Create a new account
-    return jsonify({"action": "create", "data": data}), 201
+    """
+    Grant a role to a user on the current account: {"user_id", "role"}.
+    """
+    results, error = await _apply({"grant": [await request.get_json(silent=True)]})
+    if error:
+        return error
+    result = results["grant"][0]
+    return json_response(result, status=201 if result["status"] == GRANTED else 200)
 
 
 @grants_bp.route("", methods=["PUT"])
@@ -21,6 +65,14 @@ async def update_grant():
 
 
 @grants_bp.route("", methods=["DELETE"])
+@auth_manager.jwt_required()
+@auth_manager.require_permissions("account.write")
 async def revoke_grant():
-    # Delete account
-    return jsonify({"action": "delete"})
\ No newline at end of file
+    """
+    Revoke a user's role on the current account: {"user_id", "role"}.
+    """
+    results, error = await _apply({"revoke": [await request.get_json(silent=True)]})
+    if error:
+        return error
+    result = results["revoke"][0]
+    return json_response(result, status=200 if result["status"] == REVOKED else 404)
@@ -3,29 +3,32 @@ import sqlalchemy.orm
 from quart import Blueprint, jsonify, g, request
 from src.services.auth_manager import auth_manager
 from src.models.models import Role
+from src.services.serializers import role_dict
+from src.services.response_cache import response_cache
 import logging
 
 logger = logging.getLogger(__name__)
 roles_bp = Blueprint("roles_v1", __name__, url_prefix="/role")
+# The role list is built from these; a committed write to any of them refreshes the cached response
+ROLE_TABLES = ("role", "permission", "role_permission")
 
 
 @roles_bp.route("", methods=["GET"])
 @auth_manager.jwt_required()
 async def get_roles():
-    session = g.db_session
     #account_id = g.user["account_id"]
     logger.info(f"User {g.user['sub']} Retrieving roles list.")
-    
-    result = await session.execute(
-        sqlalchemy.select(Role)
-        .where(Role.active == True, Role.deleted == False)
-        .options(
-            sqlalchemy.orm.selectinload(Role.permissions)
+
+    async def load_roles(session):
+        result = await session.execute(
+            sqlalchemy.select(Role)
+            .where(Role.active == True, Role.deleted == False)
+            .options(
+                sqlalchemy.orm.selectinload(Role.permissions)
+            )
         )
-    )
-    roles = result.scalars().all()
-    role_dicts = [await role.to_dict() for role in roles]
-    return jsonify(role_dicts), 200
+        return [role_dict(role) for role in result.scalars().all()]
+    return await response_cache.respond(("roles",), ROLE_TABLES, load_roles)
 
 @roles_bp.route("", methods=["POST"])
 async def create_role():
@@ -1,9 +1,14 @@
-import asyncio
 import sqlalchemy
+import sqlalchemy.exc
 import sqlalchemy.orm
 from src.services.auth_manager import auth_manager
 from src.models.models import User, Grant, Role, Email#, account_user_table
+from src.services.serializers import json_response, account_dict
+from src.services.pagination import PageRequest, InvalidPageRequest
+from src.services.provisioning import provision_users, BulkRequestError, TooManyPasswords, CREATED
+from src.services.hashing import HashingQueueFull
 from quart import Blueprint, jsonify, g, request
+import config as cfg
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,12 +20,20 @@ user_bp = Blueprint("user_v1", __name__, url_prefix="/user")
 async def get_users():
     """
     Endpoint to retrieve all users for the current account.
+    With `limit` and/or `cursor` query parameters the users are returned one page at a time as
+    {"data": [...], "next": cursor}; see src/services/pagination.py.
     """
     session = g.db_session
     account_id = g.user["account_id"]
     logger.info(f"User {g.user['sub']} Retrieving users for account {account_id}")
+    try:
+        page = PageRequest.from_args(request.args, cfg.PAGE_SIZE_DEFAULT, cfg.PAGE_SIZE_MAX)
+    except InvalidPageRequest as exc:
+        return jsonify({"error": str(exc)}), 400
+    if page is not None:
+        return json_response(await User.get_json_page_by_account(account_id, page, session))
     user_dicts = await User.get_all_json_by_account(account_id, g.db_session)
-    return jsonify(user_dicts), 200
+    return json_response(user_dicts)
 
 
 @user_bp.route('/', methods=['POST'])
@@ -37,6 +50,36 @@ async def add_user():
     return jsonify({"message": "ok"}), 200
 
 
+@user_bp.route('/bulk', methods=['POST'])
+@auth_manager.jwt_required()
+@auth_manager.require_permissions("account.write")
+async def add_users_bulk():
+    """
+    Create a batch of users on the current account, with their roles on it.
+    The body is a list of users (or {"users": [...]}); see BulkUserInput and src/services/provisioning.py.
+    Returns one result per row: created rows with their new ID, invalid rows with their errors (201 if any row was
+    created, else 422). More than BULK_PASSWORD_MAX plain-text passwords is refused with a 413.
+    """
+    account_id = g.user["account_id"]
+    data = await request.get_json(silent=True)
+    rows = data.get("users") if isinstance(data, dict) else data
+    try:
+        results = await provision_users(rows, account_id, g.db_session, granted_by=g.user["sub"])
+    except TooManyPasswords as exc:
+        return jsonify({"error": str(exc)}), 413
+    except BulkRequestError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except HashingQueueFull:
+        return jsonify({"error": "Password hashing is busy, retry shortly"}), 503, {"Retry-After": "1"}
+    except sqlalchemy.exc.IntegrityError:
+        await g.db_session.rollback()
+        return jsonify({"error": "Some users were created concurrently, nothing was created; retry"}), 409
+    created = sum(1 for result in results if result["status"] == CREATED)
+    logger.info(f"User {g.user['sub']} provisioned {created} of {len(results)} users for account {account_id}")
+    return json_response({"created": created, "invalid": len(results) - created, "results": results},
+                         status=201 if created else 422)
+
+
 @user_bp.route('/', methods=['PUT'])
 @auth_manager.jwt_required()
 async def update_user():
@@ -64,7 +107,7 @@ async def get_me():
         user = await User.get_json_user_by_id(user_id, session)
         if not user:
             return jsonify({"error": "User not found"}), 404
-        return jsonify(user), 200
+        return json_response(user)
 
 
 @user_bp.route("/me", methods=['PUT'])
@@ -96,6 +139,5 @@ async def authorized_accounts():
         return jsonify({"error": "Unauthorized"}), 401
 
     accounts = await user.get_authorized_accounts(session)
-    account_dicts = await asyncio.gather(*(account.to_dict() for account in accounts))
-    return jsonify(account_dicts), 200
+    return json_response([account_dict(account) for account in accounts])
 
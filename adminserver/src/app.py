@@ -1,19 +1,58 @@
+import time
+import asyncio
 import logging.config
-from quart import Quart, g
+from quart import Quart, g, request
 from quart_schema import QuartSchema
 from quart_cors import cors
 # Imports from within the project
 import config as cfg
 from src.api.v1.routes import api_v1_bp
 from src.auth.auth import auth_bp
-from src.db import AsyncSessionLocal, setup_db
+from src.db import AsyncSessionLocal, setup_db, engine, replica_engines, recent_writers
+from src.services.hashing import password_hasher
+from src.services.revocation import revocation_index
+from src.services.outbox import email_outbox
+from src.services.sweeper import expiry_sweeper
+from src.services.policy import policy_engine
+from src.services.query_stats import query_stats
+from src.services.auth_manager import auth_manager
+from src.services.permission_cache import permission_cache
+from src.services.response_cache import response_cache
+from src.services.metrics import (
+    metrics, install_db_metrics, cache_collector, CONTENT_TYPE,
+    http_requests, http_request_duration, http_requests_in_flight
+)
 
 # TODO - Add quart-schema and validate request & response data
 # TODO - Add blueprints and separate auth into it's own section
 
+
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def request_user_id() -> str | None:
+    user = g.get("user")
+    return user.get("sub") if isinstance(user, dict) else None
+
+
+class RequestGlobals(Quart.app_ctx_globals_class):
+    """
+    `g`, with `g.db_session` opened the first time a handler uses it rather than for every request,
+    so health checks and other database-free requests never create a session.
+    Read-only requests may read from a replica (see RoutingSession), unless the user wrote recently.
+    """
+    def __getattr__(self, name):
+        if name == "db_session":
+            replica = request.method in READ_ONLY_METHODS and not recent_writers.recent(request_user_id())
+            session = self.db_session = AsyncSessionLocal(info={"replica": replica})
+            return session
+        return super().__getattr__(name)
+
+
 def create_app():
     # Instantiate the application
     app = Quart(__name__)
+    app.app_ctx_globals_class = RequestGlobals
 
     # Allow urls to end with erroneous extra /
     app.url_map.strict_slashes = False
@@ -47,19 +86,82 @@ def create_app():
     @app.before_serving
     async def startup():
         await setup_db()
+        await revocation_index.start()
+        await policy_engine.start()
+        expiry_sweeper.start()
+        metrics.start()
+        if cfg.EMAIL_ENABLED:
+            email_outbox.start()
+
+    @app.after_serving
+    async def shutdown():
+        await revocation_index.stop()
+        await policy_engine.stop()
+        await expiry_sweeper.stop()
+        await email_outbox.stop()
+        await metrics.stop()
+        password_hasher.shutdown()
+
+    # Per-request SQL statistics, for every blueprint
+    for instrumented in (engine, *replica_engines):
+        query_stats.install(instrumented)
+        install_db_metrics(instrumented)
+
+    # Prometheus metrics: request latency and counts by route template, in-flight requests, cache hit counts
+    metrics.collector("token_cache", cache_collector("token", auth_manager.token_cache))
+    metrics.collector("permission_cache", cache_collector("permission", permission_cache))
+    metrics.collector("response_cache", cache_collector("response", response_cache))
 
     @app.before_request
-    async def create_session():
-        g.db_session = AsyncSessionLocal()
+    async def start_request_metrics():
+        g.request_started = time.perf_counter()
+        http_requests_in_flight.inc()
 
+    @app.after_request
+    async def record_request_metrics(response):
+        started = g.get("request_started")
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            http_request_duration.observe(time.perf_counter() - started, request.method, route)
+            http_requests.inc(request.method, route, str(response.status_code))
+        return response
+
+    @app.teardown_request
+    async def finish_request_metrics(exc):
+        if g.get("request_started") is not None:
+            http_requests_in_flight.dec()
+
+    if cfg.METRICS_ENABLED:
+        @app.route("/metrics", methods=["GET"])
+        async def prometheus_metrics():
+            # Reading the other workers' snapshots is file I/O
+            body = await asyncio.to_thread(metrics.render) if metrics.directory else metrics.render()
+            return body.encode("utf-8"), 200, {"Content-Type": CONTENT_TYPE}
+
+    @app.before_request
+    async def start_query_stats():
+        query_stats.begin()
+
+    @app.after_request
+    async def finish_query_stats(response):
+        stats = query_stats.end(request.method, request.path, response.status_code)
+        if stats is not None and (cfg.QUERY_STATS_HEADERS or app.debug):
+            response.headers.update(stats.headers())
+        return response
+
+    # g.get never triggers the lazy session, so requests that didn't use one have nothing to close
     @app.after_request
     async def cleanup_session(response):
-        await g.db_session.close()
+        session = g.get("db_session")
+        if session:
+            if session.info.get("wrote") and (user_id := request_user_id()):
+                recent_writers.note_write(user_id)
+            await session.close()
         return response
 
     @app.teardown_request
     async def teardown_session(exc):
-        session = getattr(g, "db_session", None)
+        session = g.get("db_session")
         if session:
             if exc:
                 await session.rollback()
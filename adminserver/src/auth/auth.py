@@ -1,23 +1,71 @@
 import jwt
-from quart import Blueprint, request, jsonify, g
+import hmac
+import time
+import logging
+from quart import Blueprint, Response, request, jsonify, g
 from quart_schema import validate_request, validate_response
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.services.auth_manager import auth_manager
+from src.services.permission_cache import permission_cache
+from src.services.hashing import HashingQueueFull
+from src.services.permission_claims import encode_permissions
+from src.services.revocation import revocation_index, JTI, FAMILY
+from src.services.policy import policy_engine
+from src.services.serializers import json_response
 from src.models.models import User
 from src.services.schema import UserInput, RefreshTokenInput, AccountRequired
+import config as cfg
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
+logger = logging.getLogger(__name__)
+
+async def get_user_claims(user_id: str, db_session: AsyncSession, user: User | None = None) -> dict | None:
+    """
+    Get the identity & permission claims for a user, served from the permission cache when possible.
+    :param user_id: The ID of the user.
+    :param db_session: The database session to use on a cache miss.
+    :param user: The already-loaded User, if the caller has one.
+    :return: Claims dict, or None if the user does not exist.
+    """
+    version = permission_cache.version
+    claims = permission_cache.get(user_id)
+    if claims is None:
+        if user is None:
+            user = await User.get(user_id, db_session)
+            if not user:
+                return None
+        claims = {
+            "sub": str(user.id),
+            "username": user.name,
+            "type": user.type,
+            "permissions": await user.get_permissions(db_session)
+        }
+        permission_cache.put(user_id, claims, version)
+    return claims
+
+
+async def revoke_token_family(payload: dict, reason: str, db_session: AsyncSession):
+    """
+    Revoke every refresh (and access) token issued in the same family as `payload`, and commit.
+    Tokens issued before families were introduced have no `fid` and are left to expire.
+    """
+    if not payload.get("fid"):
+        return
+    # No token of the family can outlive a refresh token issued right now
+    expires = time.time() + auth_manager.refresh_token_expiry * 60
+    await revocation_index.revoke(db_session, FAMILY, payload["fid"], expires, user_id=payload.get("sub"), reason=reason)
+    await db_session.commit()
+
 
 # TODO - move this into the actual auth manager itself 
-async def generate_user_payload(user: User, account_id: str, db_session: AsyncSession):
-    permissions = await user.get_permissions(db_session)
+async def generate_user_payload(claims: dict, account_id: str):
+    permissions = claims["permissions"]
     if account_id in permissions.keys():
+        identity = {key: value for key, value in claims.items() if key != "permissions"}
         return {
-            "sub": str(user.id),
-            "username": user.name,
-            "type": user.type,
+            **identity,
             "account_id": account_id,
-            "permissions": permissions
+            **encode_permissions(permissions, cfg.TOKEN_PERMISSION_FORMAT, account_id)
         }
     else:
         raise ValueError("User does not have permissions for the specified account")
@@ -33,12 +81,15 @@ async def login():
     account_id = data.get("account")
 
     session = g.db_session
-    if username: 
-        user = await User.username_login(username, password, session)
-    elif email:
-        user = await User.email_login(email, password, session)
-    else:
-        return jsonify({"error": "Username or email is required"}), 400
+    try:
+        if username: 
+            user = await User.username_login(username, password, session)
+        elif email:
+            user = await User.email_login(email, password, session)
+        else:
+            return jsonify({"error": "Username or email is required"}), 400
+    except HashingQueueFull:
+        return jsonify({"error": "Too many login attempts in progress, retry shortly"}), 503, {"Retry-After": "1"}
     
     if not user:
         return jsonify({"error": "Invalid credentials"}), 401
@@ -49,9 +100,9 @@ async def login():
             return jsonify({"error": "No authorized accounts found"}), 403
         account_id = accounts[0].id  # TODO - something more sophisticated
     
-    user_data = await generate_user_payload(user, account_id, session)
-    access_token = auth_manager.create_access_token(user_data)
-    refresh_token = auth_manager.create_refresh_token(user_data)
+    claims = await get_user_claims(user.id, session, user=user)
+    user_data = await generate_user_payload(claims, account_id)
+    access_token, refresh_token = await auth_manager.create_token_pair(user_data)
 
     response = jsonify({
         "access_token": access_token,
@@ -79,12 +130,25 @@ async def refresh_token():
         return jsonify({"error": "Invalid or expired token"}), 401
 
     session = g.db_session
-    user = await User.get(payload["sub"], session)
-    
-    user_data = await generate_user_payload(user, payload['account_id'], session)
+    if revocation_index.is_revoked(payload):
+        if revocation_index.is_reused(payload):
+            # An already rotated refresh token came back, so it has leaked: end the whole family
+            logger.warning("refresh_token_reuse sub=%s fid=%s", payload.get("sub"), payload.get("fid"))
+            await revoke_token_family(payload, "reuse", session)
+        return jsonify({"error": "Invalid or expired token"}), 401
+
+    claims = await get_user_claims(payload["sub"], session)
+    if not claims:
+        return jsonify({"error": "Invalid or expired token"}), 401
+
+    user_data = await generate_user_payload(claims, payload['account_id'])
+    # Retire the presented token before issuing its successor, so presenting it again is detected as reuse
+    if payload.get("jti"):
+        await revocation_index.revoke(session, JTI, payload["jti"], payload["exp"],
+                                      user_id=payload["sub"], reason="rotated")
+        await session.commit()
     # New tokens (rotate refresh token)
-    new_access_token = auth_manager.create_access_token(user_data)
-    new_refresh_tooken = auth_manager.create_refresh_token(user_data)
+    new_access_token, new_refresh_tooken = await auth_manager.create_token_pair(user_data, payload.get("fid"))
     # Build response & set the cookie with the new refresh token
     response = jsonify({"access_token": new_access_token})
     response.set_cookie("refresh_token", new_refresh_tooken, httponly=True, samesite="Lax", secure=False, path="/")
@@ -95,26 +159,70 @@ async def refresh_token():
 @auth_bp.route("/switch_account", methods=["POST"])
 @validate_request(AccountRequired)
 @auth_manager.jwt_required()
-async def switch_account():
-    data = await request.get_json()
+async def switch_account(data: AccountRequired):
     session = g.db_session
 
-    user = await User.get(g.user["sub"], session)
-    if not user:
+    claims = await get_user_claims(g.user["sub"], session)
+    if not claims:
         return {"error": "User not found"}, 404
 
     # When gathering the user-data from that function, we pull the user permissions
-    # from the database and ensure the account_id is in the keys of the permissions.
-    user_data = await generate_user_payload(user, data.get("account_id"), session)
-    new_token = auth_manager.create_access_token(user_data)
+    # (from the permission cache or the database) and ensure the account_id is in the keys of the permissions.
+    try:
+        user_data = await generate_user_payload(claims, data.account_id)
+    except ValueError:
+        return {"error": "No permissions on the requested account"}, 403
+    if g.user.get("fid"):
+        user_data["fid"] = g.user["fid"]
+    new_token = await auth_manager.create_access_token_async(user_data)
 
     return jsonify({"access_token": new_token})
 
 
 @auth_bp.route("/logout", methods=["POST"])
 async def logout():
+    token = request.cookies.get("refresh_token")
+    if token:
+        try:
+            payload = auth_manager.verify_token(token)
+        except jwt.PyJWTError:
+            payload = None
+        if payload and payload.get("type") == "refresh":
+            await revoke_token_family(payload, "logout", g.db_session)
+
     response = jsonify({"message": "Logout successful."})
     # Wipe out the refresh-token from the cookie
     response.set_cookie("refresh_token", "", httponly=True, secure=False, samesite="Lax", max_age=0)
 
-    return response
\ No newline at end of file
+    return response
+
+
+@auth_bp.route("/.well-known/jwks.json", methods=["GET"])
+async def jwks():
+    response = jsonify(auth_manager.jwks())
+    response.headers["Cache-Control"] = f"public, max-age={cfg.JWKS_MAX_AGE_SECONDS}"
+    return response
+
+
+@auth_bp.route("/.well-known/policy.json", methods=["GET"])
+async def policy():
+    """
+    The authorization policy document (see src/services/policy.py), for other services to enforce.
+    Unlike the JWKS it describes every role and endpoint rule, so it is only served to callers presenting
+    POLICY_TOKEN as a bearer credential (and not at all while POLICY_TOKEN is unset).
+    """
+    scheme, _, credential = request.headers.get("Authorization", "").partition(" ")
+    if not cfg.POLICY_TOKEN or scheme.lower() != "bearer" or not hmac.compare_digest(
+            credential.encode(), cfg.POLICY_TOKEN.encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+    if policy_engine.policy is None:
+        await policy_engine.reload()
+    current = policy_engine.policy
+    if request.if_none_match.contains(current.version):
+        response = Response(status=304)
+    else:
+        response = json_response(current.document)
+    response.set_etag(current.version)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
@@ -1,7 +1,10 @@
+import time
+import random
 import config as cfg
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy import MetaData, Column, Table, Integer, ForeignKey
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy import MetaData, Column, Table, String, ForeignKey, Engine
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 from contextlib import asynccontextmanager
 
 
@@ -14,20 +17,97 @@ class Base(DeclarativeBase):
         "pk": "pk_%(table_name)s"
     })
 
-engine = create_async_engine(cfg.DATABASE_URI, echo=True)
+
+def engine_options(uri: str) -> dict:
+    """
+    Engine keyword arguments from config. In-memory SQLite uses a single static connection, so it takes no
+    pool sizing arguments.
+    """
+    options = {
+        "echo": cfg.DB_ECHO,
+        "pool_pre_ping": cfg.DB_POOL_PRE_PING,
+        "pool_recycle": cfg.DB_POOL_RECYCLE_SECONDS,
+    }
+    if not (uri.startswith("sqlite") and (":memory:" in uri or uri.rstrip("/").endswith(":"))):
+        options.update(
+            pool_size=cfg.DB_POOL_SIZE,
+            max_overflow=cfg.DB_MAX_OVERFLOW,
+            pool_timeout=cfg.DB_POOL_TIMEOUT_SECONDS,
+        )
+    return options
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from a replica when it is allowed to, and sends everything else to the primary.
+
+    Reads go to a replica only if the session was opened with `info={"replica": True}` (read-only requests, see
+    src/app.py); each such session sticks to one replica. Flushes, INSERT/UPDATE/DELETE statements and SELECT ... FOR
+    UPDATE go to the primary, and once a session has written every later statement does too, so it reads its own
+    changes. Subclasses made by `routing_session_class` set the engines.
+    """
+    primary: Engine = None
+    replicas: tuple[Engine, ...] = ()
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase) or getattr(clause, "_for_update_arg", None) is not None:
+            self.info["wrote"] = True
+        if self.info.get("wrote") or not self.info.get("replica") or not self.replicas:
+            return self.primary
+        replica = self.info.get("replica_engine")
+        if replica is None:
+            replica = self.info["replica_engine"] = random.choice(self.replicas)
+        return replica
+
+
+def routing_session_class(primary: AsyncEngine, replicas) -> type[RoutingSession]:
+    """A RoutingSession class for `primary` and the `replicas` engines."""
+    return type("RoutingSession", (RoutingSession,), {
+        "primary": primary.sync_engine,
+        "replicas": tuple(replica.sync_engine for replica in replicas),
+    })
+
+
+class ReadYourWrites:
+    """
+    Users who wrote within the last `window` seconds, whose requests should read from the primary until the replicas
+    have caught up. Kept per process: the window only covers requests served by the worker that made the write.
+    """
+    def __init__(self, window: float = 10):
+        self.window = window
+        self._until = {}
+
+    def note_write(self, user_id: str, now: float | None = None):
+        now = time.monotonic() if now is None else now
+        self._until[user_id] = now + self.window
+        if len(self._until) > 1000:
+            self._until = {user: until for user, until in self._until.items() if until > now}
+
+    def recent(self, user_id: str | None, now: float | None = None) -> bool:
+        if not user_id:
+            return False
+        until = self._until.get(user_id)
+        return until is not None and until > (time.monotonic() if now is None else now)
+
+
+engine = create_async_engine(cfg.DATABASE_URI, **engine_options(cfg.DATABASE_URI))
+replica_engines = [create_async_engine(uri, **engine_options(uri)) for uri in cfg.REPLICA_DATABASE_URIS]
+recent_writers = ReadYourWrites(window=cfg.READ_YOUR_WRITES_SECONDS)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
+    sync_session_class=routing_session_class(engine, replica_engines) if replica_engines else Session,
 )
 
 
 role_permission_table = Table(
     "role_permission",
     Base.metadata,
-    Column("role_id", Integer, ForeignKey("role.id"), primary_key=True),
-    Column("permission_id", Integer, ForeignKey("permission.id"), primary_key=True)
+    # Same type as the keys they reference, or SQLite cannot use those keys' indexes for the join
+    Column("role_id", String(36), ForeignKey("role.id"), primary_key=True),
+    Column("permission_id", String(36), ForeignKey("permission.id"), primary_key=True)
 )
 
 
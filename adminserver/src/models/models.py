@@ -1,5 +1,4 @@
 import uuid
-import asyncio
 import secrets
 import datetime
 from collections import defaultdict
@@ -8,11 +7,19 @@ import sqlalchemy
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from werkzeug.security import generate_password_hash, check_password_hash
 from src.db import Base, role_permission_table
+from src.services.hashing import password_hasher
+from src.services.pagination import PageRequest
+from src.services.serializers import (
+    isoformat_dates, account_dict, permission_dict, role_dict, email_dict, user_dict, grant_dict, token_event_dict
+)
 import config as cfg
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Stored in place of a password hash for users created without a password; no password ever matches it
+UNUSABLE_PASSWORD = "!"
+
 
 class Account(Base):
     __tablename__ = 'account'
@@ -39,14 +46,7 @@ class Account(Base):
         return hash(self.id)
     
     async def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "display_name": self.display_name,
-            "active": self.active,
-            "created_date": self.created_date.isoformat(),
-            "modified_date": self.modified_date.isoformat()
-        }
+        return isoformat_dates(account_dict(self))
     
     @staticmethod
     async def get(account_id, db_session):
@@ -78,15 +78,7 @@ class Permission(Base):
         return f"Permission(id={self.id!r}, name={self.name!r})"
     
     async def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "display_name": self.display_name,
-            "active": self.active,
-            "created_date": self.created_date.isoformat(),
-            "modified_date": self.modified_date.isoformat(),
-            "scope": self.scope
-        }
+        return isoformat_dates(permission_dict(self))
 
 
 class Role(Base):
@@ -113,15 +105,7 @@ class Role(Base):
         return f"Role(id={self.id!r}, name={self.name!r})"
     
     async def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "display_name": self.display_name,
-            "active": self.active,
-            "created_date": self.created_date.isoformat(),
-            "modified_date": self.modified_date.isoformat(),
-            "permissions": [permission.name for permission in self.permissions]
-        }
+        return isoformat_dates(role_dict(self))
     
     @staticmethod
     async def get(role_id, db_session):
@@ -138,7 +122,7 @@ class Email(Base):
         unique=True
     )
     email: Mapped[str] = mapped_column(sqlalchemy.String(255), nullable=False, unique=True)
-    user_id: Mapped[str] = mapped_column(sqlalchemy.ForeignKey("user.id"))
+    user_id: Mapped[str] = mapped_column(sqlalchemy.ForeignKey("user.id"), index=True)
     user: Mapped["User"] = relationship("User", back_populates="emails")
     primary: Mapped[bool] = mapped_column(default=False)
     active: Mapped[bool] = mapped_column(default=True)
@@ -154,14 +138,7 @@ class Email(Base):
         return self.email
     
     async def to_dict(self):
-        return {
-            "id": self.id,
-            "email": self.email,
-            "primary": self.primary,
-            "active": self.active,
-            "created_date": self.created_date.isoformat(),
-            "validated": self.validated
-        }
+        return isoformat_dates(email_dict(self))
     
     @staticmethod
     async def find(email: str, db_session):
@@ -172,21 +149,54 @@ class Email(Base):
         """
         result = await db_session.execute(sqlalchemy.select(Email).where(Email.email == email))
         return result.scalars().first()
-    
-    # Enfore single instance of primary per use when migrated to postgresql
-    # __table_args__ = (
-    #     # Enforce only one primary email per user
-    #    sqlalchemy.Index(
-    #         "uq_primary_email_per_user",
-    #         "user_id",
-    #         unique=True,
-    #         postgresql_where=sqlalchemy.text("primary = true"),
-    #     ),
-    # )
+
+
+# Enforce a single primary email per user (a partial unique index on both SQLite and PostgreSQL)
+sqlalchemy.Index(
+    "uq_email_user_id_primary",
+    Email.user_id,
+    unique=True,
+    sqlite_where=Email.primary == sqlalchemy.true(),
+    postgresql_where=Email.primary == sqlalchemy.true(),
+)
+
+
+def permissions_from_grants(grants) -> dict[str, list[str]]:
+    """
+    Resolve permission names by account ID from grants whose roles and permissions are already loaded.
+    Inactive grants are skipped.
+    :param grants: Grant objects, e.g. a user's `grants` or the result of `get_grants`.
+    :return: Sorted permission names by account ID.
+    """
+    result = defaultdict(set)
+    for grant in grants:
+        if grant.active and grant.account_id and grant.role:
+            result[grant.account_id].update(permission.name for permission in grant.role.permissions)
+    return {account_id: sorted(permissions) for account_id, permissions in result.items()}
+
+
+def account_member_clause(account_id: str, keyset: bool = False):
+    """
+    Filter for users holding an active grant on the account.
+    :param keyset: For pages ordered by (created_date, id). The default drives the query from the account's grants and
+        sorts all its users; with `keyset` it walks the user (created_date, id) index from the cursor and probes the
+        grant index per user, stopping once the page is full, so deep pages cost the same as the first one.
+    """
+    if keyset:
+        return sqlalchemy.exists().where(
+            Grant.account_id == account_id, Grant.active == True, Grant.user_id == User.id
+        )
+    return User.id.in_(
+        sqlalchemy.select(Grant.user_id).where(Grant.account_id == account_id, Grant.active == True)
+    )
 
 
 class User(Base):
     __tablename__ = 'user'
+    __table_args__ = (
+        # Keyset pagination of user listings (src/services/pagination.py)
+        sqlalchemy.Index("ix_user_created_date_id", "created_date", "id"),
+    )
     id: Mapped[str] = mapped_column(
         sqlalchemy.String(36), 
         primary_key=True, 
@@ -224,7 +234,8 @@ class User(Base):
                  display_name = None, 
                  personal_name = None,
                  family_names = None,
-                 force_email = False):
+                 force_email = False,
+                 password_hash: str = None):
         self.name = name
         self.type = type
         self.personal_name = personal_name
@@ -233,7 +244,7 @@ class User(Base):
         self.active = True
         self.created_date = datetime.datetime.now(tz=datetime.timezone.utc)
         self.modified_date = datetime.datetime.now(tz=datetime.timezone.utc)
-        self.password = generate_password_hash(password)
+        self.password = password_hash if password_hash else generate_password_hash(password)
         self.deleted = False
         if email and force_email:
             self.emails.append(Email(email=email, primary=True, validated=True))
@@ -257,24 +268,34 @@ class User(Base):
         :return: True if the password matches, False otherwise.
         """
         return check_password_hash(self.password, password)
+
+    async def verify_password(self, password: str) -> bool:
+        """
+        Same as check_password, but the hash check runs in the password hashing pool.
+        :param password: The password to check.
+        :return: True if the password matches, False otherwise.
+        """
+        return await password_hasher.verify(self.password, password)
+
+    @classmethod
+    async def create(cls, name: str, password: str, email: str, **kwargs):
+        """
+        Build a new User, hashing the password in the password hashing pool rather than on the event loop.
+        :param name: The user name.
+        :param password: The plain-text password.
+        :param email: The primary email address.
+        :return: The new (not yet added) User.
+        """
+        return cls(name, None, email, password_hash=await password_hasher.hash(password), **kwargs)
     
     async def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "type": self.type,
-            "display_name": self.display_name,
-            "active": self.active,
-            "created_date": self.created_date.isoformat(),
-            "modified_date": self.modified_date.isoformat(),
-            "email": self.primary_email.email if self.primary_email else None#,
-            #"accounts": [account.name for account in self.accounts],
-            #"grants": [await grant.to_dict() for grant in self.grants]
-        }
+        return isoformat_dates(user_dict(self))
     
     async def set_primary_email(self, new_primary_email: Email, db_sesion):
-        for e in self.email:
+        for e in self.emails:
             e.primary = False
+        # Demote first: a user has at most one primary email (uq_email_user_id_primary), even mid-transaction
+        await db_sesion.flush()
         new_primary_email.primary = True
         await db_sesion.commit()
 
@@ -291,16 +312,9 @@ class User(Base):
         """
         Get all permissions for the user.
         :param db_session: The database session to use for the query.
-        :return: List of Permission objects associated with the user.
+        :return: Sorted permission names by account ID.
         """
-        grants = await self.get_grants(db_session)
-        result = defaultdict(set)
-        for grant in grants:
-            if grant.active and grant.account_id and grant.role:
-                for perm in grant.role.permissions:
-                    result[grant.account_id].add(perm.name)
-
-        return {account_id: sorted(list(perms)) for account_id, perms in result.items()}
+        return permissions_from_grants(await self.get_grants(db_session))
 
     async def get_authorized_accounts(self, db_session):
         """
@@ -343,7 +357,9 @@ class User(Base):
         """
         
         user = await User.find(name, db_session)
-        if user and user.check_password(password):
+        # End the read transaction so the pooled connection isn't held while waiting on the hashing pool
+        await db_session.commit()
+        if user and await user.verify_password(password):
             return user
         return None
 
@@ -358,7 +374,8 @@ class User(Base):
         """
         result = await db_session.execute(sqlalchemy.select(User).join(Email).where(Email.email == email))
         user = result.scalars().first()
-        if user and user.check_password(password):
+        await db_session.commit()
+        if user and await user.verify_password(password):
             return user
         return None
 
@@ -373,12 +390,16 @@ class User(Base):
         return result.scalars().first()
     
     @staticmethod
-    async def full_user_json(user, db_session):
+    def full_user_json(user):
+        """
+        The full JSON shape of a user, built from its loaded emails and grants (with their roles, permissions and
+        accounts) without querying.
+        """
         user_obj = {
             'id': user.id,
             'name': user.name,
             'type': user.type,
-            'emails': await asyncio.gather(*(e.to_dict() for e in user.emails)),
+            'emails': [email_dict(e) for e in user.emails],
             'personal_name': user.personal_name,
             'family_names': user.family_names,
             'display_name': user.display_name,
@@ -386,23 +407,18 @@ class User(Base):
             'created_date': user.created_date.isoformat(),
             'modified_date': user.modified_date.isoformat(),
             'deleted': user.deleted,
-            'grants': await asyncio.gather(*(grant.to_dict() for grant in user.grants)),
-            'permissions': await user.get_permissions(db_session)
+            'grants': [grant_dict(grant) for grant in user.grants],
+            'permissions': permissions_from_grants(user.grants)
         }
         return user_obj
     
     @staticmethod
-    async def get_all_json_by_account(account_id, db_sesion):
-        logger.debug(f"Retrieving all users for account {account_id}")
-        
-        result = await db_sesion.execute(
+    def _account_users_select(account_id, keyset: bool = False):
+        return (
             sqlalchemy.select(User)
             .where(User.active == True,
                 User.deleted == False,
-                User.id.in_(
-                    sqlalchemy.select(Grant.user_id).where(
-                        Grant.account_id == account_id,
-                        Grant.active == True)))
+                account_member_clause(account_id, keyset))
             .options(
                 sqlalchemy.orm.selectinload(User.emails),
                 sqlalchemy.orm.selectinload(User.grants)
@@ -412,9 +428,28 @@ class User(Base):
                     .selectinload(Grant.account),
             )
         )
+
+    @staticmethod
+    async def get_all_json_by_account(account_id, db_sesion):
+        logger.debug(f"Retrieving all users for account {account_id}")
+        
+        result = await db_sesion.execute(User._account_users_select(account_id))
         users = result.scalars().all()
-        user_dicts = [await User.full_user_json(user, db_sesion) for user in users]
+        user_dicts = [User.full_user_json(user) for user in users]
         return user_dicts
+
+    @staticmethod
+    async def get_json_page_by_account(account_id, page: PageRequest, db_session):
+        """
+        One page of the account's users, ordered by (created_date, id).
+        :param page: The requested page.
+        :return: {"data": [user JSON], "next": cursor of the following page, or None on the last page}
+        """
+        result = await db_session.execute(
+            page.apply(User._account_users_select(account_id, keyset=True), User.created_date, User.id)
+        )
+        users, next_cursor = page.split(result.scalars().all())
+        return {"data": [User.full_user_json(user) for user in users], "next": next_cursor}
     
     @staticmethod
     async def get_json_user_by_id(user_id, db_session):
@@ -437,12 +472,18 @@ class User(Base):
         users = result.scalars().unique().all()
         if not users:
             return None
-        user_dict = await User.full_user_json(users[0], db_session)
+        user_dict = User.full_user_json(users[0])
         return user_dict
 
 
 class Grant(Base):
     __tablename__ = 'grant'
+    __table_args__ = (
+        # A user's active grants (token issuance, selectin loads) and an account's active grants (account user lists);
+        # user_id last so the per-user membership probe of paginated account listings is a single index seek
+        sqlalchemy.Index("ix_grant_user_id_active", "user_id", "active"),
+        sqlalchemy.Index("ix_grant_account_id_active_user_id", "account_id", "active", "user_id"),
+    )
     id: Mapped[str] = mapped_column(
         sqlalchemy.String(36), 
         primary_key=True, 
@@ -468,18 +509,7 @@ class Grant(Base):
         return f"Grant(id={self.id!r}, user_id={self.user.id!r})"
     
     async def to_dict(self):
-        return {
-            "id": self.id,
-            "active": self.active,
-            "granted_date": self.granted_date.isoformat(),
-            "role_id": self.role_id,
-            "role_name": self.role.name,
-            "user_id": self.user_id,
-            "account_id": self.account_id,
-            "account_name": self.account.name,
-            "account_display_name": self.account.display_name,
-            "revoked_date": self.revoked_date.isoformat() if self.revoked_date else None,
-        }
+        return isoformat_dates(grant_dict(self))
 
 
 class TokenEvent(Base):
@@ -500,7 +530,8 @@ class TokenEvent(Base):
     created_for: Mapped[str] = mapped_column(sqlalchemy.ForeignKey("user.id"))
     token: Mapped[str] = mapped_column(sqlalchemy.String(255), unique=True, nullable=False)
     created_date: Mapped[datetime.datetime] = mapped_column(default=datetime.datetime.now(tz=datetime.timezone.utc))
-    expire_date: Mapped[datetime.datetime] = mapped_column(default=(datetime.datetime.now(tz=datetime.timezone.utc)+datetime.timedelta(hours=2)))
+    expire_date: Mapped[datetime.datetime] = mapped_column(default=(datetime.datetime.now(tz=datetime.timezone.utc)+datetime.timedelta(hours=2)),
+                                                           index=True)  # ExpirySweeper
     validated: Mapped[bool] = mapped_column(default=False)
 
     # Not part of the SqlAlchemy table
@@ -527,15 +558,7 @@ class TokenEvent(Base):
         return f"TokenEvent(id={self.id})"
     
     async def to_dict(self):
-        return {
-            "event_type": self.event_type,
-            "event_key": self.event_key,
-            "created_by": self.created_by,
-            "created_for": self.created_for,
-            "token": self.token,
-            "expire_date": self.expire_date,
-            "validated": self.validated
-        }
+        return isoformat_dates(token_event_dict(self))
     
     async def generate_url(self):
         return f"{cfg.CORS_ORIGIN}/{self.event_type}/validate/?token={self.token}"
@@ -560,7 +583,7 @@ class TokenEvent(Base):
                           user=target_user,
                           validated=True)
         db_session.add(new_email)
-        db_session.commit()
+        await db_session.commit()
         return self
 
     @staticmethod
@@ -593,4 +616,91 @@ class TokenEvent(Base):
                     raise ValueError(f"TokenEvent type of {te.event_type} was not found")
         else:
             return False, "The provided token was not found or the expiration date on the token has passed."
-        
\ No newline at end of file
+        
+
+class RevokedToken(Base):
+    __tablename__ = 'revoked_token'
+    """
+    Persisted revocations backing the in-memory RevocationIndex (src/services/revocation.py).
+    `token_id` is either a refresh token `jti` (kind "jti"), a whole refresh-token family `fid` (kind "family") or a
+    user ID whose access tokens issued up to `revoked_date` are rejected (kind "user", after grants were revoked).
+    Rows are only needed until `expire_date`, after which every token they could match has expired anyway.
+    """
+    token_id: Mapped[str] = mapped_column(sqlalchemy.String(64), primary_key=True)
+    kind: Mapped[str] = mapped_column(sqlalchemy.String(16), nullable=False)
+    user_id: Mapped[str] = mapped_column(sqlalchemy.String(36), nullable=True)
+    reason: Mapped[str] = mapped_column(sqlalchemy.String(32), nullable=True)
+    revoked_date: Mapped[datetime.datetime] = mapped_column(nullable=False, index=True)
+    expire_date: Mapped[datetime.datetime] = mapped_column(nullable=False, index=True)
+
+    def __repr__(self):
+        return f"RevokedToken(token_id={self.token_id!r}, kind={self.kind!r})"
+
+
+class EmailOutbox(Base):
+    __tablename__ = 'email_outbox'
+    """
+    Outgoing emails waiting for (or done with) delivery by the OutboxWorker (src/services/outbox.py).
+    `message` is the complete MIME message; `claim` marks the rows a worker has taken for its current batch.
+    """
+    __table_args__ = (
+        # The worker's poll: pending rows that are due
+        sqlalchemy.Index("ix_email_outbox_status_next_attempt_date", "status", "next_attempt_date"),
+    )
+    id: Mapped[str] = mapped_column(
+        sqlalchemy.String(36),
+        primary_key=True,
+        default=lambda: str(uuid.uuid4())
+    )
+    recipient: Mapped[str] = mapped_column(sqlalchemy.String(255), nullable=False)
+    subject: Mapped[str] = mapped_column(sqlalchemy.String(255), nullable=True)
+    message: Mapped[str] = mapped_column(sqlalchemy.Text, nullable=False)
+    status: Mapped[str] = mapped_column(sqlalchemy.String(16), nullable=False, default="pending")  # pending | sent | failed
+    attempts: Mapped[int] = mapped_column(default=0)
+    claim: Mapped[str] = mapped_column(sqlalchemy.String(36), nullable=True, index=True)
+    last_error: Mapped[str] = mapped_column(sqlalchemy.String(255), nullable=True)
+    created_date: Mapped[datetime.datetime] = mapped_column(
+        default=lambda: datetime.datetime.now(tz=datetime.timezone.utc))
+    next_attempt_date: Mapped[datetime.datetime] = mapped_column(
+        default=lambda: datetime.datetime.now(tz=datetime.timezone.utc))
+    sent_date: Mapped[datetime.datetime] = mapped_column(nullable=True)
+
+    def __repr__(self):
+        return f"EmailOutbox(id={self.id!r}, recipient={self.recipient!r}, status={self.status!r})"
+
+
+class PolicyRule(Base):
+    __tablename__ = 'policy_rule'
+    """
+    Editable authorization rule for one endpoint of one service, compiled into the Policy (src/services/policy.py).
+    `path` is the route template (i.e. /api/v1/account, /locations/{location_id}). `permissions` lists permission
+    names, or `role:<name>` for every permission of a role, any one of which grants access (an empty list only
+    requires a valid token); `attributes` optionally maps token claims to their allowed values.
+    """
+    __table_args__ = (
+        sqlalchemy.UniqueConstraint("service", "method", "path"),
+    )
+    id: Mapped[str] = mapped_column(
+        sqlalchemy.String(36),
+        primary_key=True,
+        default=lambda: str(uuid.uuid4())
+    )
+    service: Mapped[str] = mapped_column(sqlalchemy.String(64), nullable=False)
+    method: Mapped[str] = mapped_column(sqlalchemy.String(10), nullable=False)
+    path: Mapped[str] = mapped_column(sqlalchemy.String(255), nullable=False)
+    permissions: Mapped[list] = mapped_column(sqlalchemy.JSON, nullable=False, default=list)
+    attributes: Mapped[dict] = mapped_column(sqlalchemy.JSON, nullable=True)
+    active: Mapped[bool] = mapped_column(default=True)
+    modified_date: Mapped[datetime.datetime] = mapped_column(
+        default=lambda: datetime.datetime.now(tz=datetime.timezone.utc),
+        onupdate=lambda: datetime.datetime.now(tz=datetime.timezone.utc))
+
+    def __repr__(self):
+        return f"PolicyRule(service={self.service!r}, method={self.method!r}, path={self.path!r})"
+
+    def to_policy(self) -> dict:
+        rule = {"service": self.service, "method": self.method.upper(), "path": self.path,
+                "permissions": list(self.permissions or [])}
+        if self.attributes:
+            rule["attributes"] = self.attributes
+        return rule
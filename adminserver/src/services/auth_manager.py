@@ -1,9 +1,20 @@
 import jwt
+import json
+import uuid
+import base64
+import asyncio
+import hashlib
 import datetime
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from quart import request, jsonify, g
 from sqlalchemy import Column, String, DateTime
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.services.token_cache import VerifiedTokenCache
+from src.services.permission_claims import has_any_permission
+from src.services.revocation import RevocationIndex, revocation_index as default_revocation_index
+from src.services.policy import PolicyEngine, policy_engine as default_policy_engine
+from src.services.metrics import token_verifications
 import config as cfg
 
 
@@ -14,33 +25,101 @@ class AuthManager:
         public_key,
         access_token_expiry=15, 
         refresh_token_expiry=1440,
-        key_algorithm="RS256"
+        key_algorithm="RS256",
+        signing_workers=2,
+        token_cache: VerifiedTokenCache | None = None,
+        additional_public_keys=(),
+        revocation_index: RevocationIndex | None = None,
+        policy_engine: PolicyEngine | None = None
     ):
         self.private_key = private_key
         self.public_key = public_key
         self.access_token_expiry = access_token_expiry
         self.refresh_token_expiry = refresh_token_expiry
         self.key_algorithm = key_algorithm
+        # Parse the PEMs once; jwt.encode/decode would otherwise re-parse them on every call
+        algorithm = jwt.algorithms.get_default_algorithms()[key_algorithm]
+        self._signing_key = algorithm.prepare_key(private_key)
+        self._verifying_key = algorithm.prepare_key(public_key)
+        # Verification keys by kid: the current key plus any previous keys still honored during a rotation
+        keys = [self._verifying_key, *(algorithm.prepare_key(key) for key in additional_public_keys)]
+        jwks = [self._to_jwk(algorithm, key) for key in keys]
+        self.kid = jwks[0]["kid"]
+        self._verifying_keys = {jwk["kid"]: key for jwk, key in zip(jwks, keys)}
+        # Never publish shared secrets
+        self._jwks = [] if key_algorithm.startswith("HS") else jwks
+        self._executor = ThreadPoolExecutor(max_workers=signing_workers, thread_name_prefix="jwt-sign")
+        self.token_cache = token_cache if token_cache is not None else VerifiedTokenCache(enabled=False)
+        self.revocation_index = revocation_index
+        self.policy_engine = policy_engine
+
+    def _to_jwk(self, algorithm, key) -> dict:
+        jwk = algorithm.to_jwk(key, as_dict=True)
+        # RFC 7638 thumbprint: SHA-256 over the required members, lexicographically ordered, no whitespace
+        required = {name: jwk[name] for name in ("crv", "e", "k", "kty", "n", "x", "y") if name in jwk}
+        digest = hashlib.sha256(json.dumps(required, sort_keys=True, separators=(",", ":")).encode()).digest()
+        kid = base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+        return {**jwk, "kid": kid, "alg": self.key_algorithm, "use": "sig"}
+
+    def jwks(self) -> dict:
+        """
+        The JSON Web Key Set document for the verification keys, for consumers such as locationserv.
+        """
+        return {"keys": list(self._jwks)}
 
     def _build_payload(self, data: dict, minutes: int, token_type: str):
         now = datetime.datetime.now(tz=datetime.timezone.utc)
         return {
             **data,
             "type": token_type,
+            "jti": uuid.uuid4().hex,
             "iat": now,
             "exp": now + datetime.timedelta(minutes=minutes)
         }
 
+    def _sign(self, payload: dict) -> str:
+        return jwt.encode(payload, self._signing_key, algorithm=self.key_algorithm, headers={"kid": self.kid})
+
     def create_access_token(self, data: dict) -> str:
         payload = self._build_payload(data, self.access_token_expiry, "access")
-        return jwt.encode(payload, self.private_key, algorithm=self.key_algorithm)
+        return self._sign(payload)
 
     def create_refresh_token(self, data: dict) -> str:
         payload = self._build_payload(data, self.refresh_token_expiry, "refresh")
-        return jwt.encode(payload, self.private_key, algorithm=self.key_algorithm)
+        return self._sign(payload)
+
+    def _create_token_pair(self, data: dict) -> tuple[str, str]:
+        return self.create_access_token(data), self.create_refresh_token(data)
+
+    async def create_access_token_async(self, data: dict) -> str:
+        """
+        Create an access token, signing it in the signing executor rather than on the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.create_access_token, data)
+
+    async def create_token_pair(self, data: dict, family_id: str | None = None) -> tuple[str, str]:
+        """
+        Create an access and a refresh token for the same claims in a single hop to the signing executor.
+        Both tokens carry the refresh-token family ID (`fid`), so revoking the family also rejects its access tokens.
+        :param data: The user claims.
+        :param family_id: The family of the refresh token being rotated; a new family is started when omitted.
+        :return: Tuple of (access_token, refresh_token).
+        """
+        data = {**data, "fid": family_id or uuid.uuid4().hex}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._create_token_pair, data)
 
     def verify_token(self, token: str) -> dict:
-        return jwt.decode(token, self.public_key, algorithms=[self.key_algorithm])
+        payload = self.token_cache.get(token)
+        if payload is None:
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = self._verifying_keys.get(kid) if kid else self._verifying_key
+            if key is None:
+                raise jwt.InvalidKeyError(f"Unknown signing key {kid!r}")
+            payload = jwt.decode(token, key, algorithms=[self.key_algorithm])
+            self.token_cache.put(token, payload)
+        return payload
 
     def jwt_required(self):
         def decorator(func):
@@ -54,25 +133,50 @@ class AuthManager:
                     token = request.cookies["access_token"]
 
                 if not token:
+                    token_verifications.inc("missing")
                     return {"error": "Missing token"}, 401
 
                 try:
                     payload = self.verify_token(token)
                     g.user = payload
+                except jwt.ExpiredSignatureError:
+                    token_verifications.inc("expired")
+                    return {"error": "Invalid or expired token"}, 401
                 except jwt.PyJWTError:
+                    token_verifications.inc("invalid")
+                    return {"error": "Invalid or expired token"}, 401
+
+                if self.revocation_index is not None and self.revocation_index.is_revoked(payload):
+                    token_verifications.inc("revoked")
                     return {"error": "Invalid or expired token"}, 401
 
+                # An endpoint with a policy rule enforces it even without require_permissions
+                if not self.authorized(payload, None):
+                    token_verifications.inc("forbidden")
+                    return {"error": "Forbidden - missing permissions"}, 403
+
+                token_verifications.inc("valid")
                 return await func(*args, **kwargs)
             return wrapper
         return decorator
 
+    def authorized(self, claims: dict, required_permissions: tuple[str, ...] | None) -> bool:
+        """
+        Check the current request's endpoint against the policy.
+        :param required_permissions: The endpoint's own permissions, used when the policy has no rule for it;
+            None allows any valid token.
+        """
+        account_id = claims.get("account_id")
+        if self.policy_engine is None:
+            return required_permissions is None or has_any_permission(claims, account_id, required_permissions)
+        rule = request.url_rule.rule if request.url_rule is not None else request.path
+        return self.policy_engine.allows(claims, account_id, request.method, rule, required_permissions)
+
     def require_permissions(self, *required_permissions):
         def decorator(func):
             @wraps(func)
             async def wrapper(*args, **kwargs):
-                current_account = g.user["account_id"]
-                user_permissions = g.user["permissions"].get(str(current_account))
-                if not any(permission in user_permissions for permission in required_permissions):
+                if not self.authorized(g.user, required_permissions):
                     return {"error": "Forbidden - missing permissions"}, 403
                 return await func(*args, **kwargs)
             return wrapper
@@ -83,5 +187,10 @@ auth_manager = AuthManager(
     public_key=cfg.PUBLIC_KEY,
     access_token_expiry=cfg.ACCESS_TOKEN_EXPIRE_MINUTES,
     refresh_token_expiry=cfg.REFRESH_TOKEN_EXPIRE_MINUTES,
-    key_algorithm=cfg.ENCRYPT_ALGORITHM
+    key_algorithm=cfg.ENCRYPT_ALGORITHM,
+    signing_workers=cfg.JWT_SIGNING_WORKERS,
+    token_cache=VerifiedTokenCache(max_size=cfg.TOKEN_CACHE_SIZE, enabled=cfg.TOKEN_CACHE_ENABLED),
+    additional_public_keys=cfg.ADDITIONAL_PUBLIC_KEYS,
+    revocation_index=default_revocation_index,
+    policy_engine=default_policy_engine
 )
\ No newline at end of file
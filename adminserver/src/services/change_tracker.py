@@ -0,0 +1,104 @@
+import itertools
+import logging
+from collections import defaultdict
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeTracker:
+    """
+    Per-table change counters for the adminserver database.
+
+    Every committed transaction bumps the counter of each table it wrote to (ORM flushes, relationship changes on
+    association tables and ORM-level bulk INSERT/UPDATE/DELETE statements). In-process caches stamp their entries with
+    `version(...)` of the tables they were built from and treat any other version as stale.
+    """
+    def __init__(self):
+        self._counters = defaultdict(int)
+        self._subscribers = []
+
+    def version(self, *tables: str) -> tuple[int, ...]:
+        """
+        Current version of the given tables.
+        :param tables: Table names.
+        :return: Tuple of change counters, in the order the tables were given.
+        """
+        return tuple(self._counters[table] for table in tables)
+
+    def bump(self, *tables: str, **context):
+        """
+        Record a change to the given tables and notify subscribers once.
+        :param tables: Table names that changed.
+        :param context: Extra details about the change (i.e. affected user ids) passed through to subscribers.
+        """
+        if not tables:
+            return
+        for table in tables:
+            self._counters[table] += 1
+        changed = frozenset(tables)
+        for callback in self._subscribers:
+            try:
+                callback(changed, context)
+            except Exception:
+                logger.exception(f"Change subscriber {callback!r} failed")
+
+    def subscribe(self, callback):
+        """
+        Register a callable(tables: frozenset[str], context: dict) run after each committed change.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    @staticmethod
+    def mark(session: Session, *tables: str, **context):
+        """
+        Flag tables (and context) as changed by the session's current transaction; published on commit.
+        """
+        session.info.setdefault("changed_tables", set()).update(tables)
+        if context:
+            pending = session.info.setdefault("change_context", {})
+            for key, value in context.items():
+                pending.setdefault(key, set()).update(value)
+
+    def install(self, session_class=Session):
+        event.listen(session_class, "after_flush", self._after_flush)
+        event.listen(session_class, "do_orm_execute", self._do_orm_execute)
+        event.listen(session_class, "after_commit", self._after_commit)
+        event.listen(session_class, "after_rollback", self._after_rollback)
+
+    def _after_flush(self, session, flush_context):
+        tables = set()
+        deleted = session.deleted
+        for obj in itertools.chain(session.new, session.dirty, deleted):
+            state = sqlalchemy.inspect(obj)
+            tables.update(table.name for table in state.mapper.tables)
+            for rel in state.mapper.relationships:
+                if rel.secondary is None:
+                    continue
+                if obj in deleted or state.attrs[rel.key].history.has_changes():
+                    tables.add(rel.secondary.name)
+        if tables:
+            self.mark(session, *tables)
+
+    def _do_orm_execute(self, orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if table is not None:
+                self.mark(orm_execute_state.session, table.name)
+
+    def _after_commit(self, session):
+        tables = session.info.pop("changed_tables", None)
+        context = session.info.pop("change_context", {})
+        if tables:
+            self.bump(*tables, **context)
+
+    def _after_rollback(self, session):
+        session.info.pop("changed_tables", None)
+        session.info.pop("change_context", None)
+
+
+change_tracker = ChangeTracker()
+change_tracker.install()
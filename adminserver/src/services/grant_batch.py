@@ -0,0 +1,182 @@
+"""
+Transactional grant changes (POST /api/v1/grant/batch, and the single grant/revoke endpoints).
+
+A change set grants and revokes roles for users on one account. It is validated as a whole (roles and users must
+exist, no pair both granted and revoked, and the caller can only grant roles whose permissions they hold on the
+account themselves) and then applied in a single transaction with set-based statements: one
+UPDATE ... RETURNING per chunk of revocations sets `active`/`revoked_date`, one SELECT finds the grants that already
+exist and one multi-row INSERT adds the rest. On commit the change tracker publishes a single change to the grant
+table carrying every affected user ID, so permission caches refresh once for the whole set, and the access tokens
+already issued to users who lost a role are revoked together once the transaction commits (see
+RevocationIndex.revoke_users).
+"""
+import uuid
+import logging
+import datetime
+import sqlalchemy
+import config as cfg
+from src.db import role_permission_table
+from src.models.models import User, Grant, Role, Permission
+from src.services.change_tracker import ChangeTracker
+from src.services.revocation import RevocationIndex, revocation_index
+from src.services.schema import GrantBatchRequest
+
+logger = logging.getLogger(__name__)
+
+GRANTED = "granted"
+ALREADY_GRANTED = "already_granted"
+REVOKED = "revoked"
+NOT_GRANTED = "not_granted"
+# (user_id, role_id) pairs per statement, below SQLite's bound parameter limit
+_PAIR_CHUNK = 400
+
+
+class GrantBatchError(ValueError):
+    """
+    Raised when a change set is invalid; nothing was applied.
+    """
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _chunks(values: list, size: int = _PAIR_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+async def _role_permissions(role_ids, db_session) -> dict[str, set[str]]:
+    """Permission names by role ID."""
+    permissions = {role_id: set() for role_id in role_ids}
+    result = await db_session.execute(
+        sqlalchemy.select(role_permission_table.c.role_id, Permission.name)
+        .join(Permission, Permission.id == role_permission_table.c.permission_id)
+        .where(role_permission_table.c.role_id.in_(sorted(permissions)))
+    )
+    for role_id, name in result:
+        permissions[role_id].add(name)
+    return permissions
+
+
+async def _held_permissions(user_id: str, account_id: str, db_session) -> set[str]:
+    """Permission names a user holds on an account through active grants (as in their tokens)."""
+    result = await db_session.execute(
+        sqlalchemy.select(Permission.name).distinct()
+        .join(role_permission_table, Permission.id == role_permission_table.c.permission_id)
+        .join(Grant, Grant.role_id == role_permission_table.c.role_id)
+        .where(Grant.user_id == user_id, Grant.account_id == account_id, Grant.active == True)
+    )
+    return set(result.scalars())
+
+
+async def apply_grant_changes(changes: GrantBatchRequest,
+                              account_id: str,
+                              db_session,
+                              granted_by: str | None = None,
+                              revocations: RevocationIndex = revocation_index,
+                              max_changes: int = cfg.GRANT_BATCH_MAX) -> dict:
+    """
+    Apply a change set on an account in one transaction, and commit.
+    :param changes: The grants and revocations.
+    :param account_id: The account the roles are granted on.
+    :param granted_by: ID of the user making the changes; they may only grant roles whose permissions they hold on
+        the account. None for trusted internal callers only (no check).
+    :param revocations: Where the access tokens of users who lost a role are revoked.
+    :return: {"grant": [...], "revoke": [...]} with {"user_id", "role", "status"} per change, in request order.
+    :raises GrantBatchError: If the change set is invalid.
+    """
+    total = len(changes.grant) + len(changes.revoke)
+    if not total:
+        raise GrantBatchError(["Expected at least one grant or revoke"])
+    if total > max_changes:
+        raise GrantBatchError([f"At most {max_changes} changes per request"])
+
+    errors = []
+    granted_pairs = {(change.user_id, change.role) for change in changes.grant}
+    for i, change in enumerate(changes.revoke):
+        if (change.user_id, change.role) in granted_pairs:
+            errors.append(f"revoke.{i}: also granted in this request")
+
+    role_names = sorted({change.role for change in (*changes.grant, *changes.revoke)})
+    role_ids = dict((await db_session.execute(
+        sqlalchemy.select(Role.name, Role.id)
+        .where(Role.name.in_(role_names), Role.active == True, Role.deleted == False)
+    )).all())
+    for action, items in (("grant", changes.grant), ("revoke", changes.revoke)):
+        for i, change in enumerate(items):
+            if change.role not in role_ids:
+                errors.append(f"{action}.{i}.role: unknown role {change.role!r}")
+
+    granted_roles = {change.role for change in changes.grant if change.role in role_ids}
+    if granted_by is not None and granted_roles:
+        # Granting a role must not give anyone (the caller included) more than the caller has on this account
+        held = await _held_permissions(granted_by, account_id, db_session)
+        required = await _role_permissions({role_ids[role] for role in granted_roles}, db_session)
+        for i, change in enumerate(changes.grant):
+            if change.role in granted_roles and not required[role_ids[change.role]] <= held:
+                errors.append(f"grant.{i}.role: role {change.role!r} has permissions you don't hold on this account")
+
+    user_ids = sorted({change.user_id for change in changes.grant})
+    known_users = set()
+    for chunk in _chunks(user_ids):
+        known_users.update((await db_session.execute(
+            sqlalchemy.select(User.id).where(User.id.in_(chunk), User.active == True, User.deleted == False)
+        )).scalars())
+    for i, change in enumerate(changes.grant):
+        if change.user_id not in known_users:
+            errors.append(f"grant.{i}.user_id: unknown user {change.user_id!r}")
+    if errors:
+        raise GrantBatchError(errors)
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    pair = sqlalchemy.tuple_(Grant.user_id, Grant.role_id)
+
+    revoke_pairs = sorted({(change.user_id, role_ids[change.role]) for change in changes.revoke})
+    revoked = set()
+    for chunk in _chunks(revoke_pairs):
+        result = await db_session.execute(
+            sqlalchemy.update(Grant)
+            .where(Grant.account_id == account_id, Grant.active == True, pair.in_(chunk))
+            .values(active=False, revoked_date=now)
+            .returning(Grant.user_id, Grant.role_id)
+            .execution_options(synchronize_session=False)
+        )
+        revoked.update(tuple(row) for row in result)
+
+    grant_pairs = sorted({(change.user_id, role_ids[change.role]) for change in changes.grant})
+    existing = set()
+    for chunk in _chunks(grant_pairs):
+        result = await db_session.execute(
+            sqlalchemy.select(Grant.user_id, Grant.role_id)
+            .where(Grant.account_id == account_id, Grant.active == True, pair.in_(chunk))
+        )
+        existing.update(tuple(row) for row in result)
+    new_grants = [
+        {"id": str(uuid.uuid4()), "user_id": user_id, "role_id": role_id, "account_id": account_id,
+         "active": True, "granted_date": now, "revoked_date": None}
+        for user_id, role_id in grant_pairs if (user_id, role_id) not in existing
+    ]
+    if new_grants:
+        await db_session.execute(sqlalchemy.insert(Grant), new_grants)
+
+    revoked_users = {user_id for user_id, _ in revoked}
+    affected = revoked_users | {grant["user_id"] for grant in new_grants}
+    if affected:
+        ChangeTracker.mark(db_session, "grant", user_ids=affected)
+        await revocations.revoke_users(db_session, revoked_users, reason="grant_revoked")
+    await db_session.commit()
+    logger.info("grants_changed account=%s granted=%d revoked=%d users=%d",
+                account_id, len(new_grants), len(revoked), len(affected))
+
+    return {
+        "grant": [
+            {"user_id": change.user_id, "role": change.role,
+             "status": ALREADY_GRANTED if (change.user_id, role_ids[change.role]) in existing else GRANTED}
+            for change in changes.grant
+        ],
+        "revoke": [
+            {"user_id": change.user_id, "role": change.role,
+             "status": REVOKED if (change.user_id, role_ids[change.role]) in revoked else NOT_GRANTED}
+            for change in changes.revoke
+        ],
+    }
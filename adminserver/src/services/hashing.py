@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+import config as cfg
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_all(passwords: list[str]) -> list[str]:
+    return [generate_password_hash(password) for password in passwords]
+
+
+class HashingQueueFull(RuntimeError):
+    """
+    Raised when the password hashing pool already has `max_pending` jobs queued or running.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug password hashing/verification in a bounded process pool so it never blocks the event loop.
+
+    Work beyond `max_pending` in-flight jobs is rejected with HashingQueueFull rather than queued without bound, so a
+    login storm degrades into fast 503s instead of unbounded latency. With `workers=0` the work runs inline
+    (scripts/tests).
+    """
+    def __init__(self, workers: int = 2, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.debug(f"Started password hashing pool with {self.workers} workers")
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HashingQueueFull(f"Password hashing queue is full ({self.pending} pending)")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password.
+        :param password: The plain-text password.
+        :return: The werkzeug password hash.
+        """
+        return await self._run(generate_password_hash, password)
+
+    async def hash_many(self, passwords: list[str], chunk_size: int = 16) -> list[str]:
+        """
+        Hash a batch of passwords (i.e. bulk provisioning) on every worker at once.
+        The batch is sent in chunks with at most one chunk per worker in flight, so logins queued meanwhile wait for
+        one chunk rather than the whole batch.
+        :param passwords: The plain-text passwords.
+        :param chunk_size: Passwords hashed per pool job.
+        :return: The werkzeug password hashes, in order.
+        """
+        if self.workers <= 0:
+            return _hash_all(passwords)
+        chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def run_chunk(chunk):
+            async with semaphore:
+                return await self._run(_hash_all, chunk)
+
+        hashed = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+        return [password_hash for chunk in hashed for password_hash in chunk]
+
+    async def verify(self, password_hash: str, password: str) -> bool:
+        """
+        Check a password against a stored hash.
+        :param password_hash: The stored werkzeug password hash.
+        :param password: The plain-text password to check.
+        :return: True if the password matches, False otherwise.
+        """
+        return await self._run(check_password_hash, password_hash, password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=cfg.PASSWORD_HASH_WORKERS,
+    max_pending=cfg.PASSWORD_HASH_MAX_PENDING
+)
@@ -0,0 +1,221 @@
+import time
+import uuid
+import asyncio
+import smtplib
+import logging
+import datetime
+from email.message import EmailMessage
+from typing import Callable
+import sqlalchemy
+import config as cfg
+from src.db import get_session
+from src.models.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def smtp_connection() -> smtplib.SMTP:
+    """Open and authenticate a connection to the configured SMTP server (blocking)."""
+    server = smtplib.SMTP_SSL(cfg.SMTP_SERVER, cfg.SMTP_PORT, timeout=cfg.SMTP_TIMEOUT_SECONDS)
+    server.login(cfg.EMAIL_ADDRESS, cfg.EMAIL_PASSWORD)
+    return server
+
+
+class SMTPConnectionPool:
+    """
+    Authenticated SMTP connections reused across sends.
+
+    smtplib is blocking, so connecting, sending and closing all run in worker threads. A connection idle for longer
+    than `max_idle` seconds is replaced rather than reused, since servers drop idle sessions; one that fails
+    mid-send is discarded.
+    """
+    def __init__(self, factory: Callable[[], smtplib.SMTP] = smtp_connection, size: int = 2, max_idle: float = 60):
+        self.factory = factory
+        self.size = size
+        self.max_idle = max_idle
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self.connects = 0
+
+    async def _acquire(self) -> smtplib.SMTP:
+        while self._idle:
+            connection, released = self._idle.pop()
+            if time.monotonic() - released <= self.max_idle:
+                return connection
+            await asyncio.to_thread(self._close, connection)
+        self.connects += 1
+        return await asyncio.to_thread(self.factory)
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    async def send(self, sender: str, recipient: str, message: str):
+        """
+        Send one message over a pooled connection; SMTP errors are raised to the caller.
+        """
+        async with self._slots:
+            connection = await self._acquire()
+            try:
+                await asyncio.to_thread(connection.sendmail, sender, recipient, message)
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server rejected this message; the session itself is still good
+                self._idle.append((connection, time.monotonic()))
+                raise
+            except BaseException:
+                await asyncio.to_thread(self._close, connection)
+                raise
+            self._idle.append((connection, time.monotonic()))
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            await asyncio.to_thread(self._close, connection)
+
+
+class OutboxWorker:
+    """
+    Background delivery of the email_outbox table.
+
+    Requests only insert a row (`enqueue`) and return. The worker claims due rows in batches of `batch_size`, sends
+    them concurrently over `pool`, and records the outcome of the whole batch in one transaction. Failed sends are
+    retried with exponential backoff from `backoff` seconds, up to `max_attempts`; permanent (5xx) SMTP errors fail
+    the message at once. Claims expire after `lease` seconds, so a batch held by a crashed worker is picked up again.
+    """
+    def __init__(self,
+                 pool: SMTPConnectionPool | None = None,
+                 session_factory=get_session,
+                 sender: str = cfg.EMAIL_ADDRESS,
+                 batch_size: int = 50,
+                 poll_interval: float = 5,
+                 max_attempts: int = 8,
+                 backoff: float = 30,
+                 lease: float = 300):
+        self.pool = pool if pool is not None else SMTPConnectionPool()
+        self.session_factory = session_factory
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.failed = 0
+
+    async def enqueue(self, message: EmailMessage, recipient: str) -> str:
+        """
+        Persist a message for delivery and wake the worker.
+        :return: The outbox entry ID.
+        """
+        entry = EmailOutbox(recipient=recipient, subject=message["Subject"], message=message.as_string())
+        async with self.session_factory() as session:
+            session.add(entry)
+            await session.commit()
+        self._wake.set()
+        return entry.id
+
+    async def _claim(self, session, now: datetime.datetime) -> list[EmailOutbox]:
+        claim = str(uuid.uuid4())
+        due = (
+            sqlalchemy.select(EmailOutbox.id)
+            .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_date <= now)
+            .order_by(EmailOutbox.next_attempt_date)
+            .limit(self.batch_size)
+        )
+        # Claiming pushes next_attempt_date out by the lease, so the rows are no longer due for other workers
+        await session.execute(
+            sqlalchemy.update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due.scalar_subquery()), EmailOutbox.next_attempt_date <= now)
+            .values(claim=claim, next_attempt_date=now + datetime.timedelta(seconds=self.lease))
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(sqlalchemy.select(EmailOutbox).where(EmailOutbox.claim == claim))
+        batch = list(result.scalars())
+        # Commit the claim and release the connection before the (slow) sends
+        await session.commit()
+        return batch
+
+    async def _deliver(self, entry: EmailOutbox) -> Exception | None:
+        try:
+            await self.pool.send(self.sender, entry.recipient, entry.message)
+        except (smtplib.SMTPException, OSError) as exc:
+            return exc
+        return None
+
+    def _record(self, entry: EmailOutbox, error: Exception | None, now: datetime.datetime):
+        entry.claim = None
+        entry.attempts += 1
+        if error is None:
+            entry.status = "sent"
+            entry.sent_date = now
+            entry.last_error = None
+            self.sent += 1
+            return
+        entry.last_error = str(error)[:255]
+        permanent = isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+        if permanent or isinstance(error, smtplib.SMTPRecipientsRefused) or entry.attempts >= self.max_attempts:
+            entry.status = "failed"
+            self.failed += 1
+            logger.warning("email_failed id=%s attempts=%d error=%s", entry.id, entry.attempts, entry.last_error)
+        else:
+            delay = self.backoff * 2 ** (entry.attempts - 1)
+            entry.next_attempt_date = now + datetime.timedelta(seconds=delay)
+
+    async def run_once(self) -> int:
+        """
+        Claim and deliver one batch of due messages.
+        :return: Number of messages attempted.
+        """
+        async with self.session_factory() as session:
+            batch = await self._claim(session, datetime.datetime.now(tz=datetime.timezone.utc))
+            if not batch:
+                return 0
+            errors = await asyncio.gather(*(self._deliver(entry) for entry in batch))
+            now = datetime.datetime.now(tz=datetime.timezone.utc)
+            for entry, error in zip(batch, errors):
+                self._record(entry, error, now)
+            await session.commit()
+        logger.debug("outbox_batch size=%d errors=%d", len(batch), sum(error is not None for error in errors))
+        return len(batch)
+
+    async def drain(self) -> int:
+        """Deliver batches until nothing is due. Returns the number of messages attempted."""
+        total = 0
+        while (attempted := await self.run_once()):
+            total += attempted
+        return total
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self.drain()
+            except Exception as exc:
+                logger.exception("outbox_batch_failed error=%s", exc)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        await self.pool.close()
+
+
+email_outbox = OutboxWorker(
+    pool=SMTPConnectionPool(size=cfg.SMTP_POOL_SIZE),
+    batch_size=cfg.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=cfg.EMAIL_OUTBOX_POLL_SECONDS,
+    max_attempts=cfg.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    backoff=cfg.EMAIL_OUTBOX_BACKOFF_SECONDS
+)
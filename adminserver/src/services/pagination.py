@@ -0,0 +1,93 @@
+"""
+Keyset pagination for list endpoints.
+
+A page is selected with `WHERE (created_date, id) > (<last row>) ORDER BY created_date, id LIMIT n`, which an index on
+(created_date, id) answers by seeking straight to the last row, so page 1000 costs the same as page 1. The position is
+handed to clients as an opaque `next` cursor rather than an offset.
+"""
+import base64
+import datetime
+import json
+import sqlalchemy
+
+ASCENDING = "asc"
+DESCENDING = "desc"
+
+
+class InvalidPageRequest(ValueError):
+    """A malformed `limit`, `order` or `cursor` parameter."""
+
+
+def encode_cursor(order: str, created_date: datetime.datetime, row_id: str) -> str:
+    raw = json.dumps([order, created_date.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, datetime.datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        order, created_date, row_id = json.loads(raw)
+        if order not in (ASCENDING, DESCENDING) or not isinstance(row_id, str):
+            raise ValueError(order)
+        return order, datetime.datetime.fromisoformat(created_date), row_id
+    except (ValueError, TypeError) as exc:
+        raise InvalidPageRequest("Invalid cursor") from exc
+
+
+class PageRequest:
+    """
+    The `limit`, `order` and `cursor` of one page.
+    :param limit: Maximum number of rows in the page.
+    :param order: ASCENDING (oldest first) or DESCENDING.
+    :param after: (created_date, id) of the last row of the previous page, or None for the first page.
+    """
+    def __init__(self, limit: int, order: str = ASCENDING, after: tuple[datetime.datetime, str] | None = None):
+        self.limit = limit
+        self.order = order
+        self.after = after
+
+    @classmethod
+    def from_args(cls, args, default_limit: int = 100, max_limit: int = 1000) -> "PageRequest | None":
+        """
+        Parse the query string. A cursor carries its own order, so later pages only need `cursor` (and `limit`).
+        :return: The page request, or None when neither `limit` nor `cursor` is given (an unpaginated listing).
+        """
+        if "limit" not in args and "cursor" not in args:
+            return None
+        try:
+            limit = int(args.get("limit", default_limit))
+        except ValueError:
+            raise InvalidPageRequest("limit must be an integer") from None
+        if not 1 <= limit <= max_limit:
+            raise InvalidPageRequest(f"limit must be between 1 and {max_limit}")
+        if args.get("cursor"):
+            order, created_date, row_id = decode_cursor(args["cursor"])
+            return cls(limit, order, (created_date, row_id))
+        order = args.get("order", ASCENDING)
+        if order not in (ASCENDING, DESCENDING):
+            raise InvalidPageRequest(f"order must be {ASCENDING!r} or {DESCENDING!r}")
+        return cls(limit, order)
+
+    def apply(self, query, created_column, id_column):
+        """
+        Restrict `query` to this page. One row more than the limit is fetched to tell whether another page follows.
+        """
+        key = sqlalchemy.tuple_(created_column, id_column)
+        if self.order == DESCENDING:
+            if self.after is not None:
+                query = query.where(key < self.after)
+            query = query.order_by(created_column.desc(), id_column.desc())
+        else:
+            if self.after is not None:
+                query = query.where(key > self.after)
+            query = query.order_by(created_column, id_column)
+        return query.limit(self.limit + 1)
+
+    def split(self, rows: list) -> tuple[list, str | None]:
+        """
+        Split the rows fetched by `apply` into the page and the cursor of the next one (None on the last page).
+        """
+        if len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        return rows, encode_cursor(self.order, rows[-1].created_date, rows[-1].id)
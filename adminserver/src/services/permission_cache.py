@@ -0,0 +1,94 @@
+import time
+import logging
+from collections import OrderedDict
+import config as cfg
+from src.services.change_tracker import ChangeTracker, change_tracker
+
+logger = logging.getLogger(__name__)
+
+
+class PermissionCache:
+    """
+    Bounded LRU cache of per-user token claims (identity + permissions by account) used when issuing tokens.
+
+    Entries are stamped with the change-tracker version of the tables the claims are built from, so any committed
+    change to a user, grant, role, permission or role_permission row makes every older entry stale. The TTL bounds
+    how long a change made by another worker process can go unnoticed.
+    """
+    tables = ("user", "grant", "role", "permission", "role_permission")
+
+    def __init__(self, tracker: ChangeTracker, max_size: int = 10000, ttl: float = 300):
+        self.tracker = tracker
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def version(self) -> tuple[int, ...]:
+        """
+        Read the version *before* loading claims from the database and pass it to `put`, so a change committed
+        while the claims were being loaded leaves the entry stale rather than current.
+        """
+        return self.tracker.version(*self.tables)
+
+    def get(self, user_id: str) -> dict | None:
+        """
+        Get the cached claims for a user.
+        :param user_id: The user ID.
+        :return: The claims dict, or None if missing, stale or expired.
+        """
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            version, expires, claims = entry
+            if version == self.version and expires > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return claims
+            del self._entries[user_id]
+        self.misses += 1
+        return None
+
+    def put(self, user_id: str, claims: dict, version: tuple[int, ...]):
+        """
+        Store claims for a user.
+        :param user_id: The user ID.
+        :param claims: The claims dict to cache.
+        :param version: The `version` read before the claims were loaded.
+        """
+        if self.max_size <= 0:
+            return
+        self._entries[user_id] = (version, time.monotonic() + self.ttl, claims)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str | None = None):
+        """
+        Drop the cached claims of a single user, or of every user when no ID is given.
+        """
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+
+permission_cache = PermissionCache(
+    change_tracker,
+    max_size=cfg.PERMISSION_CACHE_SIZE,
+    ttl=cfg.PERMISSION_CACHE_TTL_SECONDS
+)
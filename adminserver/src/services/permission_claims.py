@@ -0,0 +1,90 @@
+"""
+Encoding and checking of the permission claims carried in access tokens.
+
+Two formats are supported:
+- full (default): `"permissions": {account_id: [permission names]}`
+- compact: `"pm": {"v": <registry version>, "n": [permission names], "a": {account_id: <bitmask>}}`, where bit `i` of a
+  mask is permission `n[i]` and `v` is a digest of `n`. In "active" mode `a` only carries the token's own account.
+
+Consumers decode `n` once per registry version, so permission checks become a dict lookup and a bitwise AND.
+"""
+import hashlib
+
+FULL = "full"
+COMPACT = "compact"
+ACTIVE = "active"
+FORMATS = (FULL, COMPACT, ACTIVE)
+
+
+def registry_version(names: tuple[str, ...]) -> str:
+    return hashlib.sha1("\n".join(names).encode("utf-8")).hexdigest()[:12]
+
+
+def encode_permissions(permissions: dict[str, list[str]], fmt: str = FULL, account_id: str | None = None) -> dict:
+    """
+    Build the permission claims for a token.
+    :param permissions: Permission names by account ID, as returned by User.get_permissions.
+    :param fmt: One of FORMATS.
+    :param account_id: The token's active account, required for the "active" format.
+    :return: Dict of claims to merge into the token payload.
+    """
+    if fmt == FULL:
+        return {"permissions": permissions}
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown permission claim format {fmt!r}")
+    if fmt == ACTIVE:
+        permissions = {account_id: permissions.get(account_id, [])}
+    names = tuple(sorted({name for account_permissions in permissions.values() for name in account_permissions}))
+    bits = {name: 1 << i for i, name in enumerate(names)}
+    masks = {}
+    for account, account_permissions in permissions.items():
+        mask = 0
+        for name in account_permissions:
+            mask |= bits[name]
+        masks[account] = mask
+    return {"pm": {"v": registry_version(names), "n": list(names), "a": masks}}
+
+
+# Bit index per registry version; versions are digests of the names, so an entry never goes stale
+_bit_indexes: dict[str, dict[str, int]] = {}
+# Mask of the permissions a check requires, per (registry version, required permissions)
+_required_masks = {}
+_MAX_REGISTRIES = 1024
+
+
+def _bit_index(version: str, names: list[str]) -> dict[str, int]:
+    index = _bit_indexes.get(version)
+    if index is None:
+        if len(_bit_indexes) >= _MAX_REGISTRIES:
+            _bit_indexes.clear()
+        index = _bit_indexes[version] = {name: 1 << i for i, name in enumerate(names)}
+    return index
+
+
+def has_any_permission(claims: dict, account_id, required) -> bool:
+    """
+    Check whether the token grants any of the required permissions on an account, for either claim format.
+    :param claims: The verified token payload.
+    :param account_id: The account to check.
+    :param required: Iterable of permission names; any one of them is sufficient.
+    :return: True if at least one of the required permissions is granted.
+    """
+    compact = claims.get("pm")
+    if compact is not None:
+        mask = compact["a"].get(str(account_id), 0)
+        if not mask:
+            return False
+        required = tuple(required)
+        key = (compact["v"], required)
+        required_mask = _required_masks.get(key)
+        if required_mask is None:
+            index = _bit_index(compact["v"], compact["n"])
+            required_mask = 0
+            for permission in required:
+                required_mask |= index.get(permission, 0)
+            if len(_required_masks) >= _MAX_REGISTRIES:
+                _required_masks.clear()
+            _required_masks[key] = required_mask
+        return bool(mask & required_mask)
+    user_permissions = (claims.get("permissions") or {}).get(str(account_id)) or []
+    return any(permission in user_permissions for permission in required)
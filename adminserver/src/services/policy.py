@@ -0,0 +1,262 @@
+"""
+Compiled authorization policy: permissions, roles and per-endpoint rules.
+
+The policy document is the single source of truth for authorization in every service. adminserver builds it from the
+permission, role and policy_rule tables and publishes it at /auth/.well-known/policy.json:
+
+    {"version": "<digest>",
+     "permissions": ["account.read", ...],
+     "roles": {"admin": ["account.read", ...]},
+     "rules": [{"service": "adminserver", "method": "GET", "path": "/api/v1/account",
+                "permissions": ["account.read", "role:admin"], "attributes": {"type": ["user"]}}]}
+
+A rule grants access to a route (`path` is the route template) if the token holds any of its permissions on its
+account, or every permission of a `role:<name>` entry, and its claims match every `attributes` entry. Endpoints
+without a rule keep the permissions named in their `require_permissions` decorator.
+
+`Policy` compiles a document once: each permission name is interned to a bit, roles and rules become bitmasks, and
+rules are looked up by (method, path). A decision is a dict lookup and a few bitwise ANDs; the bitmask of a token's
+permissions is memoized per distinct permission set, so tokens in either claim format cost the same.
+"""
+import json
+import asyncio
+import hashlib
+import logging
+import sqlalchemy
+import sqlalchemy.orm
+import config as cfg
+from src.db import get_session
+from src.models.models import Permission, Role, PolicyRule
+from src.services.change_tracker import ChangeTracker, change_tracker
+from src.services.permission_claims import has_any_permission
+
+logger = logging.getLogger(__name__)
+
+ROLE_PREFIX = "role:"
+_MAX_MEMO = 4096
+
+
+def policy_version(document: dict) -> str:
+    """Digest of a policy document's content (its `version` excluded)."""
+    content = {key: value for key, value in document.items() if key != "version"}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()[:12]
+
+
+class Rule:
+    """A compiled rule: any permission in `any_mask`, or all of one of `role_masks`, with matching claims."""
+    __slots__ = ("any_mask", "role_masks", "attributes", "open")
+
+    def __init__(self, any_mask: int, role_masks: tuple[int, ...], attributes: tuple, open: bool):
+        self.any_mask = any_mask
+        self.role_masks = role_masks
+        self.attributes = attributes
+        self.open = open
+
+    def allows(self, mask: int, claims: dict) -> bool:
+        for claim, values in self.attributes:
+            if str(claims.get(claim)) not in values:
+                return False
+        if self.open or mask & self.any_mask:
+            return True
+        for role_mask in self.role_masks:
+            if mask & role_mask == role_mask:
+                return True
+        return False
+
+
+class Policy:
+    """
+    An immutable compiled policy document. Only the rules for `service` are compiled (all of them if None).
+    """
+    def __init__(self, document: dict, service: str | None = None):
+        self.document = document
+        self.version = document.get("version") or policy_version(document)
+        self.bits = {name: 1 << i for i, name in enumerate(document.get("permissions", []))}
+        self.role_masks = {role: self.mask(names) for role, names in document.get("roles", {}).items()}
+        self.rules = {
+            (rule["method"].upper(), rule["path"]): self.compile(rule.get("permissions", []), rule.get("attributes"))
+            for rule in document.get("rules", [])
+            if service is None or rule.get("service") in (None, service)
+        }
+        self._defaults = {}
+        self._name_masks = {}
+        self._compact_masks = {}
+
+    def mask(self, names) -> int:
+        mask = 0
+        for name in names:
+            mask |= self.bits.get(name, 0)
+        return mask
+
+    def compile(self, entries, attributes: dict | None = None) -> Rule:
+        names = [entry for entry in entries if not entry.startswith(ROLE_PREFIX)]
+        # A role that grants nothing can't be held in full; leave it out rather than let it match everyone
+        role_masks = tuple(mask for entry in entries if entry.startswith(ROLE_PREFIX)
+                           if (mask := self.role_masks.get(entry[len(ROLE_PREFIX):], 0)))
+        compiled_attributes = tuple((claim, frozenset(map(str, values))) for claim, values in (attributes or {}).items())
+        return Rule(self.mask(names), role_masks, compiled_attributes, open=not entries)
+
+    def _default_rule(self, required: tuple[str, ...]) -> Rule:
+        rule = self._defaults.get(required)
+        if rule is None:
+            unknown = [name for name in required if name not in self.bits and not name.startswith(ROLE_PREFIX)]
+            if unknown:
+                logger.warning("policy_unknown_permissions names=%s version=%s", unknown, self.version)
+            rule = self._defaults[required] = Rule(self.mask(required), (), (), open=False)
+        return rule
+
+    def user_mask(self, claims: dict, account_id) -> int:
+        """The policy bitmask of the permissions the token grants on an account, for either claim format."""
+        compact = claims.get("pm")
+        if compact is not None:
+            claim_mask = compact["a"].get(str(account_id), 0)
+            key = (compact["v"], claim_mask)
+            mask = self._compact_masks.get(key)
+            if mask is None:
+                names = compact["n"]
+                mask = self.mask(names[i] for i in range(len(names)) if claim_mask >> i & 1)
+                if len(self._compact_masks) >= _MAX_MEMO:
+                    self._compact_masks.clear()
+                self._compact_masks[key] = mask
+            return mask
+        names = (claims.get("permissions") or {}).get(str(account_id)) or ()
+        key = tuple(names)
+        mask = self._name_masks.get(key)
+        if mask is None:
+            if len(self._name_masks) >= _MAX_MEMO:
+                self._name_masks.clear()
+            mask = self._name_masks[key] = self.mask(names)
+        return mask
+
+    def allows(self, claims: dict, account_id, method: str, path: str, default: tuple[str, ...] | None = None) -> bool:
+        """
+        Decide whether a token may call an endpoint.
+        :param method: The request method.
+        :param path: The matched route template.
+        :param default: Permissions required when the endpoint has no rule; None allows any authenticated token.
+        """
+        rule = self.rules.get(("GET" if method == "HEAD" else method, path))
+        if rule is None:
+            if default is None:
+                return True
+            rule = self._default_rule(default)
+        return rule.allows(self.user_mask(claims, account_id), claims)
+
+
+class PolicyEngine:
+    """
+    The current Policy for this service, rebuilt from the database and swapped in with a single assignment, so a
+    decision sees either the old or the new policy, never a mix.
+
+    Commits in this process that touch a policy table reload it right away (via the change tracker); changes made by
+    other worker processes are picked up every `reload_interval` seconds. Until the first load, decisions fall back to
+    the permissions named by the endpoint, checked directly against the token.
+    """
+    tables = frozenset({"permission", "role", "role_permission", "policy_rule"})
+
+    def __init__(self,
+                 service: str = "adminserver",
+                 reload_interval: float = 60,
+                 session_factory=get_session,
+                 tracker: ChangeTracker = change_tracker):
+        self.service = service
+        self.reload_interval = reload_interval
+        self.session_factory = session_factory
+        self.tracker = tracker
+        self.policy: Policy | None = None
+        self._task: asyncio.Task | None = None
+        self._pending: asyncio.Task | None = None
+        self._dirty = False
+        self._subscribed = False
+
+    @staticmethod
+    async def load_document(db_session) -> dict:
+        """Build the policy document from the active permissions, roles and rules."""
+        permissions = (await db_session.execute(
+            sqlalchemy.select(Permission.name)
+            .where(Permission.active == True, Permission.deleted == False)
+            .order_by(Permission.name)
+        )).scalars().all()
+        roles = (await db_session.execute(
+            sqlalchemy.select(Role)
+            .where(Role.active == True, Role.deleted == False)
+            .options(sqlalchemy.orm.selectinload(Role.permissions))
+            .order_by(Role.name)
+        )).scalars().all()
+        rules = (await db_session.execute(
+            sqlalchemy.select(PolicyRule)
+            .where(PolicyRule.active == True)
+            .order_by(PolicyRule.service, PolicyRule.path, PolicyRule.method)
+        )).scalars().all()
+        document = {
+            "permissions": list(permissions),
+            "roles": {role.name: sorted(p.name for p in role.permissions if p.active and not p.deleted) for role in roles},
+            "rules": [rule.to_policy() for rule in rules],
+        }
+        document["version"] = policy_version(document)
+        return document
+
+    async def reload(self) -> bool:
+        """
+        Rebuild the policy from the database.
+        :return: True if the policy changed.
+        """
+        async with self.session_factory() as session:
+            document = await self.load_document(session)
+        if self.policy is not None and self.policy.version == document["version"]:
+            return False
+        self.policy = Policy(document, self.service)
+        logger.info("policy_loaded version=%s permissions=%d rules=%d",
+                    self.policy.version, len(self.policy.bits), len(self.policy.rules))
+        return True
+
+    def allows(self, claims: dict, account_id, method: str, path: str, default: tuple[str, ...] | None = None) -> bool:
+        """Policy.allows against the current policy; see the class docstring for the fallback before it is loaded."""
+        policy = self.policy
+        if policy is None:
+            return default is None or has_any_permission(claims, account_id, default)
+        return policy.allows(claims, account_id, method, path, default)
+
+    def _on_change(self, tables: frozenset, context: dict):
+        if not tables & self.tables:
+            return
+        self._dirty = True
+        if self._pending and not self._pending.done():
+            return  # The running reload goes round again for this change
+        try:
+            self._pending = asyncio.get_running_loop().create_task(self._reload_changes())
+        except RuntimeError:
+            pass  # No running loop; the periodic reload will pick the change up
+
+    async def _reload_changes(self):
+        while self._dirty:
+            self._dirty = False
+            await self._reload_logged()
+
+    async def _reload_logged(self):
+        try:
+            await self.reload()
+        except Exception as exc:
+            logger.warning("policy_reload_failed error=%s version=%s", exc, self.policy and self.policy.version)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self._reload_logged()
+
+    async def start(self):
+        """Load the policy, then keep it current."""
+        await self._reload_logged()
+        if not self._subscribed:
+            self.tracker.subscribe(self._on_change)
+            self._subscribed = True
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._pending):
+            if task and not task.done():
+                task.cancel()
+        self._task = self._pending = None
+
+
+policy_engine = PolicyEngine(service="adminserver", reload_interval=cfg.POLICY_RELOAD_SECONDS)
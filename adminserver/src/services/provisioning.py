@@ -0,0 +1,172 @@
+"""
+Bulk user provisioning (POST /api/v1/user/bulk).
+
+Every row is validated before anything is written: its schema (BulkUserInput), duplicate usernames and emails within
+the request and in the database, and the roles it asks for, which must exist and, as when granting roles (see
+grant_batch), carry only permissions the caller holds on the account. The read transaction is then ended, passwords of
+the valid rows are hashed across the password hashing pool (at most `max_passwords` per request), and the users, their
+primary emails and their grants on the account are inserted in one new transaction with batched multi-row INSERTs.
+Rows that fail validation are reported and skipped; the others are created together or not at all.
+"""
+import uuid
+import logging
+import datetime
+import pydantic
+import sqlalchemy
+import config as cfg
+from src.models.models import User, Email, Grant, Role, UNUSABLE_PASSWORD
+from src.services.grant_batch import _held_permissions, _role_permissions
+from src.services.hashing import PasswordHasher, password_hasher
+from src.services.schema import BulkUserInput, validation_errors
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+INVALID = "invalid"
+# Values per IN (...) lookup, below SQLite's bound parameter limit
+_LOOKUP_CHUNK = 500
+
+
+class BulkRequestError(ValueError):
+    """
+    Raised when a bulk request as a whole can't be processed (not a list of rows, too many rows).
+    """
+
+
+class TooManyPasswords(BulkRequestError):
+    """
+    Raised when a bulk request carries more plain-text passwords than can be hashed within a request.
+    """
+
+
+async def _existing(column, values: set[str], db_session) -> set[str]:
+    """The given values already present in a column, looked up in chunks."""
+    values = sorted(values)
+    found = set()
+    for i in range(0, len(values), _LOOKUP_CHUNK):
+        result = await db_session.execute(sqlalchemy.select(column).where(column.in_(values[i:i + _LOOKUP_CHUNK])))
+        found.update(result.scalars())
+    return found
+
+
+async def provision_users(rows: list,
+                          account_id: str,
+                          db_session,
+                          granted_by: str | None = None,
+                          hasher: PasswordHasher = password_hasher,
+                          max_rows: int = cfg.BULK_USER_MAX,
+                          max_passwords: int = cfg.BULK_PASSWORD_MAX,
+                          batch_size: int = cfg.BULK_INSERT_BATCH_SIZE) -> list[dict]:
+    """
+    Validate and create a batch of users with their grants on an account, committing once.
+    :param rows: The raw rows of the request.
+    :param account_id: The account the users' roles are granted on.
+    :param granted_by: ID of the user making the request; rows may only ask for roles whose permissions they hold on
+        the account. None for trusted internal callers only (no check).
+    :param hasher: Password hashing pool.
+    :param max_passwords: Most rows with a plain-text password.
+    :param batch_size: Rows per INSERT statement.
+    :return: One result per row, in order: {"index", "username", "status": "created", "id"} or
+        {"index", "username", "status": "invalid", "errors": [...]}.
+    :raises BulkRequestError: If `rows` isn't a non-empty list of at most `max_rows` rows.
+    :raises TooManyPasswords: If more than `max_passwords` rows carry a plain-text password.
+    """
+    if not isinstance(rows, list) or not rows:
+        raise BulkRequestError("Expected a non-empty list of users")
+    if len(rows) > max_rows:
+        raise BulkRequestError(f"At most {max_rows} users per request")
+    if sum(1 for row in rows if isinstance(row, dict) and row.get("password") is not None) > max_passwords:
+        raise TooManyPasswords(f"At most {max_passwords} users with a plain-text password per request; "
+                               f"send password_hash or split the request")
+
+    results = []
+    valid: dict[int, BulkUserInput] = {}
+    for index, row in enumerate(rows):
+        username = row.get("username") if isinstance(row, dict) else None
+        results.append({"index": index, "username": username})
+        try:
+            valid[index] = BulkUserInput.model_validate(row)
+        except pydantic.ValidationError as exc:
+            results[index].update(status=INVALID, errors=validation_errors(exc))
+
+    def reject(index: int, message: str):
+        if index in valid:
+            del valid[index]
+            results[index].update(status=INVALID, errors=[message])
+
+    # Duplicates within the request: the first occurrence wins
+    seen_names, seen_emails = set(), set()
+    for index, user in list(valid.items()):
+        if user.username in seen_names:
+            reject(index, "username: duplicate in request")
+        elif user.email and user.email in seen_emails:
+            reject(index, "email: duplicate in request")
+        else:
+            seen_names.add(user.username)
+            if user.email:
+                seen_emails.add(user.email)
+
+    taken_names = await _existing(User.name, {user.username for user in valid.values()}, db_session)
+    taken_emails = await _existing(Email.email, {user.email for user in valid.values() if user.email}, db_session)
+    role_names = sorted({role for user in valid.values() for role in user.roles})
+    role_ids = {}
+    if role_names:
+        result = await db_session.execute(
+            sqlalchemy.select(Role.name, Role.id)
+            .where(Role.name.in_(role_names), Role.active == True, Role.deleted == False)
+        )
+        role_ids = dict(result.all())
+    denied_roles = set()
+    if granted_by is not None and role_ids:
+        # New users must not get more than the caller has on this account
+        held = await _held_permissions(granted_by, account_id, db_session)
+        required = await _role_permissions(set(role_ids.values()), db_session)
+        denied_roles = {role for role, role_id in role_ids.items() if not required[role_id] <= held}
+    for index, user in list(valid.items()):
+        unknown = [role for role in user.roles if role not in role_ids]
+        denied = [role for role in dict.fromkeys(user.roles) if role in denied_roles]
+        if user.username in taken_names:
+            reject(index, "username: already exists")
+        elif user.email in taken_emails:
+            reject(index, "email: already exists")
+        elif unknown:
+            reject(index, f"roles: unknown roles {unknown}")
+        elif denied:
+            reject(index, f"roles: {denied} have permissions you don't hold on this account")
+    # End the read transaction so the pooled connection isn't held while waiting on the hashing pool; users created
+    # concurrently meanwhile fail the inserts below with an IntegrityError
+    await db_session.commit()
+
+    if valid:
+        to_hash = [index for index, user in valid.items() if user.password is not None]
+        hashes = dict(zip(to_hash, await hasher.hash_many([valid[index].password for index in to_hash])))
+
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        users, emails, grants = [], [], []
+        for index, user in valid.items():
+            user_id = str(uuid.uuid4())
+            users.append({
+                "id": user_id, "name": user.username, "type": user.type, "display_name": user.display_name,
+                "personal_name": user.personal_name, "family_names": None, "active": True, "deleted": False,
+                "created_date": now, "modified_date": now,
+                "password": hashes.get(index) or user.password_hash or UNUSABLE_PASSWORD,
+            })
+            if user.email:
+                emails.append({
+                    "id": str(uuid.uuid4()), "email": user.email, "user_id": user_id, "primary": True,
+                    "active": True, "deleted": False, "validated": False, "created_date": now,
+                })
+            for role in dict.fromkeys(user.roles):
+                grants.append({
+                    "id": str(uuid.uuid4()), "user_id": user_id, "account_id": account_id, "role_id": role_ids[role],
+                    "active": True, "granted_date": now, "revoked_date": None,
+                })
+            results[index].update(status=CREATED, id=user_id)
+
+        for model, values in ((User, users), (Email, emails), (Grant, grants)):
+            for i in range(0, len(values), batch_size):
+                await db_session.execute(sqlalchemy.insert(model), values[i:i + batch_size])
+        await db_session.commit()
+        logger.info("users_provisioned account=%s created=%d invalid=%d grants=%d",
+                    account_id, len(users), len(rows) - len(users), len(grants))
+    return results
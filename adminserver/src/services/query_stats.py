@@ -0,0 +1,129 @@
+import re
+import time
+import logging
+from collections import Counter
+from contextvars import ContextVar
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncEngine
+import config as cfg
+
+logger = logging.getLogger(__name__)
+
+# Parenthesised lists of bind placeholders (?, :name, %(name)s, $1), i.e. expanded IN lists
+_BIND_LIST = re.compile(r"\(\s*(?:\?|:\w+|%\(\w+\)s|\$\d+)(?:\s*,\s*(?:\?|:\w+|%\(\w+\)s|\$\d+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with IN lists collapsed, so one selectin load per parent batch has one shape."""
+    return _BIND_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class RequestQueryStats:
+    """
+    The SQL statements run on behalf of one request: count, total time, slowest statement and count per shape.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """
+        Statement shapes run more than `threshold` times, most frequent first.
+        """
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def headers(self) -> dict:
+        return {
+            "X-DB-Query-Count": str(self.count),
+            "X-DB-Time-Ms": f"{self.total_time * 1000:.2f}",
+            "X-DB-Slowest-Ms": f"{self.slowest_time * 1000:.2f}",
+        }
+
+
+class QueryInstrumentation:
+    """
+    Per-request SQL statistics from SQLAlchemy cursor events.
+
+    `begin` puts a RequestQueryStats into a context variable and the engine listeners add every statement executed
+    in that context to it. SQLAlchemy's asyncio layer runs the sync engine in a greenlet that shares the calling
+    task's context, so the statements of concurrent requests never mix. Statements run outside a request
+    (background workers, startup) are not recorded.
+    """
+    def __init__(self, repeat_threshold: int = 10, slow_request_ms: float = 500):
+        self.repeat_threshold = repeat_threshold
+        self.slow_request_ms = slow_request_ms
+        self._current: ContextVar[RequestQueryStats | None] = ContextVar("request_query_stats", default=None)
+        self._engines = set()
+
+    @property
+    def current(self) -> RequestQueryStats | None:
+        return self._current.get()
+
+    def install(self, engine):
+        sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        if sync_engine in self._engines:
+            return
+        sqlalchemy.event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        sqlalchemy.event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        self._engines.add(sync_engine)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._current.get() is not None:
+            # On the execution context, not the pooled connection: a statement that raises never reaches
+            # after_cursor_execute
+            context.query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._current.get()
+        started = getattr(context, "query_started", None)
+        if stats is not None and started is not None:
+            stats.record(statement, time.perf_counter() - started)
+
+    def begin(self) -> RequestQueryStats:
+        stats = RequestQueryStats()
+        self._current.set(stats)
+        return stats
+
+    def end(self, method: str, path: str, status: int) -> RequestQueryStats | None:
+        """
+        Stop recording for the current request, logging it if it was slow or repeated a statement shape.
+        :return: The request's stats, or None if `begin` was not called.
+        """
+        stats = self._current.get()
+        if stats is None:
+            return None
+        self._current.set(None)
+        elapsed_ms = stats.elapsed * 1000
+        if elapsed_ms >= self.slow_request_ms:
+            logger.warning(
+                "slow_request method=%s path=%s status=%s duration_ms=%.1f queries=%d db_ms=%.1f slowest_ms=%.1f "
+                "slowest=%r", method, path, status, elapsed_ms, stats.count, stats.total_time * 1000,
+                stats.slowest_time * 1000, stats.slowest_statement
+            )
+        for shape, count in stats.repeated(self.repeat_threshold):
+            logger.warning("repeated_query method=%s path=%s count=%d statement=%r (possible N+1)",
+                           method, path, count, shape)
+        return stats
+
+
+query_stats = QueryInstrumentation(
+    repeat_threshold=cfg.QUERY_REPEAT_THRESHOLD,
+    slow_request_ms=cfg.SLOW_REQUEST_MS
+)
@@ -0,0 +1,119 @@
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+from quart import Response, request
+import config as cfg
+from src.db import get_session
+from src.services.change_tracker import ChangeTracker, change_tracker
+from src.services.serializers import dumps
+
+logger = logging.getLogger(__name__)
+
+
+def content_etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of encoded JSON bodies for rarely changing GET endpoints, with content ETags.
+
+    Entries are stamped with the change-tracker version of the tables the body was built from, so any committed
+    write to those tables (create/update/delete of roles, accounts, ...) makes them stale; the TTL bounds how long a
+    change made by another worker process can go unnoticed. The ETag is a hash of the body, so it is the same in
+    every worker and a client revalidating against another worker still gets a 304 when nothing changed.
+
+    Bodies are built on a primary session from `session_factory`, never on the request's session: GETs may read from
+    a replica, and a body read from a lagging replica would be cached under the version that follows the write.
+    """
+    def __init__(self, tracker: ChangeTracker, max_size: int = 1024, ttl: float = 60, session_factory=get_session):
+        self.tracker = tracker
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, tables: tuple[str, ...]) -> tuple[str, bytes] | None:
+        """
+        :return: The cached (etag, body), or None if missing, stale or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            version, expires, etag, body = entry
+            if version == self.tracker.version(*tables) and expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return etag, body
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, version: tuple[int, ...], body: bytes) -> str:
+        """
+        Store a body built from the tables at `version` (read before building it).
+        :return: The body's ETag.
+        """
+        etag = content_etag(body)
+        if self.max_size > 0:
+            self._entries[key] = (version, time.monotonic() + self.ttl, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return etag
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def respond(self, key, tables: tuple[str, ...], build: Callable[[Any], Awaitable[Any]]) -> Response | None:
+        """
+        Answer a GET from the cache, or from `build` (which queries and serializes) on a miss, honouring
+        If-None-Match. A request whose ETag matches gets a 304 with no body.
+        :param key: Cache key; it must include everything the body depends on besides the tables (i.e. account ID).
+        :param tables: Tables the body is built from.
+        :param build: Coroutine function taking a (primary) database session and returning the value to encode, or
+            None if there is nothing (not cached).
+        :return: The response, or None when `build` returned None.
+        """
+        cached = self.get(key, tables)
+        if cached is None:
+            version = self.tracker.version(*tables)
+            async with self.session_factory() as session:
+                value = await build(session)
+            if value is None:
+                return None
+            body = dumps(value)
+            etag = self.put(key, version, body)
+        else:
+            etag, body = cached
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        # Clients may keep the body but must revalidate it on every use
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+
+response_cache = ResponseCache(
+    change_tracker,
+    max_size=cfg.RESPONSE_CACHE_SIZE,
+    ttl=cfg.RESPONSE_CACHE_TTL_SECONDS
+)
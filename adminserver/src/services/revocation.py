@@ -0,0 +1,223 @@
+import time
+import heapq
+import asyncio
+import logging
+import datetime
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import config as cfg
+from src.db import get_session
+from src.models.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+JTI = "jti"
+FAMILY = "family"
+# Access tokens of a user (token_id = user ID) issued up to the revocation, i.e. after their grants were revoked
+USER = "user"
+KINDS = (JTI, FAMILY, USER)
+
+
+def _timestamp(value: datetime.datetime) -> float:
+    # SQLite hands datetimes back naive; they are always stored as UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+def _datetime(timestamp: float) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+class RevocationIndex:
+    """
+    In-memory set of revoked refresh-token IDs (`jti`), refresh-token families (`fid`) and users whose earlier access
+    tokens carry permissions they no longer have, backed by the revoked_token table.
+
+    Membership checks are a dict lookup and never touch the database. Every entry carries the expiry of the last
+    token it can match and is pruned once that has passed, so memory is bounded by the live tokens rather than by
+    the revocation history. Revocations made by other worker processes are picked up by `sync`, which runs every
+    `sync_interval` seconds once `start` has been called. Revocations made through a session only enter the index
+    when that session commits, so a failed commit never leaves tokens rejected that the database still allows.
+    """
+    def __init__(self, sync_interval: float = 30, access_token_lifetime: float = 900):
+        self.sync_interval = sync_interval
+        self.access_token_lifetime = access_token_lifetime
+        self._expires = {}
+        self._revoked_at = {}
+        self._heap = []
+        self._synced_until = None
+        self._task: asyncio.Task | None = None
+
+    def __len__(self):
+        return len(self._expires)
+
+    def _add(self, kind: str, token_id: str, expires: float, revoked_at: float | None = None):
+        key = (kind, token_id)
+        if self._expires.get(key, 0) >= expires:
+            return
+        self._expires[key] = expires
+        if kind == USER:
+            self._revoked_at[token_id] = revoked_at
+        heapq.heappush(self._heap, (expires, key))
+
+    def _add_on_commit(self, db_session, kind: str, token_id: str, expires: float, revoked_at: float):
+        db_session.info.setdefault("pending_revocations", []).append((self, kind, token_id, expires, revoked_at))
+
+    def prune(self, now: float | None = None) -> int:
+        """
+        Drop entries whose tokens have all expired.
+        :return: Number of entries removed.
+        """
+        now = time.time() if now is None else now
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires, key = heapq.heappop(self._heap)
+            # A key revoked again with a later expiry has a newer heap entry; only the latest one removes it
+            if self._expires.get(key) == expires:
+                del self._expires[key]
+                if key[0] == USER:
+                    del self._revoked_at[key[1]]
+                removed += 1
+        return removed
+
+    def _contains(self, kind: str, token_id: str | None, now: float) -> bool:
+        if not token_id:
+            return False
+        expires = self._expires.get((kind, token_id))
+        return expires is not None and expires > now
+
+    def is_revoked(self, payload: dict) -> bool:
+        """
+        Check whether a token has been revoked, either by its own `jti` or through its refresh-token family.
+        :param payload: The verified token payload.
+        """
+        now = time.time()
+        if self._contains(FAMILY, payload.get("fid"), now) or self._contains(JTI, payload.get("jti"), now):
+            return True
+        # Refresh tokens stay valid: refreshing is how the user gets an access token with their current permissions.
+        # `iat` has whole seconds, so a token issued in the same second as the revocation is rejected as well
+        return (payload.get("type") == "access"
+                and self._contains(USER, payload.get("sub"), now)
+                and payload.get("iat", 0) <= self._revoked_at[payload["sub"]])
+
+    def is_reused(self, payload: dict) -> bool:
+        """
+        Check whether a refresh token has already been rotated, i.e. its `jti` was revoked by a previous refresh.
+        """
+        return self._contains(JTI, payload.get("jti"), time.time())
+
+    async def revoke(self,
+                     db_session: AsyncSession,
+                     kind: str,
+                     token_id: str,
+                     expires: float,
+                     user_id: str | None = None,
+                     reason: str | None = None):
+        """
+        Revoke a token or a token family, in this process and for every process once committed.
+        The caller commits the session.
+        :param kind: JTI, FAMILY or USER.
+        :param token_id: The `jti` or `fid` claim, or the user ID.
+        :param expires: Epoch seconds after which no token it matches can still be valid.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown revocation kind {kind!r}")
+        revoked_date = datetime.datetime.now(tz=datetime.timezone.utc)
+        await db_session.merge(RevokedToken(
+            token_id=token_id,
+            kind=kind,
+            user_id=user_id if kind != USER else token_id,
+            reason=reason,
+            revoked_date=revoked_date,
+            expire_date=_datetime(expires)
+        ))
+        self._add_on_commit(db_session, kind, token_id, expires, revoked_date.timestamp())
+
+    async def revoke_users(self, db_session: AsyncSession, user_ids, reason: str | None = None):
+        """
+        Reject the access tokens already issued to these users, with two set-based statements however many users
+        there are. Their refresh tokens keep working, so clients pick up the users' current permissions on their next
+        refresh. The caller commits the session.
+        :param user_ids: The user IDs.
+        """
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return
+        revoked_date = datetime.datetime.now(tz=datetime.timezone.utc)
+        # Access tokens issued up to now expire within one access token lifetime
+        expires = revoked_date.timestamp() + self.access_token_lifetime
+        await db_session.execute(sqlalchemy.delete(RevokedToken).where(RevokedToken.token_id.in_(user_ids)))
+        await db_session.execute(sqlalchemy.insert(RevokedToken), [
+            {"token_id": user_id, "kind": USER, "user_id": user_id, "reason": reason,
+             "revoked_date": revoked_date, "expire_date": _datetime(expires)}
+            for user_id in user_ids
+        ])
+        for user_id in user_ids:
+            self._add_on_commit(db_session, USER, user_id, expires, revoked_date.timestamp())
+
+    async def sync(self, db_session: AsyncSession) -> int:
+        """
+        Load the revocations committed since the last sync (all unexpired ones on the first call).
+        :return: Number of rows read.
+        """
+        started = datetime.datetime.now(tz=datetime.timezone.utc)
+        query = sqlalchemy.select(
+            RevokedToken.kind, RevokedToken.token_id, RevokedToken.expire_date, RevokedToken.revoked_date
+        ).where(RevokedToken.expire_date > started)
+        if self._synced_until is not None:
+            query = query.where(RevokedToken.revoked_date >= self._synced_until)
+        rows = (await db_session.execute(query)).all()
+        for kind, token_id, expire_date, revoked_date in rows:
+            self._add(kind, token_id, _timestamp(expire_date), _timestamp(revoked_date))
+        # Overlap the next window a little so rows committed while this query ran are not missed
+        self._synced_until = started - datetime.timedelta(seconds=5)
+        self.prune()
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                async with get_session() as session:
+                    await self.sync(session)
+            except Exception as exc:
+                logger.warning("revocation_sync_failed error=%s entries=%d", exc, len(self))
+
+    async def start(self):
+        """Load the unexpired revocations, then keep syncing them in the background."""
+        async with get_session() as session:
+            loaded = await self.sync(session)
+        logger.info("revocation_index_loaded rows=%d", loaded)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+
+revocation_index = RevocationIndex(
+    sync_interval=cfg.REVOCATION_SYNC_SECONDS,
+    access_token_lifetime=cfg.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
+
+def _after_commit(session):
+    indexes = set()
+    for index, kind, token_id, expires, revoked_at in session.info.pop("pending_revocations", ()):
+        index._add(kind, token_id, expires, revoked_at)
+        indexes.add(index)
+    for index in indexes:
+        index.prune()
+
+
+def _after_transaction_end(session, transaction):
+    # Whatever is left was rolled back or discarded with the session
+    if transaction.parent is None:
+        session.info.pop("pending_revocations", None)
+
+
+sqlalchemy.event.listen(Session, "after_commit", _after_commit)
+sqlalchemy.event.listen(Session, "after_transaction_end", _after_transaction_end)
@@ -1,4 +1,6 @@
+import re
 import config as cfg
+import hashlib
 import pydantic
 import typing
 from dataclasses import dataclass
@@ -11,6 +13,107 @@ class UserInput(pydantic.BaseModel):
     email: str = pydantic.Field(None, description="The user's email address")
     account_id: str = pydantic.Field(None, description="The desired user account")
 
+# The methods check_password_hash accepts: pbkdf2[:digest[:iterations]] and scrypt[:n:r:p]
+_PASSWORD_HASH = re.compile(r"(?:pbkdf2(?::(?P<digest>\w+)(?::(?P<iterations>\d+))?)?"
+                            r"|scrypt(?::(?P<n>\d+):(?P<r>\d+):(?P<p>\d+))?)\$[^$]+\$[0-9a-f]+")
+# Digests hashlib.pbkdf2_hmac takes everywhere (the variable-length shakes don't work with HMAC)
+_PBKDF2_DIGESTS = hashlib.algorithms_guaranteed - {"shake_128", "shake_256"}
+# hashlib.scrypt's largest memory limit
+_SCRYPT_MAXMEM = 2 ** 31 - 1
+
+
+def password_hash_error(value: str) -> str | None:
+    """
+    Why check_password_hash would raise on a stored hash, or None if it can check it.
+    """
+    match = _PASSWORD_HASH.fullmatch(value)
+    if not match:
+        return "expected a werkzeug pbkdf2 or scrypt password hash (method$salt$hash)"
+    if match["digest"] is not None and match["digest"] not in _PBKDF2_DIGESTS:
+        return f"unsupported digest {match['digest']!r}"
+    if match["iterations"] is not None and int(match["iterations"]) < 1:
+        return "pbkdf2 needs at least one iteration"
+    if match["n"] is not None:
+        n, r, p = int(match["n"]), int(match["r"]), int(match["p"])
+        # werkzeug allows scrypt 132 * n * r * p bytes, and OpenSSL needs 128 * r * (n + p + 2)
+        if n < 2 or n & (n - 1) or r < 1 or p < 1 or not 128 * r * (n + p + 2) <= 132 * n * r * p <= _SCRYPT_MAXMEM:
+            return "invalid scrypt parameters"
+    return None
+
+
+def validation_errors(exc: pydantic.ValidationError) -> list[str]:
+    """
+    The errors of a failed validation as "field.path: message" strings, for API responses.
+    """
+    return [
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    ]
+
+
+class BulkUserInput(pydantic.BaseModel):
+    """
+    One user of a bulk provisioning request (POST /api/v1/user/bulk).
+    """
+    model_config = pydantic.ConfigDict(extra="forbid")
+
+    # Names are trimmed; passwords are taken exactly as given
+    username: typing.Annotated[str, pydantic.StringConstraints(strip_whitespace=True)] = pydantic.Field(
+        ..., min_length=1, max_length=255, description="The username")
+    email: typing.Optional[typing.Annotated[str, pydantic.StringConstraints(strip_whitespace=True)]] = pydantic.Field(
+        None, max_length=255, description="The primary email address")
+    password: typing.Optional[str] = pydantic.Field(None, min_length=8, description="The initial password")
+    password_hash: typing.Optional[str] = pydantic.Field(
+        None, max_length=255, description="An existing werkzeug password hash, i.e. when migrating users")
+    type: typing.Literal["user", "service"] = pydantic.Field("user", description="User or service account")
+    display_name: typing.Optional[str] = pydantic.Field(None, max_length=255)
+    personal_name: typing.Optional[str] = pydantic.Field(None, max_length=255)
+    roles: typing.List[str] = pydantic.Field(default_factory=list, description="Roles granted on the current account")
+
+    @pydantic.field_validator("email")
+    @classmethod
+    def normalize_email(cls, value):
+        if value is None:
+            return value
+        local, _, domain = value.rpartition("@")
+        if not local or "." not in domain:
+            raise ValueError("not a valid email address")
+        return value.lower()
+
+    @pydantic.field_validator("password_hash")
+    @classmethod
+    def check_password_hash_format(cls, value):
+        # A hash werkzeug can't parse would turn every login of the user into an error
+        error = password_hash_error(value) if value is not None else None
+        if error:
+            raise ValueError(error)
+        return value
+
+    @pydantic.model_validator(mode="after")
+    def one_password(self):
+        if self.password is not None and self.password_hash is not None:
+            raise ValueError("give either password or password_hash, not both")
+        return self
+
+class GrantChange(pydantic.BaseModel):
+    """
+    A role for a user on the current account, to grant or revoke.
+    """
+    model_config = pydantic.ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    user_id: str = pydantic.Field(..., min_length=1, max_length=36, description="The user ID")
+    role: str = pydantic.Field(..., min_length=1, max_length=255, description="The role name")
+
+
+class GrantBatchRequest(pydantic.BaseModel):
+    """
+    A set of grant changes applied together (POST /api/v1/grant/batch).
+    """
+    model_config = pydantic.ConfigDict(extra="forbid")
+
+    grant: typing.List[GrantChange] = pydantic.Field(default_factory=list, description="Roles to grant")
+    revoke: typing.List[GrantChange] = pydantic.Field(default_factory=list, description="Roles to revoke")
+
 # NOTE - TO USE A LIST OF UserInput values, would need to do the following:
 # from typing import List
 
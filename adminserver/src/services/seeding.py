@@ -0,0 +1,193 @@
+"""
+Representative synthetic data for benchmarks and index work (see populate_db.py for the CLI).
+
+`Seeder` generates accounts, users with a primary email, a role catalogue, grants and pending TokenEvents, and writes
+them with multi-row INSERTs through a synchronous connection, in batches of `batch_size` rows, all in the caller's
+transaction. Password hashes are computed once up front and shared between users, so a database with a million grants
+takes minutes rather than the days per-user pbkdf2 would.
+
+Grant fan-out follows what real tenants look like: every user belongs to a home account, a share of the users also
+belongs to a few other accounts (consultants, support staff), and each membership carries one to three roles. A small
+share of the grants is revoked history. Generation is driven by one seeded random generator, so the same parameters
+give the same rows, IDs included (dates are relative to the time of the run).
+"""
+import uuid
+import base64
+import random
+import logging
+import datetime
+import sqlalchemy
+from werkzeug.security import generate_password_hash
+from src.db import role_permission_table
+from src.models.models import Account, Email, Grant, Permission, Role, TokenEvent, User
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = ("account", "user", "role", "grant", "location", "report", "billing", "audit")
+# Roles per membership, drawn uniformly: 1.67 on average
+ROLE_FANOUT = (1, 1, 1, 2, 2, 3)
+REVOKED_GRANTS = 0.03
+SPAN_DAYS = 730
+
+
+class Seeder:
+    def __init__(self,
+                 accounts: int = 100,
+                 users_per_account: int = 100,
+                 shared_users: float = 0.1,
+                 extra_accounts: int = 2,
+                 pending_events: float = 0.05,
+                 expired_events: float = 0.2,
+                 password: str = "password",
+                 hash_method: str = None,
+                 distinct_hashes: int = 1,
+                 prefix: str = "seed",
+                 seed: int = 1,
+                 batch_size: int = 10000):
+        """
+        :param accounts: Number of accounts.
+        :param users_per_account: Users whose home is each account.
+        :param shared_users: Share of the users who are also members of other accounts.
+        :param extra_accounts: Most other accounts a shared user belongs to.
+        :param pending_events: Share of the users with a pending email validation TokenEvent.
+        :param expired_events: Share of those events that have already expired (the sweeper's backlog).
+        :param hash_method: werkzeug hash method; werkzeug's default (as in production) if not given.
+        :param distinct_hashes: Number of password hashes computed and shared round-robin between users.
+        :param prefix: Prefix of the generated names, so several datasets can live in one database.
+        """
+        self.accounts = accounts
+        self.users_per_account = users_per_account
+        self.shared_users = shared_users
+        self.extra_accounts = extra_accounts
+        self.pending_events = pending_events
+        self.expired_events = expired_events
+        self.password = password
+        self.hash_method = hash_method
+        self.distinct_hashes = max(1, distinct_hashes)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        # The prefix is part of the seed, so datasets with different prefixes don't share IDs
+        self.rng = random.Random(f"{prefix}:{seed}")
+        self.now = datetime.datetime.now(tz=datetime.timezone.utc)
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _past(self) -> datetime.datetime:
+        return self.now - datetime.timedelta(seconds=self.rng.randrange(SPAN_DAYS * 86400))
+
+    def _insert(self, connection, table, rows: list[dict]) -> int:
+        for i in range(0, len(rows), self.batch_size):
+            connection.execute(sqlalchemy.insert(table), rows[i:i + self.batch_size])
+        return len(rows)
+
+    def _catalogue(self, connection) -> list[str]:
+        """
+        Create the permissions and roles that don't exist yet.
+        :return: The IDs of every catalogue role.
+        """
+        permissions = {f"{resource}.{action}": action for resource in RESOURCES for action in ("read", "write")}
+        roles = {"account.admin": ["account.read", "account.write"]}
+        for resource in RESOURCES:
+            roles[f"{resource}.viewer"] = [f"{resource}.read"]
+            roles[f"{resource}.editor"] = [f"{resource}.read", f"{resource}.write"]
+
+        permission_ids = dict(connection.execute(
+            sqlalchemy.select(Permission.name, Permission.id).where(Permission.name.in_(permissions))
+        ).all())
+        new_permissions = [
+            {"id": self._uuid(), "name": name, "display_name": name.replace(".", " ").title(), "scope": action,
+             "active": True, "deleted": False, "created_date": self.now, "modified_date": self.now}
+            for name, action in permissions.items() if name not in permission_ids
+        ]
+        self._insert(connection, Permission, new_permissions)
+        permission_ids |= {row["name"]: row["id"] for row in new_permissions}
+
+        role_ids = dict(connection.execute(
+            sqlalchemy.select(Role.name, Role.id).where(Role.name.in_(roles))
+        ).all())
+        new_roles = [
+            {"id": self._uuid(), "name": name, "display_name": name.replace(".", " ").title(),
+             "active": True, "deleted": False, "created_date": self.now, "modified_date": self.now}
+            for name in roles if name not in role_ids
+        ]
+        self._insert(connection, Role, new_roles)
+        self._insert(connection, role_permission_table, [
+            {"role_id": row["id"], "permission_id": permission_ids[permission]}
+            for row in new_roles for permission in roles[row["name"]]
+        ])
+        role_ids |= {row["name"]: row["id"] for row in new_roles}
+        return [role_ids[name] for name in roles]
+
+    def seed(self, connection) -> dict:
+        """
+        Generate and insert the dataset on `connection`; the caller commits.
+        :return: Row counts per table.
+        """
+        role_ids = self._catalogue(connection)
+        hashes = [
+            generate_password_hash(self.password, **({"method": self.hash_method} if self.hash_method else {}))
+            for _ in range(self.distinct_hashes)
+        ]
+
+        accounts = []
+        for k in range(self.accounts):
+            created = self._past()
+            accounts.append({
+                "id": self._uuid(), "name": f"{self.prefix}-account-{k:06d}",
+                "display_name": f"{self.prefix.title()} Account {k}", "active": True, "deleted": False,
+                "created_date": created, "modified_date": created,
+            })
+        counts = {"account": self._insert(connection, Account, accounts)}
+        account_ids = [account["id"] for account in accounts]
+
+        users, emails, grants, events = [], [], [], []
+        for n in range(self.accounts * self.users_per_account):
+            user_id, name, created = self._uuid(), f"{self.prefix}-user-{n:08d}", self._past()
+            users.append({
+                "id": user_id, "name": name, "type": "user", "display_name": f"User {n}",
+                "personal_name": None, "family_names": None, "active": True, "deleted": False,
+                "created_date": created, "modified_date": created, "password": hashes[n % len(hashes)],
+            })
+            emails.append({
+                "id": self._uuid(), "email": f"{name}@example.test", "user_id": user_id, "primary": True,
+                "active": True, "deleted": False, "validated": self.rng.random() < 0.9, "created_date": created,
+            })
+
+            memberships = [account_ids[n // self.users_per_account]]
+            if self.accounts > 1 and self.rng.random() < self.shared_users:
+                others = self.rng.sample(range(self.accounts), min(self.accounts, self.extra_accounts + 1))
+                memberships += [account_ids[k] for k in others[:self.rng.randint(1, self.extra_accounts)]
+                                if account_ids[k] != memberships[0]]
+            for account_id in memberships:
+                for role_id in self.rng.sample(role_ids, min(len(role_ids), self.rng.choice(ROLE_FANOUT))):
+                    granted = max(created, self._past())
+                    revoked = self.rng.random() < REVOKED_GRANTS
+                    grants.append({
+                        "id": self._uuid(), "user_id": user_id, "account_id": account_id, "role_id": role_id,
+                        "active": not revoked, "granted_date": granted,
+                        "revoked_date": granted + datetime.timedelta(days=self.rng.randint(1, 90)) if revoked else None,
+                    })
+
+            if self.rng.random() < self.pending_events:
+                expired = self.rng.random() < self.expired_events
+                issued = self.now - datetime.timedelta(minutes=self.rng.randint(150, 60 * 24 * 14) if expired
+                                                       else self.rng.randint(0, 110))
+                events.append({
+                    "id": self._uuid(), "event_type": "email", "event_key": f"{name}+new@example.test",
+                    "created_by": user_id, "created_for": user_id,
+                    "token": base64.urlsafe_b64encode(self.rng.randbytes(32)).rstrip(b"=").decode(),
+                    "created_date": issued, "expire_date": issued + datetime.timedelta(hours=2), "validated": False,
+                })
+
+            if len(grants) >= self.batch_size:
+                counts = self._flush(connection, counts, users, emails, grants, events)
+                users, emails, grants, events = [], [], [], []
+        counts = self._flush(connection, counts, users, emails, grants, events)
+        logger.info("seeded %s", counts)
+        return counts
+
+    def _flush(self, connection, counts: dict, users, emails, grants, events) -> dict:
+        for model, rows in ((User, users), (Email, emails), (Grant, grants), (TokenEvent, events)):
+            counts[model.__tablename__] = counts.get(model.__tablename__, 0) + self._insert(connection, model, rows)
+        return counts
@@ -0,0 +1,90 @@
+import time
+import asyncio
+import logging
+import datetime
+import sqlalchemy
+import config as cfg
+from src.db import get_session
+from src.models.models import TokenEvent, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class ExpirySweeper:
+    """
+    Background deletion of expired rows: TokenEvents (email validation tokens that were never accepted) and
+    revocations whose tokens have all expired.
+
+    Every `interval` seconds each table is purged through its expire_date index in batches of at most `batch_size`
+    rows, one short transaction per batch, with a `pause` between batches so the event loop and the database serve
+    requests in between. A sweep is logged with the rows purged and the time spent.
+    """
+    def __init__(self,
+                 session_factory=get_session,
+                 interval: float = 3600,
+                 batch_size: int = 500,
+                 pause: float = 0.05,
+                 targets=((TokenEvent, TokenEvent.id, TokenEvent.expire_date),
+                          (RevokedToken, RevokedToken.token_id, RevokedToken.expire_date))):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.targets = targets
+        self._task: asyncio.Task | None = None
+
+    async def _delete_batch(self, model, key, expire_date, now: datetime.datetime) -> int:
+        expired = sqlalchemy.select(key).where(expire_date < now).limit(self.batch_size)
+        async with self.session_factory() as session:
+            result = await session.execute(
+                sqlalchemy.delete(model)
+                .where(key.in_(expired.scalar_subquery()))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        return result.rowcount
+
+    async def sweep(self, now: datetime.datetime | None = None) -> dict[str, int]:
+        """
+        Delete every row that expired before `now` (default: the current time).
+        :return: Rows deleted by table name.
+        """
+        now = now or datetime.datetime.now(tz=datetime.timezone.utc)
+        purged = {}
+        for model, key, expire_date in self.targets:
+            started = time.perf_counter()
+            total = batches = 0
+            while True:
+                deleted = await self._delete_batch(model, key, expire_date, now)
+                total += deleted
+                batches += 1
+                if deleted < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+            purged[model.__tablename__] = total
+            logger.info("expired_rows_swept table=%s rows=%d batches=%d duration_ms=%.1f",
+                        model.__tablename__, total, batches, (time.perf_counter() - started) * 1000)
+        return purged
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as exc:
+                logger.exception("expiry_sweep_failed error=%s", exc)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+
+expiry_sweeper = ExpirySweeper(
+    interval=cfg.EXPIRY_SWEEP_SECONDS,
+    batch_size=cfg.EXPIRY_SWEEP_BATCH_SIZE,
+    pause=cfg.EXPIRY_SWEEP_PAUSE_SECONDS
+)
@@ -1,4 +1,5 @@
 import os
+import uuid
 import pytest
 import asyncio
 import pathlib
@@ -6,8 +7,10 @@ from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
+from werkzeug.security import generate_password_hash
 
-from db import Base, get_session
+from src.db import Base, get_session
+from src.models.models import User
 from src.app import create_app
 
 
@@ -53,6 +56,26 @@ async def db_session(db_engine):
         await session.rollback()
 
 
+@pytest.fixture(scope="session")
+def password_hash():
+    """A hash of "password" that is cheap to check (one pbkdf2 iteration), for users created by tests."""
+    return generate_password_hash("password", method="pbkdf2:sha256:1")
+
+
+@pytest.fixture()
+def suffix():
+    """A random name suffix, so the rows of a test don't collide in the session-wide database."""
+    return uuid.uuid4().hex[:8]
+
+
+@pytest.fixture()
+def make_user(password_hash):
+    """Build (not add) a User with the password "password"."""
+    def make(name: str, email: str = None) -> User:
+        return User(name, None, email, password_hash=password_hash)
+    return make
+
+
 @pytest.fixture()
 async def test_client(app, db_session, monkeypatch):
     # Patch the AsyncSessionLocal to return the test session
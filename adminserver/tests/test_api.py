@@ -40,4 +40,32 @@ async def test_api_ready(test_client, ok_response):
 # @pytest.mark.asyncio
 # async def test_login_success(test_client):
 #     response = await test_client.post("/login", json={"username": "bob", "password": "secret"})
-#     assert response.status_code == 200
\ No newline at end of file
+#     assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_jwks(test_client):
+    response = await test_client.get("/auth/.well-known/jwks.json")
+    assert response.status_code == 200
+    keys = (await response.get_json())["keys"]
+    assert keys and all(key["kid"] and key["use"] == "sig" for key in keys)
+
+
+@pytest.mark.asyncio
+async def test_health_checks_open_no_db_session(test_client, monkeypatch):
+    import src.app
+    opened = []
+    session_factory = src.app.AsyncSessionLocal
+    monkeypatch.setattr(src.app, "AsyncSessionLocal", lambda **kwargs: opened.append(1) or session_factory(**kwargs))
+    assert (await test_client.get("/api/v1/liveness")).status_code == 200
+    assert (await test_client.get("/api/v1/readiness")).status_code == 200
+    assert opened == []
+    # A handler that uses g.db_session gets one on first use
+    response = await test_client.post("/auth/login", json={"username": "nobody", "password": "secret"})
+    assert response.status_code == 401
+    assert opened == [1]
+
+
+def test_engine_options_skip_pool_sizing_for_memory_sqlite():
+    from src.db import engine_options
+    assert "pool_size" not in engine_options("sqlite+aiosqlite:///:memory:")
+    assert "pool_size" in engine_options("sqlite+aiosqlite:////tmp/adminserver.db")
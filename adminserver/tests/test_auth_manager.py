@@ -23,3 +23,18 @@ def test_verify_token(auth_manager):
     token = auth_manager.create_access_token(payload)
     decoded = auth_manager.verify_token(token)
     assert decoded["sub"] == "123"
+
+@pytest.mark.asyncio
+async def test_create_token_pair(auth_manager, public_key):
+    payload = {"sub": "123", "username": "testuser"}
+    access_token, refresh_token = await auth_manager.create_token_pair(payload)
+    assert jwt.decode(access_token, public_key, algorithms=["RS256"])["type"] == "access"
+    assert jwt.decode(refresh_token, public_key, algorithms=["RS256"])["type"] == "refresh"
+    assert auth_manager.verify_token(await auth_manager.create_access_token_async(payload))["sub"] == "123"
+
+def test_tokens_carry_published_kid(auth_manager):
+    token = auth_manager.create_access_token({"sub": "123"})
+    kid = jwt.get_unverified_header(token)["kid"]
+    assert kid == auth_manager.kid
+    assert [key["kid"] for key in auth_manager.jwks()["keys"]] == [kid]
+    assert "d" not in auth_manager.jwks()["keys"][0]
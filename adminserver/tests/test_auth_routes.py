@@ -1,6 +1,9 @@
 import pytest
 import jwt
-from models.models import User
+from src.db import get_session
+from src.models.models import User, Account, Role, Permission, Grant
+from src.services.auth_manager import auth_manager as app_auth_manager
+from src.auth.auth import get_user_claims, generate_user_payload
 
 @pytest.mark.asyncio
 async def test_login_success(test_client, db_session, monkeypatch):
@@ -43,3 +46,34 @@ async def test_refresh_token_invalid(test_client):
     assert resp.status_code == 401
     data = await resp.get_json()
     assert "error" in data
+
+@pytest.fixture()
+async def member(test_client, suffix, make_user):
+    """A user with a role on two accounts, stored in the app's database, and an access token for the first."""
+    async with get_session() as session:
+        role = Role(name=f"switch-{suffix}", permissions=[Permission(name=f"account.read.{suffix}", scope="Read")])
+        first, second, foreign = (Account(name=f"switch-{suffix}-{i}") for i in range(3))
+        user = make_user(f"switch-{suffix}")
+        session.add_all([role, first, second, foreign, user,
+                         Grant(user=user, role=role, account=first), Grant(user=user, role=role, account=second)])
+        await session.commit()
+        claims = await get_user_claims(user.id, session)
+        token = app_auth_manager.create_access_token(await generate_user_payload(claims, first.id))
+        return {"token": token, "user_id": user.id, "second": second.id, "foreign": foreign.id}
+
+@pytest.mark.asyncio
+async def test_switch_account(test_client, member):
+    headers = {"Authorization": f"Bearer {member['token']}"}
+    body = {"account_id": member["second"], "request_id": "switch-test", "client_version": "test"}
+    resp = await test_client.post("/auth/switch_account", json=body, headers=headers)
+    assert resp.status_code == 200
+    payload = jwt.decode((await resp.get_json())["access_token"], options={"verify_signature": False})
+    assert payload["sub"] == member["user_id"] and payload["account_id"] == member["second"]
+
+@pytest.mark.asyncio
+async def test_switch_account_without_grant_is_forbidden(test_client, member):
+    headers = {"Authorization": f"Bearer {member['token']}"}
+    body = {"account_id": member["foreign"], "request_id": "switch-test", "client_version": "test"}
+    resp = await test_client.post("/auth/switch_account", json=body, headers=headers)
+    assert resp.status_code == 403
+    assert "access_token" not in await resp.get_json()
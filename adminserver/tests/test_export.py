@@ -0,0 +1,58 @@
+import io
+import csv
+import json
+import contextlib
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.models.models import Account, Role, Grant
+from src.api.v1.account.account_user import export_account_users, CSV_COLUMNS
+
+
+@pytest.fixture()
+async def exported_account(db_session, suffix, make_user):
+    account, other = Account(name=f"export-{suffix}"), Account(name=f"export-other-{suffix}")
+    reader, writer = Role(name=f"reader-{suffix}"), Role(name=f"writer-{suffix}")
+    users = [make_user(f"export-{suffix}-{i}", f"export-{suffix}-{i}@example.com") for i in range(5)]
+    db_session.add_all([account, other, reader, writer, *users])
+    for user in users:
+        db_session.add_all([Grant(user=user, role=reader, account=account), Grant(user=user, role=writer, account=other)])
+    db_session.add(Grant(user=users[0], role=writer, account=account))
+    await db_session.commit()
+    return account, {user.id for user in users}
+
+
+@pytest.fixture()
+def sessions(db_engine):
+    """Session factory for the test engine that keeps the sessions it opened."""
+    opened = []
+
+    @contextlib.asynccontextmanager
+    async def factory():
+        async with AsyncSession(db_engine, expire_on_commit=False) as session:
+            opened.append(session)
+            yield session
+    factory.opened = opened
+    return factory
+
+
+async def test_ndjson_export_streams_in_batches(exported_account, sessions):
+    account, user_ids = exported_account
+    chunks = []
+    async for chunk in export_account_users(account.id, "ndjson", batch_size=2, session_factory=sessions):
+        chunks.append(chunk)
+        # Each batch is released once written, so the session never holds more than one
+        assert len(sessions.opened[0].identity_map) == 0
+    assert len(chunks) == 3
+    records = [json.loads(line) for line in b"".join(chunks).splitlines()]
+    assert {record["id"] for record in records} == user_ids
+    assert all(grant["account_id"] == account.id for record in records for grant in record["grants"])
+    assert sorted(len(record["grants"]) for record in records) == [1, 1, 1, 1, 2]
+
+
+async def test_csv_export_has_a_row_per_grant(exported_account, sessions):
+    account, user_ids = exported_account
+    body = b"".join([chunk async for chunk in export_account_users(account.id, "csv", session_factory=sessions)])
+    rows = list(csv.reader(io.StringIO(body.decode("utf-8"))))
+    assert tuple(rows[0]) == CSV_COLUMNS
+    assert len(rows) == 1 + 6
+    assert {row[0] for row in rows[1:]} == user_ids
@@ -0,0 +1,144 @@
+import time
+import pytest
+import sqlalchemy
+from src.models.models import Account, Permission, Role, Grant, RevokedToken
+from src.services.change_tracker import change_tracker
+from src.services.grant_batch import (
+    apply_grant_changes, GrantBatchError, GRANTED, ALREADY_GRANTED, REVOKED, NOT_GRANTED
+)
+from src.services.revocation import RevocationIndex, USER
+from src.services.schema import GrantBatchRequest
+
+
+@pytest.fixture()
+async def reorg(db_session, suffix, make_user):
+    account = Account(name=f"reorg-{suffix}")
+    old_role, new_role = Role(name=f"old-{suffix}"), Role(name=f"new-{suffix}")
+    users = [make_user(f"reorg-{suffix}-{i}") for i in range(4)]
+    db_session.add_all([account, old_role, new_role, *users])
+    for user in users[:3]:
+        db_session.add(Grant(user=user, role=old_role, account=account))
+    db_session.add(Grant(user=users[3], role=new_role, account=account))
+    await db_session.commit()
+    return account, old_role, new_role, [user.id for user in users]
+
+
+def change_set(grant=(), revoke=()):
+    return GrantBatchRequest.model_validate({
+        "grant": [{"user_id": user_id, "role": role} for user_id, role in grant],
+        "revoke": [{"user_id": user_id, "role": role} for user_id, role in revoke],
+    })
+
+
+async def active_grants(db_session, account_id):
+    result = await db_session.execute(
+        sqlalchemy.select(Grant.user_id, Role.name).join(Role, Grant.role_id == Role.id)
+        .where(Grant.account_id == account_id, Grant.active == True)
+    )
+    return {tuple(row) for row in result}
+
+
+async def test_move_users_between_roles(db_session, reorg, monkeypatch):
+    account, old_role, new_role, user_ids = reorg
+    revocations = RevocationIndex()
+    published = []
+    bump = change_tracker.bump
+
+    def recording_bump(*tables, **context):
+        published.append((set(tables), context))
+        bump(*tables, **context)
+    monkeypatch.setattr(change_tracker, "bump", recording_bump)
+
+    results = await apply_grant_changes(change_set(
+        grant=[(user_id, new_role.name) for user_id in user_ids],
+        revoke=[(user_id, old_role.name) for user_id in user_ids],
+    ), account.id, db_session, revocations=revocations)
+
+    assert [r["status"] for r in results["grant"]] == [GRANTED] * 3 + [ALREADY_GRANTED]
+    assert [r["status"] for r in results["revoke"]] == [REVOKED] * 3 + [NOT_GRANTED]
+    assert await active_grants(db_session, account.id) == {(user_id, new_role.name) for user_id in user_ids}
+    revoked_dates = (await db_session.execute(
+        sqlalchemy.select(Grant.revoked_date).where(Grant.account_id == account.id, Grant.active == False)
+    )).scalars().all()
+    assert len(revoked_dates) == 3 and all(revoked_dates)
+
+    # One change for the whole set, naming every affected user
+    grant_changes = [context for tables, context in published if "grant" in tables]
+    assert len(grant_changes) == 1 and grant_changes[0]["user_ids"] == set(user_ids[:3])
+
+    # Access tokens issued before the change are rejected; refresh tokens and later tokens are not
+    issued = int(time.time()) - 1
+    assert revocations.is_revoked({"type": "access", "sub": user_ids[0], "iat": issued})
+    assert not revocations.is_revoked({"type": "refresh", "sub": user_ids[0], "iat": issued})
+    assert not revocations.is_revoked({"type": "access", "sub": user_ids[0], "iat": issued + 10})
+    assert not revocations.is_revoked({"type": "access", "sub": user_ids[3], "iat": issued})
+    kinds = (await db_session.execute(
+        sqlalchemy.select(RevokedToken.kind).where(RevokedToken.token_id.in_(user_ids))
+    )).scalars().all()
+    assert kinds == [USER] * 3
+
+    # Other processes pick the user revocations up on sync
+    reader = RevocationIndex()
+    await reader.sync(db_session)
+    assert reader.is_revoked({"type": "access", "sub": user_ids[1], "iat": issued})
+    await db_session.execute(sqlalchemy.delete(RevokedToken).where(RevokedToken.token_id.in_(user_ids)))
+    await db_session.commit()
+
+
+async def test_invalid_change_set_applies_nothing(db_session, reorg):
+    account, old_role, new_role, user_ids = reorg
+    before = await active_grants(db_session, account.id)
+    with pytest.raises(GrantBatchError) as exc:
+        await apply_grant_changes(change_set(
+            grant=[(user_ids[0], new_role.name), ("no-such-user", new_role.name), (user_ids[1], old_role.name)],
+            revoke=[(user_ids[0], old_role.name), (user_ids[1], "no-such-role"), (user_ids[1], old_role.name)],
+        ), account.id, db_session, revocations=RevocationIndex())
+    assert exc.value.errors == [
+        "revoke.2: also granted in this request",
+        "revoke.1.role: unknown role 'no-such-role'",
+        "grant.1.user_id: unknown user 'no-such-user'",
+    ]
+    assert await active_grants(db_session, account.id) == before
+
+
+async def test_cannot_grant_permissions_not_held(db_session, suffix, make_user):
+    read, write, admin = (Permission(name=f"{name}.{suffix}", scope=name) for name in ("read", "write", "admin"))
+    editor = Role(name=f"editor-{suffix}", permissions=[read, write])
+    viewer = Role(name=f"viewer-{suffix}", permissions=[read])
+    owner = Role(name=f"owner-{suffix}", permissions=[read, write, admin])
+    account, other = Account(name=f"escalate-{suffix}"), Account(name=f"escalate-other-{suffix}")
+    caller, target = make_user(f"caller-{suffix}"), make_user(f"target-{suffix}")
+    db_session.add_all([read, write, admin, editor, viewer, owner, account, other, caller, target,
+                        Grant(user=caller, role=editor, account=account),
+                        # Held on another account only: doesn't count on this one
+                        Grant(user=caller, role=owner, account=other)])
+    await db_session.commit()
+
+    with pytest.raises(GrantBatchError) as exc:
+        await apply_grant_changes(change_set(grant=[(target.id, viewer.name), (caller.id, owner.name)]),
+                                  account.id, db_session, granted_by=caller.id, revocations=RevocationIndex())
+    assert exc.value.errors == [f"grant.1.role: role {owner.name!r} has permissions you don't hold on this account"]
+    assert await active_grants(db_session, account.id) == {(caller.id, editor.name)}
+
+    results = await apply_grant_changes(change_set(grant=[(target.id, viewer.name), (target.id, editor.name)]),
+                                        account.id, db_session, granted_by=caller.id, revocations=RevocationIndex())
+    assert [r["status"] for r in results["grant"]] == [GRANTED, GRANTED]
+
+
+async def test_failed_commit_revokes_nothing(db_session, reorg):
+    account, old_role, new_role, user_ids = reorg
+    account_id, role = account.id, old_role.name
+    revocations = RevocationIndex()
+
+    def fail(session):
+        raise RuntimeError("commit failed")
+    sqlalchemy.event.listen(db_session.sync_session, "before_commit", fail, once=True)
+    with pytest.raises(RuntimeError):
+        await apply_grant_changes(change_set(revoke=[(user_ids[0], role)]), account_id, db_session,
+                                  revocations=revocations)
+    await db_session.rollback()
+    issued = int(time.time()) - 1
+    # The grant is still active, so its holder's tokens must still be accepted
+    assert (user_ids[0], role) in await active_grants(db_session, account_id)
+    assert not revocations.is_revoked({"type": "access", "sub": user_ids[0], "iat": issued})
+    assert len(revocations) == 0
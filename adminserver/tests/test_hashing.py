@@ -0,0 +1,40 @@
+import pytest
+from src.services.hashing import PasswordHasher, HashingQueueFull
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_in_pool():
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    try:
+        password_hash = await hasher.hash("secret")
+        assert await hasher.verify(password_hash, "secret")
+        assert not await hasher.verify(password_hash, "wrong")
+        assert hasher.pending == 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hashing_queue_full():
+    hasher = PasswordHasher(workers=1, max_pending=0)
+    with pytest.raises(HashingQueueFull):
+        await hasher.hash("secret")
+    assert hasher.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_hash_inline():
+    hasher = PasswordHasher(workers=0)
+    password_hash = await hasher.hash("secret")
+    assert await hasher.verify(password_hash, "secret")
+
+
+@pytest.mark.asyncio
+async def test_hash_many_keeps_order():
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    try:
+        hashes = await hasher.hash_many(["one", "two", "three"], chunk_size=2)
+        assert [await hasher.verify(h, p) for h, p in zip(hashes, ["one", "two", "three"])] == [True] * 3
+        assert hasher.pending == 0
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import pytest
+import sqlalchemy
+import subprocess
+from src.services.metrics import MetricsRegistry, install_db_metrics, db_query_duration
+from src.services.auth_manager import auth_manager as app_auth_manager
+
+
+def worker(directory, name):
+    registry = MetricsRegistry(directory=str(directory), process_id=name)
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    in_flight = registry.gauge("in_flight", "In flight")
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    return registry, requests, in_flight, latency
+
+
+def test_render_histogram_and_counters(tmp_path):
+    registry, requests, in_flight, latency = worker("", "single")
+    requests.inc("/a")
+    requests.inc("/a")
+    in_flight.inc()
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, '/b"')
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'requests_total{route="/a"} 2' in lines
+    assert "in_flight 1" in lines
+    assert [line for line in lines if line.startswith("latency_seconds")] == [
+        'latency_seconds_bucket{route="/b\\"",le="0.1"} 2',
+        'latency_seconds_bucket{route="/b\\"",le="1"} 3',
+        'latency_seconds_bucket{route="/b\\"",le="+Inf"} 4',
+        'latency_seconds_sum{route="/b\\""} 3.65',
+        'latency_seconds_count{route="/b\\""} 4',
+    ]
+
+
+def test_workers_are_merged(tmp_path):
+    first, first_requests, first_in_flight, first_latency = worker(tmp_path, "first")
+    second, second_requests, second_in_flight, second_latency = worker(tmp_path, "second")
+    first_requests.inc("/a")
+    first_latency.observe(0.05, "/a")
+    first_in_flight.inc()
+    second_requests.inc("/a", amount=2)
+    second_requests.inc("/b")
+    second_latency.observe(2, "/a")
+    second_in_flight.inc()
+    second.flush()
+
+    lines = first.render().splitlines()
+    assert 'requests_total{route="/a"} 3' in lines
+    assert 'requests_total{route="/b"} 1' in lines
+    assert "in_flight 2" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_count{route="/a"} 2' in lines
+
+    # A snapshot left behind by a dead process is folded into the aggregate: its counts stay, its gauges go
+    stale = time.time() - first.stale_after - 1
+    os.utime(tmp_path / "second.json", (stale, stale))
+    lines = first.render().splitlines()
+    assert not (tmp_path / "second.json").exists() and (tmp_path / "_aggregate.json").exists()
+    assert 'requests_total{route="/a"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 2' in lines
+    assert "in_flight 1" in lines
+    # and only once
+    assert first.render().splitlines() == lines
+
+
+async def test_finished_workers_keep_their_totals(tmp_path):
+    first, first_requests, _, _ = worker(tmp_path, "first")
+    second, second_requests, second_in_flight, _ = worker(tmp_path, "second")
+    first_requests.inc("/a")
+    second_requests.inc("/a", amount=2)
+    second_in_flight.inc()
+    second.start()
+    await second.stop()
+    assert not (tmp_path / "second.json").exists()
+    lines = first.render().splitlines()
+    assert 'requests_total{route="/a"} 3' in lines
+    assert not any(line.startswith("in_flight ") for line in lines)
+
+    # A snapshot named by a PID is folded as soon as that process is gone, however recent
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    third, third_requests, _, _ = worker(tmp_path, str(dead.pid))
+    third_requests.inc("/b")
+    third.flush()
+    assert first.collect_finished() == 1
+    lines = first.render().splitlines()
+    assert 'requests_total{route="/a"} 3' in lines and 'requests_total{route="/b"} 1' in lines
+    # A live process's snapshot is never folded
+    alive, alive_requests, _, _ = worker(tmp_path, str(os.getpid()))
+    alive.flush()
+    assert first.collect_finished() == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(test_client):
+    await test_client.get("/api/v1/liveness")
+    await test_client.get("/api/v1/user/me")
+    expired = app_auth_manager._sign(app_auth_manager._build_payload({"sub": "someone"}, -1, "access"))
+    await test_client.get("/api/v1/user/me", headers={"Authorization": f"Bearer {expired}"})
+    response = await test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = await response.get_data(as_text=True)
+    assert 'http_requests_total{method="GET",route="/api/v1/liveness",status="200"}' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/user/me"}' in body
+    assert 'token_verifications_total{result="missing"}' in body
+    assert 'token_verifications_total{result="expired"}' in body
+    assert 'cache_hits_total{cache="token"}' in body
+
+
+def test_db_timings_survive_failed_statements():
+    engine = sqlalchemy.create_engine("sqlite://")
+    install_db_metrics(engine)
+
+    def selects() -> int:
+        series = dict((tuple(labels), value) for labels, value in db_query_duration.samples())
+        return sum(series.get(("select",), [0])[:-1])
+
+    before = selects()
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(sqlalchemy.exc.OperationalError):
+                conn.execute(sqlalchemy.text("SELECT * FROM no_such_table"))
+        conn.execute(sqlalchemy.text("SELECT 1"))
+        # Nothing is left behind on the pooled connection
+        assert not conn.info
+    assert selects() == before + 1
+    engine.dispose()
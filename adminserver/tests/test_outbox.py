@@ -0,0 +1,100 @@
+import smtplib
+import datetime
+import pytest
+import sqlalchemy
+from email.message import EmailMessage
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from src.models.models import EmailOutbox
+from src.services.outbox import OutboxWorker, SMTPConnectionPool
+
+
+class FakeSMTPServer:
+    """In-process stand-in for an SMTP server: records deliveries and raises queued errors."""
+    def __init__(self):
+        self.delivered = []
+        self.connections = 0
+        self.errors = []
+
+    def connect(self):
+        self.connections += 1
+        return FakeSMTPConnection(self)
+
+
+class FakeSMTPConnection:
+    def __init__(self, server):
+        self.server = server
+
+    def sendmail(self, sender, recipient, message):
+        if self.server.errors:
+            raise self.server.errors.pop(0)
+        self.server.delivered.append((sender, recipient, message))
+
+    def quit(self):
+        pass
+
+
+def make_message(recipient):
+    message = EmailMessage()
+    message["To"] = recipient
+    message["Subject"] = "Validate your email"
+    message.set_content("hello")
+    return message
+
+
+@pytest.fixture()
+def smtp_server():
+    return FakeSMTPServer()
+
+
+@pytest.fixture()
+def worker(db_engine, smtp_server):
+    session_factory = sessionmaker(bind=db_engine, class_=AsyncSession, expire_on_commit=False)
+    return OutboxWorker(pool=SMTPConnectionPool(smtp_server.connect, size=2),
+                        session_factory=session_factory,
+                        sender="admin@test.dev",
+                        batch_size=4,
+                        backoff=60)
+
+
+async def entry(worker, entry_id):
+    async with worker.session_factory() as session:
+        return await session.get(EmailOutbox, entry_id)
+
+
+async def test_outbox_delivers_in_batches_over_pooled_connections(worker, smtp_server):
+    ids = [await worker.enqueue(make_message(f"user{i}@example.com"), f"user{i}@example.com") for i in range(10)]
+    assert await worker.drain() == 10
+    assert sorted(recipient for _, recipient, _ in smtp_server.delivered) == sorted(f"user{i}@example.com"
+                                                                                      for i in range(10))
+    assert smtp_server.connections <= 2
+    assert [(await entry(worker, entry_id)).status for entry_id in ids] == ["sent"] * 10
+
+
+async def test_outbox_retries_transient_errors_with_backoff(worker, smtp_server):
+    smtp_server.errors.append(smtplib.SMTPServerDisconnected("connection lost"))
+    entry_id = await worker.enqueue(make_message("retry@example.com"), "retry@example.com")
+    assert await worker.drain() == 1
+    retry = await entry(worker, entry_id)
+    assert (retry.status, retry.attempts, retry.claim) == ("pending", 1, None)
+    assert retry.next_attempt_date > datetime.datetime.now()
+    # Not due yet
+    assert await worker.drain() == 0
+
+    async with worker.session_factory() as session:
+        await session.execute(sqlalchemy.update(EmailOutbox).where(EmailOutbox.id == entry_id)
+                              .values(next_attempt_date=datetime.datetime.now(tz=datetime.timezone.utc)))
+        await session.commit()
+    assert await worker.drain() == 1
+    assert (await entry(worker, entry_id)).status == "sent"
+    # The dropped connection was replaced
+    assert smtp_server.connections == 2
+
+
+async def test_outbox_fails_permanent_errors_immediately(worker, smtp_server):
+    smtp_server.errors.append(smtplib.SMTPDataError(550, b"mailbox unavailable"))
+    entry_id = await worker.enqueue(make_message("gone@example.com"), "gone@example.com")
+    await worker.drain()
+    failed = await entry(worker, entry_id)
+    assert (failed.status, failed.attempts) == ("failed", 1)
+    assert "mailbox unavailable" in failed.last_error
@@ -0,0 +1,81 @@
+import datetime
+import pytest
+from src.models.models import Account, Role, User, Grant
+from src.services.pagination import PageRequest, InvalidPageRequest, encode_cursor, decode_cursor
+from src.api.v1.account.account_user import account_users_query
+
+
+def test_cursor_round_trip():
+    created = datetime.datetime(2026, 1, 2, 3, 4, 5, 678)
+    cursor = encode_cursor("desc", created, "user-id")
+    assert decode_cursor(cursor) == ("desc", created, "user-id")
+    page = PageRequest.from_args({"cursor": cursor, "limit": "5"})
+    assert (page.limit, page.order, page.after) == (5, "desc", (created, "user-id"))
+
+
+def test_unpaginated_and_invalid_requests():
+    assert PageRequest.from_args({}) is None
+    assert PageRequest.from_args({"order": "desc"}) is None
+    assert PageRequest.from_args({"limit": "10"}).after is None
+    for args in ({"limit": "0"}, {"limit": "5000"}, {"limit": "ten"}, {"cursor": "not-a-cursor"},
+                 {"limit": "10", "order": "sideways"}):
+        with pytest.raises(InvalidPageRequest):
+            PageRequest.from_args(args, max_limit=1000)
+
+
+@pytest.fixture()
+async def populated_account(db_session, suffix, make_user):
+    account, other = Account(name=f"paged-{suffix}"), Account(name=f"other-{suffix}")
+    role = Role(name=f"member-{suffix}")
+    created = datetime.datetime(2026, 1, 1)
+    users = []
+    for i in range(7):
+        user = make_user(f"paged-{suffix}-{i}", f"paged-{suffix}-{i}@example.com")
+        # Pairs of users share a created_date, so the id breaks ties
+        user.created_date = created + datetime.timedelta(minutes=i // 2)
+        users.append(user)
+        db_session.add(Grant(user=user, role=role, account=account))
+        # A second grant on the account must not duplicate the user
+        db_session.add(Grant(user=user, role=role, account=account))
+    outsider = make_user(f"outsider-{suffix}", f"outsider-{suffix}@example.com")
+    db_session.add_all([account, other, role, outsider, Grant(user=outsider, role=role, account=other)])
+    await db_session.commit()
+    users.sort(key=lambda user: (user.created_date, user.id))
+    return account, [user.id for user in users]
+
+
+async def collect(account_id, db_session, **args):
+    pages, cursor = [], None
+    while True:
+        page_args = dict(args, cursor=cursor) if cursor else args
+        page = await User.get_json_page_by_account(account_id, PageRequest.from_args(page_args), db_session)
+        pages.append([user["id"] for user in page["data"]])
+        if (cursor := page["next"]) is None:
+            return pages
+
+
+async def test_pages_cover_the_account_in_order(db_session, populated_account):
+    account, user_ids = populated_account
+    pages = await collect(account.id, db_session, limit="3")
+    assert pages == [user_ids[0:3], user_ids[3:6], user_ids[6:]]
+    pages = await collect(account.id, db_session, limit="4", order="desc")
+    assert sum(pages, []) == user_ids[::-1] and [len(page) for page in pages] == [4, 3]
+    pages = await collect(account.id, db_session, limit="7")
+    assert pages == [user_ids]
+
+
+async def test_account_users_query_pages_by_keyset(db_engine, db_session, populated_account):
+    account, user_ids = populated_account
+    page = PageRequest(2, after=(datetime.datetime(2026, 1, 1, 0, 1), user_ids[2]))
+    result = await db_session.execute(page.apply(account_users_query(account.id, keyset=True), User.created_date, User.id))
+    users, next_cursor = page.split(result.scalars().all())
+    assert [user.id for user in users] == user_ids[3:5]
+    assert decode_cursor(next_cursor)[2] == user_ids[4]
+
+    statement = page.apply(account_users_query(account.id, keyset=True), User.created_date, User.id)
+    async with db_engine.connect() as conn:
+        compiled = statement.compile(conn.sync_connection, compile_kwargs={"literal_binds": True})
+        details = [row[-1] for row in await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")]
+    # Seeks from the cursor in index order: no full scan and no sort of the account's users
+    assert any(detail.startswith("SEARCH user USING INDEX ix_user_created_date_id") for detail in details), details
+    assert not any("TEMP B-TREE" in detail for detail in details), details
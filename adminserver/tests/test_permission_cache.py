@@ -0,0 +1,70 @@
+import pytest
+from src.services.change_tracker import ChangeTracker, change_tracker
+from src.services.permission_cache import PermissionCache
+from src.models.models import Account, Permission, Role, User
+
+
+@pytest.fixture()
+def cache():
+    return PermissionCache(ChangeTracker(), max_size=2, ttl=60)
+
+
+def test_cache_hit_and_miss(cache):
+    assert cache.get("u1") is None
+    cache.put("u1", {"sub": "u1"}, cache.version)
+    assert cache.get("u1") == {"sub": "u1"}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_lru_eviction(cache):
+    cache.put("u1", {"sub": "u1"}, cache.version)
+    cache.put("u2", {"sub": "u2"}, cache.version)
+    cache.get("u1")
+    cache.put("u3", {"sub": "u3"}, cache.version)
+    assert cache.get("u2") is None
+    assert cache.get("u1") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_version_invalidation(cache):
+    version = cache.version
+    cache.put("u1", {"sub": "u1"}, version)
+    cache.tracker.bump("role_permission")
+    assert cache.get("u1") is None
+
+
+def test_cache_ignores_unrelated_tables(cache):
+    cache.put("u1", {"sub": "u1"}, cache.version)
+    cache.tracker.bump("email")
+    assert cache.get("u1") == {"sub": "u1"}
+
+
+def test_cache_stale_load_is_not_served(cache):
+    # A change committed while the claims were being loaded must not be masked by the cache
+    version = cache.version
+    cache.tracker.bump("grant")
+    cache.put("u1", {"sub": "u1"}, version)
+    assert cache.get("u1") is None
+
+
+def test_cache_ttl(cache):
+    cache.ttl = 0
+    cache.put("u1", {"sub": "u1"}, cache.version)
+    assert cache.get("u1") is None
+
+
+@pytest.mark.asyncio
+async def test_commit_bumps_tracked_tables(db_session):
+    before = change_tracker.version("grant", "role", "role_permission", "email")
+    permission = Permission(name="cache.read", display_name="Cache Read", scope="read")
+    role = Role(name="cache.reader", display_name="Cache Reader", permissions=[permission])
+    account = Account(name="cache-account")
+    user = User(name="cache-user", password="secret", email="cache-user@local.host")
+    db_session.add_all([permission, role, account, user])
+    await db_session.flush()
+    assert change_tracker.version("grant", "role", "role_permission", "email") == before
+
+    await user.grant_role(role.id, account.id, db_session)
+    after = change_tracker.version("grant", "role", "role_permission", "email")
+    assert all(new == old + 1 for new, old in zip(after, before))
@@ -0,0 +1,39 @@
+import pytest
+from src.services.permission_claims import encode_permissions, has_any_permission, COMPACT, ACTIVE, FULL
+
+PERMISSIONS = {
+    "acct-1": ["account.read", "account.write"],
+    "acct-2": ["account.read"],
+    "acct-3": ["location.read"],
+}
+
+
+@pytest.mark.parametrize("fmt", [FULL, COMPACT])
+def test_has_any_permission(fmt):
+    claims = encode_permissions(PERMISSIONS, fmt, "acct-1")
+    assert has_any_permission(claims, "acct-1", ["account.write"])
+    assert has_any_permission(claims, "acct-2", ["account.write", "account.read"])
+    assert not has_any_permission(claims, "acct-2", ["account.write"])
+    assert not has_any_permission(claims, "acct-4", ["account.read"])
+    assert not has_any_permission(claims, "acct-3", ["unknown.permission"])
+
+
+def test_compact_format_shape():
+    claims = encode_permissions(PERMISSIONS, COMPACT, "acct-1")
+    assert "permissions" not in claims
+    compact = claims["pm"]
+    assert compact["n"] == ["account.read", "account.write", "location.read"]
+    assert compact["a"] == {"acct-1": 0b011, "acct-2": 0b001, "acct-3": 0b100}
+    assert compact["v"] == encode_permissions(PERMISSIONS, COMPACT, "acct-2")["pm"]["v"]
+
+
+def test_active_format_only_carries_active_account():
+    claims = encode_permissions(PERMISSIONS, ACTIVE, "acct-2")
+    assert list(claims["pm"]["a"]) == ["acct-2"]
+    assert has_any_permission(claims, "acct-2", ["account.read"])
+    assert not has_any_permission(claims, "acct-1", ["account.read"])
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        encode_permissions(PERMISSIONS, "bogus", "acct-1")
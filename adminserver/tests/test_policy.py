@@ -0,0 +1,115 @@
+import uuid
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from src.models.models import Permission, PolicyRule
+from src.services.change_tracker import ChangeTracker
+from src.services.permission_claims import encode_permissions, COMPACT, FULL
+from src.services.policy import Policy, PolicyEngine, policy_version
+import config as cfg
+
+DOCUMENT = {
+    "permissions": ["account.read", "account.write", "location.read", "role.write"],
+    "roles": {"admin": ["account.read", "account.write", "role.write"], "empty": []},
+    "rules": [
+        {"service": "adminserver", "method": "GET", "path": "/api/v1/account", "permissions": ["account.read"]},
+        {"service": "adminserver", "method": "DELETE", "path": "/api/v1/account", "permissions": ["role:admin"]},
+        {"service": "adminserver", "method": "POST", "path": "/api/v1/role", "permissions": ["role.write", "role:empty"],
+         "attributes": {"type": ["user"]}},
+        {"service": "adminserver", "method": "GET", "path": "/api/v1/liveness", "permissions": []},
+        {"service": "locationserv", "method": "GET", "path": "/locations", "permissions": ["location.read"]},
+    ],
+}
+
+PERMISSIONS = {
+    "acct-1": ["account.read", "account.write", "role.write"],
+    "acct-2": ["account.read"],
+}
+
+
+@pytest.mark.parametrize("fmt", [FULL, COMPACT])
+def test_rules(fmt):
+    policy = Policy(DOCUMENT, "adminserver")
+    claims = {**encode_permissions(PERMISSIONS, fmt, "acct-1"), "type": "user"}
+    assert policy.allows(claims, "acct-2", "GET", "/api/v1/account")
+    assert policy.allows(claims, "acct-2", "HEAD", "/api/v1/account")
+    assert not policy.allows(claims, "acct-3", "GET", "/api/v1/account")
+    # A role entry needs every permission of the role
+    assert policy.allows(claims, "acct-1", "DELETE", "/api/v1/account")
+    assert not policy.allows(claims, "acct-2", "DELETE", "/api/v1/account")
+    # Attributes must match on top of the permissions, and an empty role matches nobody
+    assert policy.allows(claims, "acct-1", "POST", "/api/v1/role")
+    assert not policy.allows({**claims, "type": "service"}, "acct-1", "POST", "/api/v1/role")
+    assert not policy.allows(claims, "acct-2", "POST", "/api/v1/role")
+    assert policy.allows(claims, "acct-3", "GET", "/api/v1/liveness")
+
+
+def test_endpoints_without_rule_use_default():
+    policy = Policy(DOCUMENT, "adminserver")
+    claims = encode_permissions(PERMISSIONS, COMPACT, "acct-1")
+    assert ("GET", "/locations") not in policy.rules
+    assert policy.allows(claims, "acct-2", "GET", "/api/v1/user")
+    assert policy.allows(claims, "acct-2", "GET", "/api/v1/user", ("account.write", "account.read"))
+    assert not policy.allows(claims, "acct-2", "GET", "/api/v1/user", ("account.write",))
+    assert not policy.allows(claims, "acct-1", "GET", "/api/v1/user", ("unknown.permission",))
+
+
+def test_version_is_content_digest():
+    assert Policy(DOCUMENT).version == policy_version(DOCUMENT)
+    assert policy_version({**DOCUMENT, "version": "x"}) == policy_version(DOCUMENT)
+    assert policy_version({**DOCUMENT, "permissions": []}) != policy_version(DOCUMENT)
+
+
+async def test_engine_reloads_on_commit(db_engine, db_session):
+    tracker = ChangeTracker()
+    engine = PolicyEngine(session_factory=sessionmaker(bind=db_engine, class_=AsyncSession), tracker=tracker)
+    name = f"policy.{uuid.uuid4().hex[:8]}"
+    claims = {"permissions": {"acct-1": [name]}}
+    path = f"/api/v1/test/{uuid.uuid4().hex}"
+
+    # Before the first load decisions fall back to the token's permissions
+    assert engine.allows(claims, "acct-1", "GET", path, (name,))
+    await engine.start()
+    try:
+        before = engine.policy.version
+        db_session.add_all([
+            Permission(name=name, scope="account"),
+            PolicyRule(service="adminserver", method="GET", path=path, permissions=[name]),
+        ])
+        await db_session.commit()
+        tracker.bump("permission", "policy_rule")
+        for _ in range(50):
+            if engine.policy.version != before:
+                break
+            await asyncio.sleep(0.01)
+        assert engine.policy.version != before
+        assert engine.allows(claims, "acct-1", "GET", path)
+        assert not engine.allows(claims, "acct-2", "GET", path)
+        assert not await engine.reload()
+    finally:
+        await engine.stop()
+
+
+async def test_policy_document_endpoint(app, monkeypatch):
+    from src.services.policy import policy_engine
+    monkeypatch.setattr(cfg, "POLICY_TOKEN", "policy-secret")
+    async with app.test_app() as test_app:
+        monkeypatch.setattr(policy_engine, "policy", Policy(DOCUMENT, "adminserver"))
+        client = test_app.test_client()
+        # Not public: only services holding the credential may read it
+        assert (await client.get("/auth/.well-known/policy.json")).status_code == 401
+        wrong = {"Authorization": "Bearer not-the-secret"}
+        assert (await client.get("/auth/.well-known/policy.json", headers=wrong)).status_code == 401
+
+        authorized = {"Authorization": "Bearer policy-secret"}
+        response = await client.get("/auth/.well-known/policy.json", headers=authorized)
+        assert response.status_code == 200
+        assert (await response.get_json())["rules"] == DOCUMENT["rules"]
+        etag = response.headers["ETag"]
+        assert etag.strip('"') == policy_version(DOCUMENT)
+        revalidate = {**authorized, "If-None-Match": etag}
+        assert (await client.get("/auth/.well-known/policy.json", headers=revalidate)).status_code == 304
+
+        monkeypatch.setattr(cfg, "POLICY_TOKEN", "")
+        assert (await client.get("/auth/.well-known/policy.json", headers=authorized)).status_code == 401
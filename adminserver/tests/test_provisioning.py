@@ -0,0 +1,139 @@
+import pytest
+import sqlalchemy
+from werkzeug.security import check_password_hash
+from src.models.models import Account, Permission, Role, User, Email, Grant, UNUSABLE_PASSWORD
+from src.services.hashing import PasswordHasher
+from src.services.provisioning import provision_users, BulkRequestError, TooManyPasswords, CREATED, INVALID
+
+
+@pytest.fixture()
+async def account_and_role(db_session, suffix, make_user):
+    account, role = Account(name=f"bulk-{suffix}"), Role(name=f"bulk-reader-{suffix}")
+    existing = make_user(f"bulk-existing-{suffix}", f"existing-{suffix}@example.com")
+    db_session.add_all([account, role, existing])
+    await db_session.commit()
+    return account, role, suffix
+
+
+async def test_valid_rows_created_in_one_go(db_session, account_and_role, password_hash):
+    account, role, suffix = account_and_role
+    rows = [
+        {"username": f"bulk-{suffix}-0", "email": f"Bulk-{suffix}-0@Example.com", "password": "correct horse",
+         "roles": [role.name]},
+        {"username": f"bulk-{suffix}-1", "email": f"bulk-{suffix}-1@example.com", "password_hash": password_hash,
+         "roles": [role.name, role.name]},
+        {"username": f"bulk-{suffix}-2", "type": "service"},
+        # Invalid rows are reported and skipped
+        {"username": f"bulk-{suffix}-0"},
+        {"username": f"bulk-existing-{suffix}"},
+        {"username": f"bulk-{suffix}-5", "email": f"existing-{suffix}@example.com"},
+        {"username": f"bulk-{suffix}-6", "roles": ["no-such-role"]},
+        {"username": f"bulk-{suffix}-7", "email": "not-an-email", "password": "short"},
+        "not a row",
+    ]
+    results = await provision_users(rows, account.id, db_session, hasher=PasswordHasher(workers=0), batch_size=2)
+
+    assert [result["status"] for result in results] == [CREATED] * 3 + [INVALID] * 6
+    assert [result["index"] for result in results] == list(range(len(rows)))
+    assert results[3]["errors"] == ["username: duplicate in request"]
+    assert results[4]["errors"] == ["username: already exists"]
+    assert results[5]["errors"] == ["email: already exists"]
+    assert "unknown roles" in results[6]["errors"][0]
+    assert len(results[7]["errors"]) == 2
+
+    users = {user.name: user for user in (await db_session.execute(
+        sqlalchemy.select(User).where(User.id.in_([result["id"] for result in results[:3]]))
+    )).scalars()}
+    assert check_password_hash(users[f"bulk-{suffix}-0"].password, "correct horse")
+    assert users[f"bulk-{suffix}-1"].password == password_hash
+    assert users[f"bulk-{suffix}-2"].password == UNUSABLE_PASSWORD and users[f"bulk-{suffix}-2"].type == "service"
+    assert users[f"bulk-{suffix}-0"].primary_email.email == f"bulk-{suffix}-0@example.com"
+    grants = (await db_session.execute(
+        sqlalchemy.select(Grant.user_id).where(Grant.account_id == account.id, Grant.role_id == role.id)
+    )).scalars().all()
+    assert sorted(grants) == sorted([results[0]["id"], results[1]["id"]])
+
+
+async def test_nothing_valid_writes_nothing(db_session, account_and_role):
+    account, role, suffix = account_and_role
+    results = await provision_users([{"username": ""}], account.id, db_session, hasher=PasswordHasher(workers=0))
+    assert results[0]["status"] == INVALID
+    assert await db_session.scalar(
+        sqlalchemy.select(sqlalchemy.func.count()).select_from(Email).where(Email.email.like(f"%{suffix}%"))
+    ) == 1
+
+
+@pytest.mark.parametrize("rows", [[], {"username": "x"}, [{"username": f"u{i}"} for i in range(3)]])
+async def test_rejected_requests(db_session, rows):
+    with pytest.raises(BulkRequestError):
+        await provision_users(rows, "account", db_session, max_rows=2)
+
+
+class SessionCheckingHasher(PasswordHasher):
+    """Inline hasher recording whether the session still held a transaction while hashing."""
+    def __init__(self, db_session):
+        super().__init__(workers=0)
+        self.db_session = db_session
+        self.in_transaction = []
+
+    async def hash_many(self, passwords, chunk_size=16):
+        self.in_transaction.append(self.db_session.in_transaction())
+        return await super().hash_many(passwords, chunk_size)
+
+
+async def test_names_trimmed_but_passwords_kept_as_given(db_session, account_and_role):
+    account, role, suffix = account_and_role
+    hasher = SessionCheckingHasher(db_session)
+    rows = [{"username": f"  bulk-{suffix}-spaced ", "email": f" spaced-{suffix}@example.com ",
+             "password": "  my secret pass  "}]
+    results = await provision_users(rows, account.id, db_session, hasher=hasher)
+    assert results[0]["status"] == CREATED
+    # The connection is released before the (slow) hashing
+    assert hasher.in_transaction == [False]
+
+    user = await db_session.get(User, results[0]["id"])
+    assert user.name == f"bulk-{suffix}-spaced"
+    assert check_password_hash(user.password, "  my secret pass  ")
+    assert not check_password_hash(user.password, "my secret pass")
+
+
+async def test_plain_text_passwords_are_capped(db_session, suffix, password_hash):
+    rows = [{"username": f"capped-{suffix}-{i}", "password": "long enough"} for i in range(3)]
+    with pytest.raises(TooManyPasswords):
+        await provision_users(rows, "account", db_session, max_passwords=2)
+    # Pre-hashed rows don't count
+    rows[2] = {"username": f"capped-{suffix}-2", "password_hash": password_hash}
+    results = await provision_users(rows, "account", db_session, hasher=PasswordHasher(workers=0), max_passwords=2)
+    assert [result["status"] for result in results] == [CREATED] * 3
+
+
+async def test_cannot_provision_roles_above_the_caller(db_session, suffix, make_user):
+    read, write = (Permission(name=f"{name}.{suffix}", scope=name) for name in ("read", "write"))
+    viewer = Role(name=f"bulk-viewer-{suffix}", permissions=[read])
+    owner = Role(name=f"bulk-owner-{suffix}", permissions=[read, write])
+    account = Account(name=f"bulk-escalate-{suffix}")
+    caller = make_user(f"bulk-caller-{suffix}")
+    db_session.add_all([read, write, viewer, owner, account, caller, Grant(user=caller, role=viewer, account=account)])
+    await db_session.commit()
+    account_id, caller_id = account.id, caller.id
+
+    rows = [{"username": f"bulk-{suffix}-viewer", "roles": [viewer.name]},
+            {"username": f"bulk-{suffix}-owner", "password": "chosen by the caller", "roles": [viewer.name, owner.name]}]
+    results = await provision_users(rows, account_id, db_session, granted_by=caller_id,
+                                    hasher=PasswordHasher(workers=0))
+    assert [result["status"] for result in results] == [CREATED, INVALID]
+    assert results[1]["errors"] == [f"roles: {[owner.name]} have permissions you don't hold on this account"]
+    assert await db_session.scalar(sqlalchemy.select(User.id).where(User.name == f"bulk-{suffix}-owner")) is None
+
+
+@pytest.mark.parametrize("password_hash", [
+    "foo$bar$baz", "pbkdf2:sha256:abc$salt$00", "pbkdf2:shake_128:1$salt$00",
+    "scrypt:3:8:1$salt$00", "scrypt:16:8:1$salt$00", "scrypt:32768$salt$00",
+])
+async def test_malformed_password_hashes_are_rejected(db_session, suffix, password_hash):
+    results = await provision_users([{"username": f"bulk-{suffix}-hash", "password_hash": password_hash}],
+                                    "account", db_session)
+    assert results[0]["status"] == INVALID and results[0]["errors"][0].startswith("password_hash: ")
+    # werkzeug couldn't check it: every login would fail with an error
+    with pytest.raises(ValueError):
+        check_password_hash(password_hash, "")
@@ -0,0 +1,103 @@
+import contextlib
+import pytest
+import sqlalchemy
+from src.models.models import Account, Permission, Role, User, Email, Grant, TokenEvent
+from src.api.v1.account.account_user import account_users_query
+
+
+@contextlib.contextmanager
+def captured_selects(engine):
+    """Collect every SELECT (statement, parameters) run on the engine while the block executes."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    sqlalchemy.event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        sqlalchemy.event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+async def assert_no_scans(db_engine, statements):
+    assert statements
+    async with db_engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            details = [row[-1] for row in plan]
+            scans = [detail for detail in details if detail.startswith("SCAN") and "CONSTANT ROW" not in detail]
+            assert not scans, f"{statement}\n{details}"
+
+
+@pytest.fixture()
+async def tenant(db_session, suffix, make_user):
+    permission = Permission(name=f"account.read.{suffix}", scope="Read")
+    role = Role(name=f"reader.{suffix}", permissions=[permission])
+    account = Account(name=f"account-{suffix}")
+    user = make_user(f"user-{suffix}", f"user-{suffix}@example.com")
+    db_session.add_all([permission, role, account, user])
+    db_session.add(Grant(user=user, role=role, account=account))
+    await db_session.flush()
+    event = TokenEvent("email", f"new-{suffix}@example.com", created_by=user.id)
+    db_session.add(event)
+    await db_session.commit()
+    return {"account": account, "user": user, "email": f"user-{suffix}@example.com", "token": event.token}
+
+
+async def test_get_all_json_by_account_uses_indexes(db_engine, db_session, tenant):
+    with captured_selects(db_engine) as statements:
+        users = await User.get_all_json_by_account(tenant["account"].id, db_session)
+    assert [user["id"] for user in users] == [tenant["user"].id]
+    await assert_no_scans(db_engine, statements)
+
+
+async def test_get_all_json_by_account_query_count_is_constant(db_engine, db_session, tenant, suffix, make_user):
+    account = tenant["account"]
+    with captured_selects(db_engine) as statements:
+        await User.get_all_json_by_account(account.id, db_session)
+    baseline = len(statements)
+
+    role = await db_session.get(Role, tenant["user"].grants[0].role_id)
+    other = Account(name=f"other-{suffix}")
+    for i in range(20):
+        name = f"member-{suffix}-{i}"
+        user = make_user(name, f"{name}@example.com")
+        db_session.add_all([user, Grant(user=user, role=role, account=account), Grant(user=user, role=role, account=other)])
+    await db_session.commit()
+    db_session.expunge_all()
+
+    with captured_selects(db_engine) as statements:
+        users = await User.get_all_json_by_account(account.id, db_session)
+    assert len(users) == 21
+    assert len(statements) == baseline
+    permission = role.permissions[0].name
+    assert all(user["permissions"].get(account.id) == [permission] for user in users)
+
+
+async def test_email_login_uses_indexes(db_engine, db_session, tenant):
+    with captured_selects(db_engine) as statements:
+        user = await User.email_login(tenant["email"], "password", db_session)
+    assert user.id == tenant["user"].id
+    await assert_no_scans(db_engine, statements)
+
+
+async def test_accept_token_uses_indexes(db_engine, db_session, tenant):
+    with captured_selects(db_engine) as statements:
+        accepted, _ = await TokenEvent.accept_token(tenant["token"], db_session)
+    assert accepted
+    await assert_no_scans(db_engine, statements)
+
+
+async def test_get_account_users_uses_indexes(db_engine, db_session, tenant):
+    with captured_selects(db_engine) as statements:
+        result = await db_session.execute(account_users_query(tenant["account"].id))
+    assert [user.id for user in result.scalars().unique()] == [tenant["user"].id]
+    await assert_no_scans(db_engine, statements)
+
+
+async def test_single_primary_email_per_user(db_session, tenant, suffix):
+    db_session.add(Email(email=f"second-{suffix}@example.com", user_id=tenant["user"].id, primary=True))
+    with pytest.raises(sqlalchemy.exc.IntegrityError):
+        await db_session.flush()
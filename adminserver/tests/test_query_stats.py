@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import pytest
+import sqlalchemy
+from src.services.query_stats import QueryInstrumentation, statement_shape
+
+
+def test_statement_shape_collapses_in_lists():
+    assert statement_shape("SELECT * FROM grant\n WHERE grant.user_id IN (?, ?, ?)") == \
+        statement_shape("SELECT * FROM grant WHERE grant.user_id IN (?)")
+    assert statement_shape("SELECT 1 WHERE x IN (%(a)s, %(b)s)") == "SELECT 1 WHERE x IN (?)"
+
+
+@pytest.fixture()
+def instrumentation(db_engine):
+    instrumentation = QueryInstrumentation(repeat_threshold=3, slow_request_ms=10_000)
+    instrumentation.install(db_engine)
+    yield instrumentation
+    sync_engine = db_engine.sync_engine
+    sqlalchemy.event.remove(sync_engine, "before_cursor_execute", instrumentation._before_cursor_execute)
+    sqlalchemy.event.remove(sync_engine, "after_cursor_execute", instrumentation._after_cursor_execute)
+
+
+async def test_concurrent_requests_are_counted_separately(db_engine, instrumentation):
+    async def request(queries: int):
+        stats = instrumentation.begin()
+        async with db_engine.connect() as conn:
+            for i in range(queries):
+                await conn.execute(sqlalchemy.text(f"SELECT {i}"))
+                await asyncio.sleep(0)
+        return instrumentation.end("GET", f"/{queries}", 200), stats
+
+    results = await asyncio.gather(request(2), request(5), request(7))
+    assert [ended.count for ended, _ in results] == [2, 5, 7]
+    assert all(ended is stats and stats.total_time > 0 for ended, stats in results)
+    # Nothing is recorded outside a request
+    assert instrumentation.current is None
+
+
+async def test_failed_statements_leave_nothing_on_the_connection(db_engine, instrumentation):
+    stats = instrumentation.begin()
+    async with db_engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(sqlalchemy.exc.OperationalError):
+                await conn.execute(sqlalchemy.text("SELECT * FROM no_such_table"))
+        await conn.execute(sqlalchemy.text("SELECT 1"))
+        assert "query_started" not in (await conn.get_raw_connection()).info
+    instrumentation.end("GET", "/", 500)
+    assert stats.count == 1
+
+
+async def test_repeated_statement_shapes_are_reported(db_engine, instrumentation, caplog):
+    instrumentation.begin()
+    async with db_engine.connect() as conn:
+        for i in range(5):
+            await conn.execute(sqlalchemy.text("SELECT :value"), {"value": i})
+    with caplog.at_level(logging.WARNING, logger="src.services.query_stats"):
+        stats = instrumentation.end("GET", "/users", 200)
+    assert stats.repeated(3) == [("SELECT ?", 5)]
+    assert "possible N+1" in caplog.text
+
+
+async def test_debug_headers(test_client, monkeypatch):
+    monkeypatch.setattr("config.QUERY_STATS_HEADERS", True)
+    response = await test_client.post("/auth/login", json={"username": "nobody", "password": "secret"})
+    assert int(response.headers["X-DB-Query-Count"]) >= 1
+    assert float(response.headers["X-DB-Time-Ms"]) > 0
@@ -0,0 +1,68 @@
+import pytest
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from src.db import Base, ReadYourWrites, routing_session_class
+from src.models.models import Role
+
+
+@pytest.fixture()
+async def engines(tmp_path):
+    """A primary and a replica as two SQLite files; the replica only has what was copied to it."""
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    async with replica.begin() as conn:
+        await conn.execute(sqlalchemy.insert(Role).values(id="replicated", name="replicated"))
+    yield primary, replica
+    await primary.dispose()
+    await replica.dispose()
+
+
+@pytest.fixture()
+def session_factory(engines):
+    primary, replica = engines
+    return sessionmaker(bind=primary, class_=AsyncSession, expire_on_commit=False,
+                        sync_session_class=routing_session_class(primary, [replica]))
+
+
+async def role_names(session) -> set:
+    return set((await session.execute(sqlalchemy.select(Role.name))).scalars())
+
+
+async def test_reads_use_the_replica_only_when_allowed(session_factory):
+    async with session_factory(info={"replica": True}) as session:
+        assert await role_names(session) == {"replicated"}
+    async with session_factory() as session:
+        assert await role_names(session) == set()
+    async with session_factory(info={"replica": True}) as session:
+        locked = sqlalchemy.select(Role.name).with_for_update()
+        assert list((await session.execute(locked)).scalars()) == []
+
+
+async def test_writes_go_to_the_primary_and_are_read_back(session_factory, engines):
+    primary, _ = engines
+    async with session_factory(info={"replica": True}) as session:
+        session.add(Role(name="written"))
+        await session.commit()
+        # The replica doesn't have the new role; after a write the session stays on the primary
+        assert session.info["wrote"]
+        assert await role_names(session) == {"written"}
+    async with primary.connect() as conn:
+        assert list((await conn.execute(sqlalchemy.select(Role.name))).scalars()) == ["written"]
+
+    async with session_factory(info={"replica": True}) as session:
+        await session.execute(sqlalchemy.update(Role).values(display_name="updated"))
+        await session.commit()
+        assert await role_names(session) == {"written"}
+
+
+def test_read_your_writes_window():
+    writers = ReadYourWrites(window=5)
+    writers.note_write("alice", now=100)
+    assert writers.recent("alice", now=104)
+    assert not writers.recent("alice", now=105.5)
+    assert not writers.recent("bob", now=101)
+    assert not writers.recent(None, now=101)
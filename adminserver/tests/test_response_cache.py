@@ -0,0 +1,80 @@
+import uuid
+from quart import g
+from src.models.models import Role
+from src.services.change_tracker import ChangeTracker, change_tracker
+from src.services.response_cache import ResponseCache
+
+
+class Builder:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self, session):
+        self.calls += 1
+        return self.value
+
+
+async def respond(app, cache, build, tables=("role",), etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    async with app.test_request_context("/api/v1/role", headers=headers):
+        return await cache.respond(("roles",), tables, build)
+
+
+async def test_cached_body_and_conditional_get(app):
+    tracker = ChangeTracker()
+    cache = ResponseCache(tracker, ttl=60)
+    build = Builder([{"name": "admin"}])
+
+    first = await respond(app, cache, build)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and await first.get_json() == [{"name": "admin"}]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    assert (await respond(app, cache, build)).headers["ETag"] == etag
+    not_modified = await respond(app, cache, build, etag=etag)
+    assert not_modified.status_code == 304 and await not_modified.get_data() == b""
+    assert build.calls == 1
+
+    # A change to the tables rebuilds the body; the same content keeps the same ETag
+    tracker.bump("role")
+    assert (await respond(app, cache, build, etag=etag)).status_code == 304
+    build.value = [{"name": "admin"}, {"name": "reader"}]
+    tracker.bump("role")
+    changed = await respond(app, cache, build, etag=etag)
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert build.calls == 3
+
+
+async def test_missing_resource_is_not_cached(app):
+    cache = ResponseCache(ChangeTracker())
+    build = Builder(None)
+    assert await respond(app, cache, build) is None
+    assert await respond(app, cache, build) is None
+    assert build.calls == 2
+
+
+async def test_committed_writes_invalidate(app, db_session):
+    cache = ResponseCache(change_tracker)
+    build = Builder([])
+    await respond(app, cache, build, tables=("role", "permission", "role_permission"))
+    db_session.add(Role(name=f"role-{uuid.uuid4().hex[:8]}"))
+    await db_session.commit()
+    await respond(app, cache, build, tables=("role", "permission", "role_permission"))
+    assert build.calls == 2
+
+
+async def test_bodies_are_built_on_the_primary(app):
+    sessions = []
+
+    async def build(session):
+        sessions.append(session)
+        return []
+
+    async with app.test_request_context("/api/v1/role", method="GET"):
+        request_session = g.db_session
+        await ResponseCache(ChangeTracker()).respond(("roles",), ("role",), build)
+        await request_session.close()
+    # The request's session may read from a replica; the cached body must not
+    assert request_session.info["replica"] and sessions[0] is not request_session
+    assert not sessions[0].info.get("replica")
@@ -0,0 +1,58 @@
+import time
+import pytest
+from src.services.auth_manager import auth_manager
+from src.services.revocation import RevocationIndex, JTI, FAMILY
+
+
+def test_prune_bounds_memory():
+    index = RevocationIndex()
+    now = time.time()
+    index._add(JTI, "old", now - 1)
+    index._add(JTI, "live", now + 60)
+    assert index.is_revoked({"jti": "live"})
+    assert not index.is_revoked({"jti": "old"})
+    assert index.prune() == 1
+    assert len(index) == 1
+
+
+def test_family_revocation_covers_every_token_of_the_family():
+    index = RevocationIndex()
+    index._add(FAMILY, "fam-1", time.time() + 60)
+    assert index.is_revoked({"jti": "a", "fid": "fam-1"})
+    assert not index.is_reused({"jti": "a", "fid": "fam-1"})
+    assert not index.is_revoked({"jti": "b", "fid": "fam-2"})
+
+
+@pytest.mark.asyncio
+async def test_revocations_sync_between_processes(db_session):
+    writer, reader = RevocationIndex(), RevocationIndex()
+    await writer.revoke(db_session, FAMILY, "fam-sync", time.time() + 60, user_id="u1", reason="logout")
+    await writer.revoke(db_session, JTI, "jti-expired", time.time() - 60)
+    await db_session.commit()
+    assert await reader.sync(db_session) == 1
+    assert reader.is_revoked({"fid": "fam-sync"})
+    assert not reader.is_revoked({"jti": "jti-expired"})
+
+
+async def refresh(client, token):
+    client.cookie_jar.clear()
+    return await client.post("/auth/refresh", headers={"Cookie": f"refresh_token={token}"})
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_reuse_revokes_family(test_client, monkeypatch):
+    claims = {"sub": "reuse-user", "username": "reuse", "type": "user", "permissions": {"acct-1": ["account.read"]}}
+
+    async def get_user_claims(user_id, db_session, user=None):
+        return claims
+    monkeypatch.setattr("src.auth.auth.get_user_claims", get_user_claims)
+
+    _, first = await auth_manager.create_token_pair({**claims, "account_id": "acct-1"})
+    response = await refresh(test_client, first)
+    assert response.status_code == 200
+    second = response.headers["Set-Cookie"].split("refresh_token=", 1)[1].split(";", 1)[0]
+    assert auth_manager.verify_token(second)["fid"] == auth_manager.verify_token(first)["fid"]
+
+    # Presenting the rotated token again is reuse: both it and its successor are now rejected
+    assert (await refresh(test_client, first)).status_code == 401
+    assert (await refresh(test_client, second)).status_code == 401
@@ -0,0 +1,43 @@
+import sqlalchemy
+from src.db import Base
+from src.models.models import Grant, Role, TokenEvent, User
+from src.services.seeding import Seeder
+
+
+def seeded_engine(path, **kwargs):
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        counts = Seeder(hash_method="pbkdf2:sha256:1", **kwargs).seed(connection)
+    return engine, counts
+
+
+def test_seed_counts_and_fan_out(tmp_path):
+    engine, counts = seeded_engine(tmp_path / "seed.db", accounts=5, users_per_account=40, shared_users=0.5,
+                                   pending_events=0.5, batch_size=50)
+    assert counts["account"] == 5 and counts["user"] == counts["email"] == 200
+    with engine.connect() as connection:
+        assert connection.scalar(sqlalchemy.select(sqlalchemy.func.count()).select_from(Grant)) == counts["grant"]
+        # Every user has a grant on their home account; shared users on others too
+        memberships = connection.execute(
+            sqlalchemy.select(Grant.user_id, sqlalchemy.func.count(Grant.account_id.distinct())).group_by(Grant.user_id)
+        ).all()
+        assert len(memberships) == 200
+        assert any(accounts > 1 for _, accounts in memberships)
+        events = connection.execute(sqlalchemy.select(TokenEvent.created_for, TokenEvent.validated)).all()
+        assert events and not any(validated for _, validated in events)
+
+        # A second dataset reuses the role catalogue
+        roles = connection.scalar(sqlalchemy.select(sqlalchemy.func.count()).select_from(Role))
+    with engine.begin() as connection:
+        Seeder(accounts=1, users_per_account=3, prefix="other", hash_method="pbkdf2:sha256:1").seed(connection)
+        assert connection.scalar(sqlalchemy.select(sqlalchemy.func.count()).select_from(Role)) == roles
+
+
+def test_seed_is_deterministic(tmp_path):
+    user_ids = []
+    for name in ("a.db", "b.db"):
+        engine, _ = seeded_engine(tmp_path / name, accounts=2, users_per_account=5, seed=7)
+        with engine.connect() as connection:
+            user_ids.append(connection.execute(sqlalchemy.select(User.id).order_by(User.name)).scalars().all())
+    assert user_ids[0] == user_ids[1] and len(user_ids[0]) == 10
@@ -0,0 +1,38 @@
+import sys
+import json
+import datetime
+import importlib
+from src.models.models import Permission, Role
+from src.services import serializers
+
+
+def make_role(**kwargs):
+    now = datetime.datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc)
+    permissions = [Permission(name=name, scope="Read", created_date=now, modified_date=now)
+                   for name in ("account.read", "account.write")]
+    return Role(id="role-1", name="admin", active=True, created_date=now, modified_date=now,
+                permissions=permissions, **kwargs)
+
+
+async def test_serializer_matches_to_dict():
+    # display_name was never set, so it is read through the ORM rather than the instance __dict__
+    role = make_role()
+    expected = await role.to_dict()
+    assert expected["created_date"] == "2025-01-02T03:04:05.678901+00:00"
+    assert expected["display_name"] is None
+    assert json.loads(serializers.dumps(serializers.role_dict(role))) == expected
+    assert serializers.role_dict(make_role(display_name="Admin"))["display_name"] == "Admin"
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    rows = [serializers.role_dict(make_role()), {"at": datetime.datetime(2025, 1, 2)}]
+    encoded = serializers.dumps(rows)
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    fallback = importlib.reload(serializers)
+    try:
+        assert fallback.orjson is None
+        assert json.loads(fallback.dumps(rows)) == json.loads(encoded)
+        assert fallback.dumps({"a": [1, 2]}) == b'{"a":[1,2]}'
+    finally:
+        monkeypatch.undo()
+        importlib.reload(serializers)
@@ -0,0 +1,48 @@
+import uuid
+import datetime
+import pytest
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from src.db import Base
+from src.models.models import TokenEvent, RevokedToken
+from src.services.sweeper import ExpirySweeper
+
+
+@pytest.fixture()
+async def engine(tmp_path):
+    """A database of its own, so the expired rows are exactly the ones the test adds."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sweep.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def test_sweep_deletes_only_expired_rows_in_batches(engine, caplog):
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    expired, live = [], []
+    for i in range(7):
+        event = TokenEvent("email", f"expired-{uuid.uuid4().hex}@example.com", created_by="someone")
+        event.expire_date = now - datetime.timedelta(minutes=i + 1)
+        expired.append(event)
+    for i in range(2):
+        live.append(TokenEvent("email", f"live-{uuid.uuid4().hex}@example.com", created_by="someone"))
+    revoked = RevokedToken(token_id=uuid.uuid4().hex, kind="jti", revoked_date=now - datetime.timedelta(days=2),
+                           expire_date=now - datetime.timedelta(days=1))
+    async with session_factory() as session:
+        session.add_all([*expired, *live, revoked])
+        await session.commit()
+    live_ids = [event.id for event in live]
+
+    sweeper = ExpirySweeper(session_factory=session_factory, batch_size=3, pause=0)
+    with caplog.at_level("INFO", logger="src.services.sweeper"):
+        purged = await sweeper.sweep(now)
+    # 7 rows in batches of 3
+    assert purged["token_event"] == 7 and purged["revoked_token"] == 1
+    assert "expired_rows_swept table=token_event rows=7 batches=3" in caplog.text
+
+    async with engine.connect() as conn:
+        assert set((await conn.execute(sqlalchemy.select(TokenEvent.id))).scalars()) == set(live_ids)
+        assert await conn.scalar(sqlalchemy.select(sqlalchemy.func.count()).select_from(RevokedToken)) == 0
@@ -0,0 +1,53 @@
+import time
+import pytest
+from src.services.auth_manager import AuthManager
+from src.services.token_cache import VerifiedTokenCache
+
+
+@pytest.fixture()
+def cached_auth_manager(private_key, public_key):
+    return AuthManager(
+        private_key=private_key,
+        public_key=public_key,
+        key_algorithm="RS256",
+        access_token_expiry=5,
+        refresh_token_expiry=60,
+        token_cache=VerifiedTokenCache(max_size=2)
+    )
+
+
+def test_verify_token_uses_cache(cached_auth_manager):
+    token = cached_auth_manager.create_access_token({"sub": "123"})
+    assert cached_auth_manager.verify_token(token)["sub"] == "123"
+    assert cached_auth_manager.verify_token(token)["sub"] == "123"
+    stats = cached_auth_manager.token_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cached_payload_is_a_copy(cached_auth_manager):
+    token = cached_auth_manager.create_access_token({"sub": "123"})
+    cached_auth_manager.verify_token(token)["sub"] = "tampered"
+    assert cached_auth_manager.verify_token(token)["sub"] == "123"
+
+
+def test_cache_never_returns_expired_payload():
+    cache = VerifiedTokenCache()
+    cache.put("token", {"sub": "123", "exp": time.time() - 1})
+    assert cache.get("token") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_cache_skips_tokens_without_exp():
+    cache = VerifiedTokenCache()
+    cache.put("token", {"sub": "123"})
+    assert cache.get("token") is None
+
+
+def test_cache_lru_bound():
+    cache = VerifiedTokenCache(max_size=1)
+    cache.put("a", {"exp": time.time() + 60})
+    cache.put("b", {"exp": time.time() + 60})
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,99 @@
+"""
+Shared helpers for the locationserv benchmarks.
+
+Run benchmarks from the locationserv directory, i.e.
+    python -m benchmarks.bench_token_cache
+`configure()` generates a throw-away RSA key pair and points PUBLIC_KEY_PATH at it, so it must run before anything
+from `config`/`src` is imported. By default the app runs against the in-process mongomock stand-in used by the tests.
+"""
+import os
+import json
+import time
+import tempfile
+import statistics
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def configure():
+    """
+    :return: The private key matching the configured public key, for signing benchmark tokens.
+    """
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    keys_dir = tempfile.mkdtemp(prefix="locationserv-bench-")
+    public_key_path = os.path.join(keys_dir, "public_key.pem")
+    with open(public_key_path, "wb") as f:
+        f.write(private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ))
+    os.environ["PUBLIC_KEY_PATH"] = public_key_path
+    os.environ["KEYS_DIR"] = keys_dir
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    return private_key
+
+
+def use_mock_db():
+    from tests.async_mongomock import AsyncMongoMockClient
+    import src.db
+    src.db.client = AsyncMongoMockClient()
+    return src.db.get_db()
+
+
+def quiet():
+    import logging
+    for name in ("src", "locationserv", "httpx", "root"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def make_token(private_key, account_id: str, permissions=("account.read", "account.write"), minutes: int = 60) -> str:
+    now = int(time.time())
+    payload = {
+        "sub": "bench-user",
+        "username": "bench-user",
+        "account_id": account_id,
+        "permissions": {account_id: list(permissions)},
+        "type": "access",
+        "iat": now,
+        "exp": now + minutes * 60,
+    }
+    return jwt.encode(payload, private_key, algorithm="RS256")
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float], elapsed: float = None) -> dict:
+    """
+    Latency summary (in milliseconds) of samples given in seconds.
+    """
+    result = {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
+    if elapsed:
+        result["per_sec"] = round(len(samples) / elapsed, 1)
+    return result
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def report(name: str, **results):
+    print(json.dumps({"benchmark": name, **results}, indent=2, default=str))
@@ -0,0 +1,73 @@
+"""
+Requests/sec on GET /location with the verified-token cache on and off, plus raw verify_token throughput.
+
+    python -m benchmarks.bench_token_cache [--requests 2000] [--concurrency 20] [--locations 50]
+"""
+import asyncio
+import argparse
+from benchmarks._common import configure, use_mock_db, quiet, make_token, summarize, report, Timer
+
+
+def location_doc(i: int, account_id: str) -> dict:
+    return {
+        "_name": f"bench-location-{i}",
+        "account_id": account_id,
+        "created_by": "bench-user",
+        "deleted": False,
+        "active": True,
+        "geo_point": {"type": "Point", "coordinates": [-97.7 + i / 1000, 30.2 + i / 1000]},
+        "address": {"countryRegion": {"name": "USA"}, "addressLine": f"{i} Main St", "adminDistricts": None,
+                    "formattedAddress": None, "locality": "Austin", "postalCode": "78701",
+                    "streetName": "Main St", "streetNumber": str(i)},
+    }
+
+
+async def main(args):
+    private_key = configure()
+    from httpx import AsyncClient, ASGITransport
+    from src.app import create_app
+    from src.token_manager import token_manager
+
+    db = use_mock_db()
+    quiet()
+    account_id = "bench-account"
+    for i in range(args.locations):
+        await db.locations.insert_one(location_doc(i, account_id))
+    token = make_token(private_key, account_id)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    results = {}
+    transport = ASGITransport(app=create_app())
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for enabled in (False, True):
+            token_manager.token_cache.enabled = enabled
+            token_manager.token_cache.clear()
+            label = "cache_on" if enabled else "cache_off"
+            with Timer() as timer:
+                for _ in range(args.requests):
+                    token_manager.verify_token(token)
+            results[f"verify_token_{label}_per_sec"] = round(args.requests / timer.elapsed, 1)
+
+            samples = []
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def call():
+                async with semaphore:
+                    with Timer() as request_timer:
+                        response = await client.get("/location", headers=headers)
+                    response.raise_for_status()
+                    samples.append(request_timer.elapsed)
+
+            with Timer() as timer:
+                await asyncio.gather(*(call() for _ in range(args.requests)))
+            results[f"list_locations_{label}"] = summarize(samples, timer.elapsed)
+    results["cache_stats"] = token_manager.token_cache.stats()
+    report("token_cache", requests=args.requests, concurrency=args.concurrency, locations=args.locations, **results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--locations", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,202 @@
+"""
+Deterministic synthetic Location documents, and a CLI to load millions of them into mongod (or a JSONL file).
+
+Document `i` of a dataset depends only on (seed, i), so any slice can be regenerated independently (the load harness
+recomputes IDs and owners instead of reading them back) and two runs with the same seed and size hold the same data.
+    - Accounts are skewed like real tenants: account k owns a share proportional to 1 / (k + 1) ** skew.
+    - GeoPoints cluster around cities weighted by population, with a Gaussian spread of a few kilometres; some carry
+      an elevation.
+    - Addresses use the city's country, region and postal code format; a few have missing parts (no postal code, no
+      admin district, no street number), as geocoder results do.
+    - A small share of the documents is inactive or soft-deleted.
+
+    python -m benchmarks.dataset --count 1000000 --accounts 500 --mongo-uri mongodb://localhost:27017
+    python -m benchmarks.dataset --count 100000 --output locations.jsonl
+"""
+import bisect
+import random
+import asyncio
+import argparse
+import datetime
+import itertools
+from bson import ObjectId
+from benchmarks._common import configure, Timer, report
+
+# (locality, region, region short name, country, lat, lon, postal code format, relative population)
+CITIES = (
+    ("New York", "New York", "NY", "United States", 40.7128, -74.0060, "100{:02d}", 88),
+    ("Los Angeles", "California", "CA", "United States", 34.0522, -118.2437, "900{:02d}", 39),
+    ("Chicago", "Illinois", "IL", "United States", 41.8781, -87.6298, "606{:02d}", 27),
+    ("Houston", "Texas", "TX", "United States", 29.7604, -95.3698, "770{:02d}", 23),
+    ("Phoenix", "Arizona", "AZ", "United States", 33.4484, -112.0740, "850{:02d}", 16),
+    ("Philadelphia", "Pennsylvania", "PA", "United States", 39.9526, -75.1652, "191{:02d}", 16),
+    ("San Antonio", "Texas", "TX", "United States", 29.4241, -98.4936, "782{:02d}", 15),
+    ("Dallas", "Texas", "TX", "United States", 32.7767, -96.7970, "752{:02d}", 13),
+    ("Austin", "Texas", "TX", "United States", 30.2672, -97.7431, "787{:02d}", 10),
+    ("Seattle", "Washington", "WA", "United States", 47.6062, -122.3321, "981{:02d}", 7),
+    ("Denver", "Colorado", "CO", "United States", 39.7392, -104.9903, "802{:02d}", 7),
+    ("Boston", "Massachusetts", "MA", "United States", 42.3601, -71.0589, "021{:02d}", 7),
+    ("Miami", "Florida", "FL", "United States", 25.7617, -80.1918, "331{:02d}", 4),
+    ("Atlanta", "Georgia", "GA", "United States", 33.7490, -84.3880, "303{:02d}", 5),
+    ("Toronto", "Ontario", "ON", "Canada", 43.6532, -79.3832, "M5{:d}", 28),
+    ("Vancouver", "British Columbia", "BC", "Canada", 49.2827, -123.1207, "V6{:d}", 7),
+    ("Montreal", "Quebec", "QC", "Canada", 45.5017, -73.5673, "H2{:d}", 18),
+    ("Mexico City", "Ciudad de México", "CDMX", "Mexico", 19.4326, -99.1332, "06{:03d}", 92),
+    ("Guadalajara", "Jalisco", "JAL", "Mexico", 20.6597, -103.3496, "44{:03d}", 15),
+    ("London", "England", "ENG", "United Kingdom", 51.5074, -0.1278, "EC{:d}", 90),
+    ("Manchester", "England", "ENG", "United Kingdom", 53.4808, -2.2426, "M{:d}", 6),
+    ("Berlin", "Berlin", "BE", "Germany", 52.5200, 13.4050, "10{:03d}", 37),
+    ("Munich", "Bavaria", "BY", "Germany", 48.1351, 11.5820, "80{:03d}", 15),
+    ("Sydney", "New South Wales", "NSW", "Australia", -33.8688, 151.2093, "20{:02d}", 53),
+    ("Melbourne", "Victoria", "VIC", "Australia", -37.8136, 144.9631, "30{:02d}", 51),
+)
+STREETS = (
+    "Main St", "Oak Ave", "Maple St", "Cedar Rd", "Park Ave", "Elm St", "Washington Blvd", "Lake Dr", "Hill Rd",
+    "Pine St", "River Rd", "Market St", "Church St", "High St", "Station Rd", "Mill Ln", "King St", "Queen St",
+    "Broadway", "Sunset Blvd", "Industrial Pkwy", "Commerce Dr", "Harbor Way", "College Ave", "Airport Rd",
+)
+KINDS = ("Store", "Warehouse", "Office", "Depot", "Site", "Clinic", "Branch", "Yard")
+EPOCH = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+# Degrees of Gaussian spread around a city centre (~9 km of latitude)
+SPREAD = 0.08
+
+
+def account_id(k: int) -> str:
+    return f"account-{k:05d}"
+
+
+def location_id(seed: int, i: int) -> ObjectId:
+    """Deterministic ObjectId of document `i`."""
+    return ObjectId((seed & 0xFFFFFFFF).to_bytes(4, "big") + i.to_bytes(8, "big"))
+
+
+class LocationDataset:
+    """
+    The documents of one synthetic dataset; `document(i)` is the i-th document, for any i in [0, count).
+    """
+    def __init__(self, count: int, accounts: int = 100, seed: int = 1, skew: float = 1.0):
+        """
+        :param count: Number of documents.
+        :param accounts: Number of accounts the documents are spread over.
+        :param skew: Zipf exponent of the documents per account (0 spreads them evenly).
+        """
+        self.count = count
+        self.accounts = accounts
+        self.seed = seed
+        self._account_weights = list(itertools.accumulate(1 / (k + 1) ** skew for k in range(accounts)))
+        self._city_weights = list(itertools.accumulate(city[-1] for city in CITIES))
+
+    def _rng(self, i: int) -> random.Random:
+        return random.Random(self.seed * 1_000_003 + i)
+
+    def _pick(self, cumulative: list[float], rng: random.Random) -> int:
+        return bisect.bisect_right(cumulative, rng.random() * cumulative[-1])
+
+    def account_of(self, i: int) -> str:
+        return account_id(self._pick(self._account_weights, self._rng(i)))
+
+    def document(self, i: int) -> dict:
+        """
+        The i-th document, as stored in the `locations` collection.
+        """
+        rng = self._rng(i)
+        account = account_id(self._pick(self._account_weights, rng))  # first draw, as in account_of()
+        locality, region, region_short, country, lat, lon, postal, _ = CITIES[self._pick(self._city_weights, rng)]
+        lat = min(90.0, max(-90.0, round(rng.gauss(lat, SPREAD), 6)))
+        lon = min(180.0, max(-180.0, round(rng.gauss(lon, SPREAD * 1.3), 6)))
+        coordinates = [lon, lat] if rng.random() < 0.8 else [lon, lat, round(rng.uniform(0, 400), 1)]
+
+        street = rng.choice(STREETS)
+        number = str(int(rng.lognormvariate(5, 1.2)) + 1) if rng.random() < 0.95 else None
+        postal_code = postal.format(rng.randrange(100)) if rng.random() < 0.93 else None
+        districts = [{"name": region, "shortName": region_short}] if rng.random() < 0.9 else None
+        address_line = f"{number} {street}" if number else street
+        formatted = ", ".join(part for part in (address_line, locality, region_short, postal_code) if part)
+
+        created = EPOCH + datetime.timedelta(seconds=rng.randrange(3 * 365 * 86400))
+        modified = created + datetime.timedelta(seconds=int(rng.expovariate(1 / (30 * 86400))))
+        state = rng.random()
+        deleted = state < 0.02
+        return {
+            "_id": location_id(self.seed, i),
+            "_name": f"loc-{i:09d}",
+            "account_id": account,
+            "created_by": "dataset",
+            "created_date": created,
+            "modified_date": modified,
+            "modified_by": "dataset",
+            "deleted": deleted,
+            "deleted_date": modified if deleted else None,
+            "display_name": f"{rng.choice(KINDS)} #{rng.randrange(1, 1000)}" if rng.random() < 0.7 else None,
+            "active": state >= 0.05,
+            "geo_point": {"type": "Point", "coordinates": coordinates},
+            "address": {
+                "countryRegion": {"name": country},
+                "addressLine": address_line,
+                "adminDistricts": districts,
+                "formattedAddress": f"{formatted}, {country}",
+                "locality": locality,
+                "postalCode": postal_code,
+                "streetName": street,
+                "streetNumber": number,
+            },
+        }
+
+    def documents(self, start: int = 0, stop: int = None):
+        for i in range(start, self.count if stop is None else min(stop, self.count)):
+            yield self.document(i)
+
+    def batches(self, size: int = 1000):
+        for start in range(0, self.count, size):
+            yield list(self.documents(start, start + size))
+
+
+async def load(dataset: LocationDataset, collection, batch_size: int = 1000) -> int:
+    """
+    Insert every document of a dataset into a collection with unordered bulk inserts.
+    :return: The number of documents inserted.
+    """
+    inserted = 0
+    for batch in dataset.batches(batch_size):
+        result = await collection.insert_many(batch, ordered=False)
+        inserted += len(result.inserted_ids)
+    return inserted
+
+
+async def main(args):
+    dataset = LocationDataset(args.count, accounts=args.accounts, seed=args.seed, skew=args.skew)
+    with Timer() as timer:
+        if args.output:
+            from bson import json_util
+            with open(args.output, "w", encoding="utf-8") as f:
+                for doc in dataset.documents():
+                    f.write(json_util.dumps(doc))
+                    f.write("\n")
+            written = dataset.count
+        else:
+            import pymongo
+            configure()
+            from src.db import ensure_indexes
+            client = pymongo.AsyncMongoClient(args.mongo_uri)
+            db = client[args.database]
+            if args.drop:
+                await db.locations.drop()
+            await ensure_indexes(db)
+            written = await load(dataset, db.locations, args.batch_size)
+            await client.close()
+    report("dataset", count=args.count, accounts=args.accounts, seed=args.seed, skew=args.skew, written=written,
+           seconds=round(timer.elapsed, 1), per_sec=round(written / timer.elapsed, 1))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of the documents per account")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="microservice_db")
+    parser.add_argument("--drop", action="store_true", help="Drop the locations collection first")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", default=None, help="Write JSONL (extended JSON) here instead of to mongod")
+    asyncio.run(main(parser.parse_args()))
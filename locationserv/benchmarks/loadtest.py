@@ -0,0 +1,248 @@
+"""
+Mixed CRUD load on /location through the FastAPI app, over a synthetic dataset (see benchmarks/dataset.py).
+
+Virtual users each act for one account, picked in proportion to the account's size, and loop over a weighted mix of
+operations until `--duration` has passed:
+    list    GET    /location                  every active location of the account
+    get     GET    /location?id=...           1-10 known locations by ID
+    insert  POST   /location                  a new generated location
+    update  PUT    /location                  rename and move a known location
+    delete  DELETE /location                  soft-delete a known location
+
+By default the dataset is loaded into the in-process mongomock stand-in used by the tests, which is only practical
+for tens of thousands of documents. For realistic volumes load millions of documents into a local mongod with
+`python -m benchmarks.dataset` and point the harness at it with `--mongo-uri ... --skip-load` (same --count,
+--accounts and --seed, so it can recompute the documents' IDs and owners).
+
+The report (JSON, also written to `--output`) has throughput and p50/p95/p99 latency per operation and overall,
+status counts, the parameters and the git commit, so runs can be compared.
+
+    python -m benchmarks.loadtest [--count 10000] [--accounts 50] [--duration 20] [--concurrency 20]
+                                  [--mix list=2,get=8,insert=2,update=3,delete=1]
+                                  [--mongo-uri mongodb://localhost:27017 [--database loadtest] [--skip-load]]
+                                  [--output loadtest.json]
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import warnings
+import itertools
+import subprocess
+from collections import Counter, defaultdict
+from benchmarks._common import configure, use_mock_db, quiet, make_token, summarize, report, Timer
+from benchmarks.dataset import LocationDataset, location_id
+
+OPERATIONS = ("list", "get", "insert", "update", "delete")
+DEFAULT_MIX = "list=2,get=8,insert=2,update=3,delete=1"
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; expected one of {', '.join(OPERATIONS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+class Workload:
+    """
+    The documents known to exist per account (by dataset index), and the request bodies for them.
+    """
+    def __init__(self, dataset: LocationDataset):
+        from src.models import Location
+        self._location = Location
+        self.dataset = dataset
+        self.live: dict[str, list[int]] = defaultdict(list)
+        for i in range(dataset.count):
+            self.live[dataset.account_of(i)].append(i)
+        self.sizes = {account: len(indexes) for account, indexes in self.live.items()}
+        self._next = itertools.count(dataset.count)
+
+    def body(self, i: int, account: str) -> dict:
+        doc = self.dataset.document(i) | {"account_id": account, "deleted": False, "deleted_date": None,
+                                          "active": True}
+        return self._location.deserialize(doc).model_dump(mode="json", by_alias=True)
+
+    def new(self, account: str) -> tuple[int, dict]:
+        i = next(self._next)
+        return i, self.body(i, account)
+
+    def pick(self, account: str, rng: random.Random) -> int | None:
+        indexes = self.live[account]
+        return indexes[rng.randrange(len(indexes))] if indexes else None
+
+    def remove(self, account: str, i: int):
+        indexes = self.live[account]
+        if i in indexes:
+            indexes[indexes.index(i)] = indexes[-1]
+            indexes.pop()
+
+
+class VirtualUser:
+    def __init__(self, client, workload: Workload, account: str, token: str, rng: random.Random):
+        self.client = client
+        self.workload = workload
+        self.account = account
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.rng = rng
+
+    async def list(self) -> int:
+        return (await self.client.get("/location", headers=self.headers)).status_code
+
+    async def get(self) -> int:
+        indexes = {self.workload.pick(self.account, self.rng) for _ in range(self.rng.randint(1, 10))} - {None}
+        ids = [str(location_id(self.workload.dataset.seed, i)) for i in indexes]
+        return (await self.client.get("/location", params={"id": ids}, headers=self.headers)).status_code
+
+    async def insert(self) -> int:
+        i, body = self.workload.new(self.account)
+        response = await self.client.post("/location", json=body, headers=self.headers)
+        if response.status_code == 200:
+            self.workload.live[self.account].append(i)
+        return response.status_code
+
+    async def update(self) -> int:
+        i = self.workload.pick(self.account, self.rng)
+        if i is None:
+            return await self.insert()
+        body = self.workload.body(i, self.account)
+        body["display_name"] = f"Renamed #{self.rng.randrange(10000)}"
+        lon, lat = body["geo_point"]["coordinates"][:2]
+        body["geo_point"]["coordinates"] = [round(lon + self.rng.uniform(-0.01, 0.01), 6),
+                                            round(lat + self.rng.uniform(-0.01, 0.01), 6)]
+        return (await self.client.put("/location", json=body, headers=self.headers)).status_code
+
+    async def delete(self) -> int:
+        i = self.workload.pick(self.account, self.rng)
+        if i is None:
+            return await self.insert()
+        self.workload.remove(self.account, i)
+        body = self.workload.body(i, self.account)
+        return (await self.client.request("DELETE", "/location", json=body, headers=self.headers)).status_code
+
+
+async def run_load(client, workload: Workload, private_key, args) -> dict:
+    weights = parse_mix(args.mix)
+    operations, operation_weights = list(weights), list(weights.values())
+    accounts, sizes = list(workload.sizes), list(workload.sizes.values())
+    tokens = {}
+    samples = defaultdict(list)
+    statuses = defaultdict(Counter)
+    errors = Counter()
+
+    async def virtual_user(n: int, deadline: float):
+        rng = random.Random(args.seed * 1_000_003 + n)
+        account = rng.choices(accounts, sizes)[0]
+        if account not in tokens:
+            tokens[account] = make_token(private_key, account, minutes=int(args.duration / 60) + 60)
+        user = VirtualUser(client, workload, account, tokens[account], rng)
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, operation_weights)[0]
+            start = time.perf_counter()
+            try:
+                status = await getattr(user, operation)()
+            except Exception as exc:
+                errors[f"{operation}:{type(exc).__name__}"] += 1
+                continue
+            samples[operation].append(time.perf_counter() - start)
+            statuses[operation][status] += 1
+
+    with Timer() as timer:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(virtual_user(n, deadline) for n in range(args.concurrency)))
+    return {
+        "overall": summarize([sample for operation in operations for sample in samples[operation]], timer.elapsed),
+        "operations": {
+            operation: {**summarize(samples[operation], timer.elapsed),
+                        "statuses": {str(code): count for code, count in sorted(statuses[operation].items())}}
+            for operation in operations
+        },
+        "errors": dict(errors),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    parse_mix(args.mix)
+    private_key = configure()
+    from httpx import AsyncClient, ASGITransport
+    from src.app import create_app
+    from src.db import ensure_indexes
+    import src.db
+
+    if args.mongo_uri:
+        import pymongo
+        src.db.client = pymongo.AsyncMongoClient(args.mongo_uri)
+        db = src.db.client[args.database]
+        src.db.cfg.DATABASE_NAME = args.database
+    else:
+        db = use_mock_db()
+    quiet()
+    # Updates assign plain dicts to model fields, which pydantic warns about on every response
+    warnings.filterwarnings("ignore", message="Pydantic serializer warnings", category=UserWarning)
+
+    dataset = LocationDataset(args.count, accounts=args.accounts, seed=args.seed, skew=args.skew)
+    load_seconds = None
+    if not args.skip_load:
+        from benchmarks.dataset import load
+        await db.locations.drop()
+        if args.mongo_uri:
+            # mongomock checks unique indexes by scanning the collection on every insert
+            await ensure_indexes(db)
+        with Timer() as timer:
+            await load(dataset, db.locations)
+        load_seconds = round(timer.elapsed, 1)
+    workload = Workload(dataset)
+
+    started = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    transport = ASGITransport(app=create_app())
+    async with AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        results = await run_load(client, workload, private_key, args)
+    if args.mongo_uri:
+        await src.db.client.close()
+
+    results = {
+        "commit": git_commit(),
+        "started": started,
+        "parameters": {key: getattr(args, key) for key in
+                       ("count", "accounts", "skew", "seed", "duration", "concurrency", "mix", "database")}
+                      | {"backend": "mongod" if args.mongo_uri else "mongomock"},
+        "load_seconds": load_seconds,
+        "largest_account": max(workload.sizes.values()),
+        **results,
+    }
+    report("location_loadtest", **results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "location_loadtest", **results}, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=10_000, help="Documents in the dataset")
+    parser.add_argument("--accounts", type=int, default=50)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of the documents per account")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Operation weights, name=weight,...")
+    parser.add_argument("--mongo-uri", default=None, help="Run against this mongod instead of mongomock")
+    parser.add_argument("--database", default="loadtest")
+    parser.add_argument("--skip-load", action="store_true",
+                        help="Use the dataset already in --mongo-uri (loaded with benchmarks.dataset)")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    if args.skip_load and not args.mongo_uri:
+        parser.error("--skip-load needs --mongo-uri")
+    asyncio.run(main(args))
@@ -23,6 +23,22 @@ class Settings(BaseSettings):
     ENCRYPT_ALGORITHM: str = os.getenv("ENCRYPT_ALGORITHM", "RS256")
     TOKEN_AUDIENCE: str = os.getenv("TOKEN_AUDIENCE", "")
     TOKEN_ISSUER: str = os.getenv("TOKEN_ISSUER", "")
+    # JWKS published by adminserver (URL) or a local copy (path); when set, PUBLIC_KEY_PATH becomes optional
+    JWKS_URL: str = os.getenv("JWKS_URL", "")
+    JWKS_PATH: str = os.getenv("JWKS_PATH", "")
+    JWKS_REFRESH_SECONDS: int = int(os.getenv("JWKS_REFRESH_SECONDS", 300))
+    # Authorization policy published by adminserver (URL) or a local copy (path)
+    POLICY_URL: str = os.getenv("POLICY_URL", "")
+    POLICY_PATH: str = os.getenv("POLICY_PATH", "")
+    # Bearer credential adminserver requires to serve the policy document (its POLICY_TOKEN)
+    POLICY_TOKEN: str = os.getenv("POLICY_TOKEN", "")
+    POLICY_REFRESH_SECONDS: int = int(os.getenv("POLICY_REFRESH_SECONDS", 60))
+    TOKEN_CACHE_ENABLED: bool = os.getenv("TOKEN_CACHE_ENABLED", "true").lower() == "true"
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+    # Prometheus metrics at /metrics (src/metrics.py); METRICS_DIR is shared by the worker processes of one server
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS: float = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
 
     # Database (raw values only; no secrets in logs)
     DATABASE_URL: str = os.getenv("DATABASE_URI", "localhost:27017")
@@ -39,8 +55,9 @@ class Settings(BaseSettings):
         try:
             self.PUBLIC_KEY = self.PUBLIC_KEY_PATH.read_text(encoding="utf-8")
         except FileNotFoundError:
-            raise RuntimeError(f"Public key not found at {self.PUBLIC_KEY_PATH}")
-        fp = hashlib.sha256(self.PUBLIC_KEY.encode("utf-8")).hexdigest()[:32]
+            if not (self.JWKS_URL or self.JWKS_PATH):
+                raise RuntimeError(f"Public key not found at {self.PUBLIC_KEY_PATH}")
+        fp = hashlib.sha256(self.PUBLIC_KEY.encode("utf-8")).hexdigest()[:32] if self.PUBLIC_KEY else None
 
         self.LOG_CONFIG = {
             "version": 1,
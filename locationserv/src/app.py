@@ -6,6 +6,8 @@ from config import cfg
 from src.routes import router
 from src.db import init_db, get_db, client, ensure_indexes
 from src.logging_helper import LoggingMiddleware
+from src.token_manager import token_manager
+from src.metrics import metrics, cache_collector, MetricsMiddleware
 
 
 @asynccontextmanager
@@ -15,10 +17,16 @@ async def lifespan(app: FastAPI):
     init_db()
     db = get_db()
     await ensure_indexes(db)
+    await token_manager.key_set.start()
+    await token_manager.policy_store.start()
+    metrics.start()
     
     yield
     
     # Shutdown
+    await token_manager.key_set.stop()
+    await token_manager.policy_store.stop()
+    await metrics.stop()
     if client:
         client.close()
 
@@ -34,5 +42,9 @@ def create_app() -> FastAPI:
 
     # Logging Middleware
     app.add_middleware(LoggingMiddleware)
+
+    # Metrics: request latency and counts by route template, in-flight requests, token cache hit counts
+    app.add_middleware(MetricsMiddleware)
+    metrics.collector("token_cache", cache_collector("token", token_manager.token_cache))
     
     return app
\ No newline at end of file
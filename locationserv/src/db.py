@@ -1,12 +1,13 @@
 import pymongo 
 from config import cfg
+from src.metrics import mongo_command_metrics
 
 client: pymongo.AsyncMongoClient | None = None
 
 def init_db():
     global client
     mongo_conn_string = f"mongodb+srv://{cfg.DATABASE_USER}:{cfg.DATABASE_PASSWORD}@{cfg.DATABASE_URL}/?retryWrites=true&w=majority&appName={cfg.APP_NAME}"
-    client = pymongo.AsyncMongoClient(mongo_conn_string)
+    client = pymongo.AsyncMongoClient(mongo_conn_string, event_listeners=[mongo_command_metrics])
     return client
 
 def get_db():
@@ -0,0 +1,125 @@
+import json
+import time
+import asyncio
+import logging
+import pathlib
+import urllib.request
+from typing import Any, Awaitable, Callable, Dict, Optional
+import jwt
+
+logger = logging.getLogger("locationserv.keys")
+
+JsonSource = Callable[[], Awaitable[dict]]
+JwksSource = JsonSource
+
+
+def http_json_source(url: str, timeout: float = 5.0, token: Optional[str] = None) -> JsonSource:
+    """
+    Source that fetches a JSON document (JWKS, policy) from adminserver (in a worker thread), sending `token` as a
+    bearer credential when given.
+    """
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+
+    def fetch() -> dict:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as response:
+            return json.loads(response.read())
+
+    async def source() -> dict:
+        return await asyncio.to_thread(fetch)
+    return source
+
+
+def file_json_source(path) -> JsonSource:
+    """Source that reads a JSON document from a local file, i.e. a mounted secret."""
+    path = pathlib.Path(path)
+
+    async def source() -> dict:
+        return json.loads(await asyncio.to_thread(path.read_text, encoding="utf-8"))
+    return source
+
+
+http_jwks_source = http_json_source
+file_jwks_source = file_json_source
+
+
+class KeySet:
+    """
+    Locally cached token verification keys, by `kid`.
+
+    Lookups are a plain dict read and never do I/O. The key set is refreshed from `source` in the background every
+    `refresh_interval` seconds, and early (at most once per `min_refresh_interval`) when a token names an unknown
+    `kid`, so rotating adminserver's key needs no locationserv restart. A failed refresh keeps the previous keys.
+    """
+    def __init__(self,
+                 source: Optional[JwksSource] = None,
+                 refresh_interval: float = 300,
+                 min_refresh_interval: float = 30,
+                 algorithm: str = "RS256"):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.algorithm = algorithm
+        self._keys: Dict[str, Any] = {}
+        self._last_refresh = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Optional[asyncio.Task] = None
+
+    def get(self, kid: str):
+        return self._keys.get(kid)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def load(self, jwks: dict):
+        """Replace the key set from a JWKS document; keys for other algorithms or uses are skipped."""
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            if not jwk.get("kid") or jwk.get("use", "sig") != "sig" or jwk.get("alg", self.algorithm) != self.algorithm:
+                continue
+            try:
+                keys[jwk["kid"]] = jwt.PyJWK.from_dict(jwk, algorithm=self.algorithm).key
+            except jwt.PyJWTError as exc:
+                logger.warning("jwks_key_skipped kid=%s error=%s", jwk.get("kid"), exc)
+        # Swap in one assignment so concurrent lookups see either the old or the new set
+        self._keys = keys
+
+    async def refresh(self) -> bool:
+        if self.source is None:
+            return False
+        self._last_refresh = time.monotonic()
+        try:
+            self.load(await self.source())
+        except Exception as exc:
+            logger.warning("jwks_refresh_failed error=%s keeping=%d", exc, len(self._keys))
+            return False
+        logger.info("jwks_refreshed keys=%d", len(self._keys))
+        return True
+
+    def request_refresh(self):
+        """Schedule an early refresh without waiting for it, rate limited by `min_refresh_interval`."""
+        if self.source is None or (self._pending and not self._pending.done()):
+            return
+        if time.monotonic() - self._last_refresh < self.min_refresh_interval:
+            return
+        try:
+            self._pending = asyncio.get_running_loop().create_task(self.refresh())
+        except RuntimeError:
+            pass  # No running loop (sync caller); the background refresh will pick the key up
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self):
+        """Load the keys once, then keep refreshing them in the background."""
+        if self.source is None:
+            return
+        await self.refresh()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._pending):
+            if task and not task.done():
+                task.cancel()
+        self._task = self._pending = None
@@ -0,0 +1,425 @@
+"""
+Process metrics, exported in the Prometheus text format at GET /metrics.
+
+This mirrors adminserver's src/services/metrics.py: series are kept in dicts keyed by the tuple of label values,
+histograms keep plain per-bucket counts, and values owned by other components (the token cache's hit and miss
+counts) are copied in by collectors when a snapshot is taken. Request metrics come from an ASGI middleware, labelled
+with the matched route template; MongoDB command timings from pymongo's command monitoring.
+
+With several worker processes, set METRICS_DIR: every process writes a JSON snapshot of its registry to
+`<METRICS_DIR>/<pid>.json` every METRICS_FLUSH_SECONDS and /metrics merges the snapshots of every live process with
+its own current values. The counters and histograms of a process that stopped or died are folded into
+`<METRICS_DIR>/_aggregate.json` (its gauges are dropped), so the totals never go down.
+"""
+import os
+import json
+import fcntl
+import time
+import bisect
+import asyncio
+import logging
+import tempfile
+import contextlib
+from pymongo import monitoring
+from config import cfg
+
+logger = logging.getLogger("locationserv.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+AGGREGATE = "_aggregate"
+# Seconds; from a point lookup by _id (sub-millisecond on mongod) to listing a large account's locations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._series = {}
+
+    def samples(self) -> list:
+        return [[list(labels), value] for labels, value in self._series.items()]
+
+    def clear(self):
+        self._series.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def set(self, value: float, *labels: str):
+        """Mirror a total counted elsewhere (collectors only)."""
+        self._series[labels] = value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self._series[labels] = self._series.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str):
+        self._series[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            # A count per bucket, one for +Inf, then the sum
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> list:
+        return [[list(labels), list(series)] for labels, series in self._series.items()]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _merge(snapshots) -> dict:
+    """Sum snapshots into {name: entry}, with each entry's samples as a {labels tuple: value} dict."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, entry in snapshot.items():
+            target = merged.setdefault(name, {**entry, "samples": {}})
+            for labels, value in entry["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                elif isinstance(value, list):
+                    target["samples"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = current + value
+    return merged
+
+
+def _process_alive(process_id: str) -> bool | None:
+    """Whether the process named by a snapshot still runs; None if the name isn't a PID."""
+    if not process_id.isdigit():
+        return None
+    try:
+        os.kill(int(process_id), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsRegistry:
+    def __init__(self,
+                 directory: str = "",
+                 flush_interval: float = 5,
+                 stale_after: float = None,
+                 process_id: str = None):
+        """
+        :param directory: Where the processes of a multi-worker server share their snapshots; "" for one process.
+        :param flush_interval: Seconds between snapshot writes.
+        :param stale_after: Seconds after which a snapshot not named by a PID is considered left behind by a dead
+            process (snapshots named by a PID are finished once that process is gone).
+        :param process_id: Name of this process's snapshot file (default: the PID).
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.stale_after = stale_after if stale_after is not None else max(60.0, flush_interval * 6)
+        self.process_id = process_id or str(os.getpid())
+        self._metrics: dict[str, Metric] = {}
+        self._collectors = {}
+        self._task = None
+
+    def _register(self, metric_class, name: str, help: str, labels=(), **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = metric_class(name, help, labels, **kwargs)
+        elif not isinstance(metric, metric_class) or metric.labels != tuple(labels):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind} with labels {metric.labels}")
+        return metric
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels=()) -> Gauge:
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labels, buckets=buckets)
+
+    def collector(self, name: str, collect):
+        """
+        Run `collect()` before every snapshot, to copy in values kept elsewhere. Registering a name again replaces
+        its collector.
+        """
+        self._collectors[name] = collect
+
+    def snapshot(self) -> dict:
+        for name, collect in list(self._collectors.items()):
+            try:
+                collect()
+            except Exception:
+                logger.exception("metrics_collector_failed collector=%s", name)
+        snapshot = {}
+        for metric in self._metrics.values():
+            entry = {"type": metric.kind, "help": metric.help, "labels": list(metric.labels),
+                     "samples": metric.samples()}
+            if isinstance(metric, Histogram):
+                entry["buckets"] = list(metric.buckets)
+            snapshot[metric.name] = entry
+        return snapshot
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    @property
+    def _path(self) -> str:
+        return self._file(self.process_id)
+
+    def _write(self, path: str, snapshot: dict):
+        """Replace a snapshot file atomically."""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".metrics-", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read(path: str) -> dict | None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Removed or replaced by its owner while we read it
+            return None
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive: bool):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _fold(self, snapshots: list[dict]):
+        """
+        Add the counters and histograms of finished processes to the aggregate; the caller holds the exclusive lock.
+        """
+        aggregate = self._read(self._file(AGGREGATE)) or {}
+        merged = _merge([aggregate, *({name: entry for name, entry in snapshot.items() if entry["type"] != "gauge"}
+                                      for snapshot in snapshots)])
+        self._write(self._file(AGGREGATE), {
+            name: {**entry, "samples": [[list(labels), value] for labels, value in entry["samples"].items()]}
+            for name, entry in merged.items()
+        })
+
+    def _finished(self, entry: os.DirEntry, now: float) -> bool:
+        alive = _process_alive(entry.name[:-len(".json")])
+        if alive is not None:
+            return not alive
+        return now - entry.stat().st_mtime > self.stale_after
+
+    def collect_finished(self) -> int:
+        """
+        Fold the snapshots of processes that are gone into the aggregate and remove them.
+        :return: Number of snapshots folded.
+        """
+        if not self.directory or not os.path.isdir(self.directory):
+            return 0
+        now = time.time()
+        try:
+            candidates = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")
+                          and entry.name != f"{AGGREGATE}.json" and entry.path != self._path
+                          and self._finished(entry, now)]
+        except FileNotFoundError:
+            return 0
+        if not candidates:
+            return 0
+        with self._locked(exclusive=True):
+            # Read under the lock: another process may have folded them meanwhile
+            finished = [(entry.path, snapshot) for entry in candidates
+                        if (snapshot := self._read(entry.path)) is not None]
+            if finished:
+                self._fold([snapshot for _, snapshot in finished])
+                for path, _ in finished:
+                    os.unlink(path)
+        return len(finished)
+
+    def flush(self):
+        """Write this process's snapshot for the other workers."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(self._path, self.snapshot())
+
+    def snapshots(self) -> list[dict]:
+        """This process's current snapshot, the aggregate of finished processes, and the latest of every other one."""
+        snapshots = [self.snapshot()]
+        if not self.directory or not os.path.isdir(self.directory):
+            return snapshots
+        self.collect_finished()
+        with self._locked(exclusive=False):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json") and entry.path != self._path:
+                    snapshot = self._read(entry.path)
+                    if snapshot is not None:
+                        snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        """Every metric of every process, merged, in the Prometheus text format."""
+        merged = _merge(self.snapshots())
+
+        lines = []
+        for name, entry in sorted(merged.items()):
+            lines.append(f"# HELP {name} {entry['help']}")
+            lines.append(f"# TYPE {name} {entry['type']}")
+            labels = entry["labels"]
+            for values, value in sorted(entry["samples"].items()):
+                if entry["type"] != "histogram":
+                    lines.append(f"{name}{_label_text(labels, values)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip((*entry["buckets"], float("inf")), value[:-1]):
+                    cumulative += count
+                    le = 'le="' + _number(bound) + '"'
+                    lines.append(f"{name}_bucket{_label_text(labels, values, le)} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(labels, values)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_label_text(labels, values)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except OSError:
+                logger.exception("metrics_flush_failed directory=%s", self.directory)
+
+    def start(self):
+        if self.directory and self._task is None:
+            self.flush()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.directory:
+            # Hand this process's counts over to the aggregate, so the totals don't drop
+            snapshot = self.snapshot()
+            with self._locked(exclusive=True):
+                self._fold([snapshot])
+                try:
+                    os.unlink(self._path)
+                except FileNotFoundError:
+                    pass
+            for metric in self._metrics.values():
+                if not isinstance(metric, Gauge):
+                    metric.clear()
+
+
+def cache_collector(name: str, cache):
+    """A collector copying a cache's stats() into the cache_* metrics."""
+    def collect():
+        stats = cache.stats()
+        cache_hits.set(stats["hits"], name)
+        cache_misses.set(stats["misses"], name)
+        cache_entries.set(stats["size"], name)
+    return collect
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener timing every command into mongo_command_duration_seconds."""
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event):
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name)
+        mongo_command_failures.inc(event.command_name)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, count and in-flight gauge of HTTP requests, by route template (`scope["route"]`
+    is set by the router on the scope shared with the middleware stack).
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(time.perf_counter() - started, scope["method"], path)
+            http_requests.inc(scope["method"], path, str(status))
+
+
+metrics = MetricsRegistry(directory=cfg.METRICS_DIR, flush_interval=cfg.METRICS_FLUSH_SECONDS)
+
+http_requests = metrics.counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+http_request_duration = metrics.histogram("http_request_duration_seconds", "HTTP request latency",
+                                          ("method", "route"))
+http_requests_in_flight = metrics.gauge("http_requests_in_flight", "HTTP requests being handled")
+mongo_command_duration = metrics.histogram("mongo_command_duration_seconds", "MongoDB command execution time",
+                                           ("command",))
+mongo_command_failures = metrics.counter("mongo_command_failures_total", "MongoDB commands that failed",
+                                         ("command",))
+# result: missing, expired, invalid, forbidden or valid (as in adminserver, which also counts revoked)
+token_verifications = metrics.counter("token_verifications_total", "Access token checks by outcome", ("result",))
+cache_hits = metrics.counter("cache_hits_total", "Cache lookups served from the cache", ("cache",))
+cache_misses = metrics.counter("cache_misses_total", "Cache lookups that missed", ("cache",))
+cache_entries = metrics.gauge("cache_entries", "Entries held by the cache", ("cache",))
+mongo_command_metrics = MongoCommandMetrics()
@@ -0,0 +1,48 @@
+"""
+Permission checks against the claims in adminserver-issued access tokens.
+
+Tokens carry permissions either in the full format, `"permissions": {account_id: [permission names]}`, or in the
+compact format, `"pm": {"v": <registry version>, "n": [permission names], "a": {account_id: <bitmask>}}`, where bit
+`i` of a mask is permission `n[i]`. The names list is decoded once per registry version, so a compact check is a dict
+lookup and a bitwise AND.
+"""
+from typing import Dict, Iterable, List
+
+# Bit index per registry version; versions are digests of the names, so an entry never goes stale
+_bit_indexes: Dict[str, Dict[str, int]] = {}
+# Mask of the permissions a check requires, per (registry version, required permissions)
+_required_masks = {}
+_MAX_REGISTRIES = 1024
+
+
+def _bit_index(version: str, names: List[str]) -> Dict[str, int]:
+    index = _bit_indexes.get(version)
+    if index is None:
+        if len(_bit_indexes) >= _MAX_REGISTRIES:
+            _bit_indexes.clear()
+        index = _bit_indexes[version] = {name: 1 << i for i, name in enumerate(names)}
+    return index
+
+
+def has_any_permission(claims: dict, account_id, required: Iterable[str]) -> bool:
+    """Check whether the token grants any of the required permissions on an account, for either claim format."""
+    compact = claims.get("pm")
+    if compact is not None:
+        mask = compact["a"].get(str(account_id), 0)
+        if not mask:
+            return False
+        required = tuple(required)
+        key = (compact["v"], required)
+        required_mask = _required_masks.get(key)
+        if required_mask is None:
+            index = _bit_index(compact["v"], compact["n"])
+            required_mask = 0
+            for permission in required:
+                required_mask |= index.get(permission, 0)
+            if len(_required_masks) >= _MAX_REGISTRIES:
+                _required_masks.clear()
+            _required_masks[key] = required_mask
+        return bool(mask & required_mask)
+    # Expect permissions keyed by account_id string
+    user_perms = (claims.get("permissions") or {}).get(str(account_id)) or []
+    return any(p in user_perms for p in required)
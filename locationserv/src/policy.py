@@ -0,0 +1,176 @@
+"""
+Authorization policy published by adminserver at /auth/.well-known/policy.json.
+
+The document lists the permissions, the permissions of each role, and per-endpoint rules:
+`{"service", "method", "path", "permissions", "attributes"}`, where `path` is the route template (i.e.
+/locations/{location_id}). A rule grants access if the token holds any of its permissions on its account, or every
+permission of a `role:<name>` entry, and its claims match every `attributes` entry. Endpoints without a rule keep the
+permissions named in their `require_permissions` dependency.
+
+This mirrors adminserver's src/services/policy.py: permission names are interned to bits, so a decision is a dict
+lookup and a few bitwise ANDs.
+"""
+import time
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+from src.key_set import JsonSource
+from src.permission_claims import has_any_permission
+
+logger = logging.getLogger("locationserv.policy")
+
+ROLE_PREFIX = "role:"
+_MAX_MEMO = 4096
+
+
+class Rule:
+    """A compiled rule: any permission in `any_mask`, or all of one of `role_masks`, with matching claims."""
+    __slots__ = ("any_mask", "role_masks", "attributes", "open")
+
+    def __init__(self, any_mask: int, role_masks: Tuple[int, ...], attributes: tuple, open: bool):
+        self.any_mask = any_mask
+        self.role_masks = role_masks
+        self.attributes = attributes
+        self.open = open
+
+    def allows(self, mask: int, claims: dict) -> bool:
+        for claim, values in self.attributes:
+            if str(claims.get(claim)) not in values:
+                return False
+        if self.open or mask & self.any_mask:
+            return True
+        for role_mask in self.role_masks:
+            if mask & role_mask == role_mask:
+                return True
+        return False
+
+
+class Policy:
+    """An immutable compiled policy document. Only the rules for `service` are compiled (all of them if None)."""
+    def __init__(self, document: dict, service: Optional[str] = None):
+        self.document = document
+        self.version = document.get("version", "")
+        self.bits = {name: 1 << i for i, name in enumerate(document.get("permissions", []))}
+        self.role_masks = {role: self.mask(names) for role, names in document.get("roles", {}).items()}
+        self.rules = {
+            (rule["method"].upper(), rule["path"]): self.compile(rule.get("permissions", []), rule.get("attributes"))
+            for rule in document.get("rules", [])
+            if service is None or rule.get("service") in (None, service)
+        }
+        self._defaults: Dict[tuple, Rule] = {}
+        self._name_masks: Dict[tuple, int] = {}
+        self._compact_masks: Dict[tuple, int] = {}
+
+    def mask(self, names) -> int:
+        mask = 0
+        for name in names:
+            mask |= self.bits.get(name, 0)
+        return mask
+
+    def compile(self, entries, attributes: Optional[dict] = None) -> Rule:
+        names = [entry for entry in entries if not entry.startswith(ROLE_PREFIX)]
+        # A role that grants nothing can't be held in full; leave it out rather than let it match everyone
+        role_masks = tuple(mask for entry in entries if entry.startswith(ROLE_PREFIX)
+                           if (mask := self.role_masks.get(entry[len(ROLE_PREFIX):], 0)))
+        compiled_attributes = tuple((claim, frozenset(map(str, values))) for claim, values in (attributes or {}).items())
+        return Rule(self.mask(names), role_masks, compiled_attributes, open=not entries)
+
+    def _default_rule(self, required: Tuple[str, ...]) -> Rule:
+        rule = self._defaults.get(required)
+        if rule is None:
+            rule = self._defaults[required] = Rule(self.mask(required), (), (), open=False)
+        return rule
+
+    def user_mask(self, claims: dict, account_id) -> int:
+        """The policy bitmask of the permissions the token grants on an account, for either claim format."""
+        compact = claims.get("pm")
+        if compact is not None:
+            claim_mask = compact["a"].get(str(account_id), 0)
+            key = (compact["v"], claim_mask)
+            mask = self._compact_masks.get(key)
+            if mask is None:
+                names = compact["n"]
+                mask = self.mask(names[i] for i in range(len(names)) if claim_mask >> i & 1)
+                if len(self._compact_masks) >= _MAX_MEMO:
+                    self._compact_masks.clear()
+                self._compact_masks[key] = mask
+            return mask
+        names = (claims.get("permissions") or {}).get(str(account_id)) or ()
+        key = tuple(names)
+        mask = self._name_masks.get(key)
+        if mask is None:
+            if len(self._name_masks) >= _MAX_MEMO:
+                self._name_masks.clear()
+            mask = self._name_masks[key] = self.mask(names)
+        return mask
+
+    def allows(self, claims: dict, account_id, method: str, path: str,
+               default: Optional[Tuple[str, ...]] = None) -> bool:
+        """Decide whether a token may call an endpoint; `default` applies when it has no rule (None: any token)."""
+        rule = self.rules.get(("GET" if method == "HEAD" else method, path))
+        if rule is None:
+            if default is None:
+                return True
+            rule = self._default_rule(default)
+        return rule.allows(self.user_mask(claims, account_id), claims)
+
+
+class PolicyStore:
+    """
+    The current Policy for this service, refreshed from `source` in the background every `refresh_interval` seconds
+    and swapped in with a single assignment. A failed refresh keeps the previous policy; until the first load (or
+    without a source), decisions fall back to the endpoint's own permissions checked directly against the token.
+    """
+    def __init__(self,
+                 source: Optional[JsonSource] = None,
+                 refresh_interval: float = 60,
+                 service: Optional[str] = None):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.service = service
+        self.policy: Optional[Policy] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self, document: dict):
+        self.policy = Policy(document, self.service)
+
+    async def refresh(self) -> bool:
+        if self.source is None:
+            return False
+        started = time.perf_counter()
+        try:
+            document = await self.source()
+            version = document.get("version")
+            # Recompile only when the document changed
+            if not version or self.policy is None or self.policy.version != version:
+                self.load(document)
+        except Exception as exc:
+            logger.warning("policy_refresh_failed error=%s version=%s", exc, self.policy and self.policy.version)
+            return False
+        logger.info("policy_refreshed version=%s rules=%d duration_ms=%.1f",
+                    self.policy.version, len(self.policy.rules), (time.perf_counter() - started) * 1000)
+        return True
+
+    def allows(self, claims: dict, account_id, method: str, path: str,
+               default: Optional[Tuple[str, ...]] = None) -> bool:
+        policy = self.policy
+        if policy is None:
+            return default is None or has_any_permission(claims, account_id, default)
+        return policy.allows(claims, account_id, method, path, default)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self):
+        """Load the policy once, then keep refreshing it in the background."""
+        if self.source is None:
+            return
+        await self.refresh()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
@@ -1,3 +1,4 @@
+import asyncio
 import fastapi
 import datetime
 from typing import Optional, List
@@ -5,6 +6,8 @@ from bson import ObjectId
 from src.models import Location, LocationListResponse
 from src.db import get_db
 from src.token_manager import token_manager
+from src.metrics import metrics, CONTENT_TYPE
+from config import cfg
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +23,15 @@ async def readiness():
     return {"message": "ok"}
 
 
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not cfg.METRICS_ENABLED:
+        raise fastapi.HTTPException(status_code=fastapi.status.HTTP_404_NOT_FOUND)
+    # Reading the other workers' snapshots is file I/O
+    body = await asyncio.to_thread(metrics.render) if metrics.directory else metrics.render()
+    return fastapi.Response(content=body, media_type=CONTENT_TYPE)
+
+
 @router.get("/location", 
             response_model=LocationListResponse, 
             summary="List all locations",
@@ -53,7 +65,6 @@ async def list_locations(
 
 
 @router.post("/location",
-             response_model=LocationListResponse, 
              summary="Add a single location to the database",
              description="Add a new location and returns a unique ID for that location.")
 async def add_location(
@@ -0,0 +1,76 @@
+import time
+import hashlib
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of already-verified JWT payloads, keyed by a SHA-256 digest of the raw token.
+
+    An entry lives no longer than the token's own `exp` claim, so a cached payload is never returned once the token
+    has expired; tokens without an `exp` are never cached.
+    """
+    def __init__(self, max_size: int = 10000, enabled: bool = True):
+        self.max_size = max_size
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> dict | None:
+        """
+        Get the verified payload for a token.
+        :param token: The raw JWT.
+        :return: A copy of the payload, or None if not cached or expired.
+        """
+        if not self.enabled:
+            return None
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, payload = entry
+            if expires > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(payload)
+            del self._entries[key]
+            self.expired += 1
+        self.misses += 1
+        return None
+
+    def put(self, token: str, payload: dict):
+        """
+        Store the payload of a token that has just passed full signature verification.
+        :param token: The raw JWT.
+        :param payload: The decoded, verified payload.
+        """
+        expires = payload.get("exp")
+        if not self.enabled or self.max_size <= 0 or not isinstance(expires, (int, float)):
+            return
+        key = self.digest(token)
+        self._entries[key] = (expires, dict(payload))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
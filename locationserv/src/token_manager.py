@@ -1,25 +1,56 @@
 import jwt
-import pathlib
 import logging
 from fastapi import Request, HTTPException, status, Depends
 from typing import Optional
 from config import cfg
+from src.token_cache import VerifiedTokenCache
+from src.key_set import KeySet, http_json_source, file_json_source
+from src.policy import PolicyStore
+from src.metrics import token_verifications
 
 logger = logging.getLogger("locationserv.auth")
 
 
 class TokenManager:
-    def __init__(self, public_key: str, key_algorithm: str = "RS256"):
+    def __init__(self,
+                 public_key: Optional[str],
+                 key_algorithm: str = "RS256",
+                 token_cache: Optional[VerifiedTokenCache] = None,
+                 key_set: Optional[KeySet] = None,
+                 policy_store: Optional[PolicyStore] = None):
         self.public_key = public_key
         self.key_algorithm = key_algorithm
+        # Parse the PEM once rather than on every jwt.decode
+        algorithm = jwt.algorithms.get_default_algorithms()[key_algorithm]
+        self._verifying_key = algorithm.prepare_key(public_key) if public_key else None
+        self.token_cache = token_cache if token_cache is not None else VerifiedTokenCache(enabled=False)
+        self.key_set = key_set if key_set is not None else KeySet(algorithm=key_algorithm)
+        self.policy_store = policy_store if policy_store is not None else PolicyStore()
+
+    def _verifying_key_for(self, token: str):
+        """Pick the key named by the token's `kid` from the JWKS key set, else the static PEM key."""
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid:
+            key = self.key_set.get(kid)
+            if key is not None:
+                return key
+            self.key_set.request_refresh()
+        if self._verifying_key is None:
+            raise jwt.InvalidKeyError(f"Unknown signing key {kid!r}")
+        return self._verifying_key
 
     def verify_token(self, token: str) -> dict:
+        payload = self.token_cache.get(token)
+        if payload is not None:
+            return payload
         kwargs = {}
         if getattr(cfg, "TOKEN_AUDIENCE", ""):
             kwargs["audience"] = cfg.TOKEN_AUDIENCE
         if getattr(cfg, "TOKEN_ISSUER", ""):
             kwargs["issuer"] = cfg.TOKEN_ISSUER
-        return jwt.decode(token, self.public_key, algorithms=[self.key_algorithm], **kwargs)
+        payload = jwt.decode(token, self._verifying_key_for(token), algorithms=[self.key_algorithm], **kwargs)
+        self.token_cache.put(token, payload)
+        return payload
 
     async def _get_token_from_request(self, request: Request) -> Optional[str]:
         auth_header = request.headers.get("Authorization", "")
@@ -34,45 +65,75 @@ class TokenManager:
         token = await self._get_token_from_request(request)
         if not token:
             logger.debug("auth_missing_token path=%s", request.url.path)
+            token_verifications.inc("missing")
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
         try:
             payload = self.verify_token(token)
         except jwt.ExpiredSignatureError:
             logger.info("auth_expired path=%s", request.url.path)
+            token_verifications.inc("expired")
             raise HTTPException(status_code=401, detail="Invalid or expired token")
         except jwt.InvalidAudienceError:
             logger.info("auth_invalid_audience path=%s token_aud_claim", request.url.path)
+            token_verifications.inc("invalid")
             raise HTTPException(status_code=401, detail="Invalid audience")
         except jwt.InvalidIssuerError:
             logger.info("auth_invalid_issuer path=%s", request.url.path)
+            token_verifications.inc("invalid")
             raise HTTPException(status_code=401, detail="Invalid issuer")
         except jwt.ImmatureSignatureError:
             logger.info("auth_immature_token path=%s", request.url.path)
+            token_verifications.inc("invalid")
             raise HTTPException(status_code=401, detail="Token not yet valid")
         except jwt.DecodeError:
             logger.info("auth_decode_error path=%s", request.url.path)
+            token_verifications.inc("invalid")
             raise HTTPException(status_code=401, detail="Invalid or expired token")
         except jwt.PyJWTError as exc:
             logger.info("auth_other_jwt_error=%s path=%s", type(exc).__name__, request.url.path)
+            token_verifications.inc("invalid")
             raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+        if not self.authorized(request, payload):
+            logger.info("auth_policy_denied path=%s", request.url.path)
+            token_verifications.inc("forbidden")
+            raise HTTPException(status_code=403, detail="Forbidden - missing permissions")
+        token_verifications.inc("valid")
         request.state.user = payload
         return payload
 
+    def authorized(self, request: Request, user: dict, required_permissions: Optional[tuple] = None) -> bool:
+        """
+        Check the token against the policy rule for the matched route, or against `required_permissions` when the
+        route has no rule (None allows any valid token).
+        """
+        route = request.scope.get("route")
+        path = route.path if route is not None else request.url.path
+        return self.policy_store.allows(user, user.get("account_id"), request.method, path, required_permissions)
+
     def require_permissions(self, *required_permissions: str):
         async def dependency(request: Request, user: dict = Depends(self.jwt_required)):
-            account_id = user.get("account_id")
-            permissions_map = user.get("permissions") or {}
-            # Expect permissions keyed by account_id string
-            user_perms = permissions_map.get(str(account_id), [])
-            if not any(p in user_perms for p in required_permissions):
+            if not self.authorized(request, user, required_permissions):
                 # 403: authenticated but insufficient rights
                 raise HTTPException(status_code=403, detail="Forbidden - missing permissions")
             return user
         return dependency
 
 
+def _json_source(url: str, path: str, token: str = ""):
+    if url:
+        return http_json_source(url, token=token or None)
+    if path:
+        return file_json_source(path)
+    return None
+
+
 token_manager = TokenManager(
-    public_key=cfg.PUBLIC_KEY if cfg.PUBLIC_KEY else pathlib.Path(cfg.PUBLIC_KEY_PATH).read_text(),
-    key_algorithm=cfg.ENCRYPT_ALGORITHM
+    public_key=cfg.PUBLIC_KEY or None,
+    key_algorithm=cfg.ENCRYPT_ALGORITHM,
+    token_cache=VerifiedTokenCache(max_size=cfg.TOKEN_CACHE_SIZE, enabled=cfg.TOKEN_CACHE_ENABLED),
+    key_set=KeySet(_json_source(cfg.JWKS_URL, cfg.JWKS_PATH),
+                   refresh_interval=cfg.JWKS_REFRESH_SECONDS, algorithm=cfg.ENCRYPT_ALGORITHM),
+    policy_store=PolicyStore(_json_source(cfg.POLICY_URL, cfg.POLICY_PATH, cfg.POLICY_TOKEN),
+                             refresh_interval=cfg.POLICY_REFRESH_SECONDS, service=cfg.APP_NAME)
 )
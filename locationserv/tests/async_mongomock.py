@@ -27,6 +27,9 @@ class AsyncCollection:
     async def insert_one(self, doc):
         return self._sync_collection.insert_one(doc)
 
+    async def insert_many(self, docs, *args, **kwargs):
+        return self._sync_collection.insert_many(docs, *args, **kwargs)
+
     async def update_one(self, *args, **kwargs):
         return self._sync_collection.update_one(*args, **kwargs)
 
@@ -39,6 +42,9 @@ class AsyncCollection:
     async def create_index(self, *args, **kwargs):
         return self._sync_collection.create_index(*args, **kwargs)
 
+    async def drop(self):
+        return self._sync_collection.drop()
+
 class AsyncDatabase:
     def __init__(self, sync_db):
         self._sync_db = sync_db
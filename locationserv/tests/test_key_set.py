@@ -0,0 +1,113 @@
+import json
+import time
+import asyncio
+import threading
+import http.server
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from src.key_set import KeySet, http_json_source
+from src.token_manager import TokenManager
+
+
+def make_jwk(private_key, kid):
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return {**jwk, "kid": kid, "use": "sig", "alg": "RS256"}
+
+
+def make_token(private_key, kid):
+    payload = {"sub": "user-1", "account_id": "acct-1", "exp": int(time.time()) + 60}
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+class FakeSource:
+    def __init__(self, *keys):
+        self.jwks = {"keys": list(keys)}
+        self.fail = False
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise OSError("adminserver unreachable")
+        return self.jwks
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return [rsa.generate_private_key(public_exponent=65537, key_size=2048) for _ in range(2)]
+
+
+def test_verify_with_key_from_key_set(keys):
+    source = FakeSource(make_jwk(keys[0], "k1"))
+    key_set = KeySet(source)
+    manager = TokenManager(None, key_set=key_set)
+    asyncio.run(key_set.refresh())
+    assert manager.verify_token(make_token(keys[0], "k1"))["sub"] == "user-1"
+
+
+def test_rotation_picks_up_new_kid(keys):
+    source = FakeSource(make_jwk(keys[0], "k1"))
+    key_set = KeySet(source, min_refresh_interval=0)
+    manager = TokenManager(None, key_set=key_set)
+    rotated = make_token(keys[1], "k2")
+
+    async def run():
+        await key_set.refresh()
+        source.jwks["keys"].append(make_jwk(keys[1], "k2"))
+        with pytest.raises(jwt.InvalidKeyError):
+            manager.verify_token(rotated)
+        # The unknown kid triggered a background refresh
+        await key_set._pending
+        return manager.verify_token(rotated)
+
+    assert asyncio.run(run())["sub"] == "user-1"
+    assert source.calls == 2
+
+
+def test_failed_refresh_keeps_keys(keys):
+    source = FakeSource(make_jwk(keys[0], "k1"))
+    key_set = KeySet(source)
+    asyncio.run(key_set.refresh())
+    source.fail = True
+    assert asyncio.run(key_set.refresh()) is False
+    assert key_set.get("k1") is not None
+
+
+def test_unknown_kid_falls_back_to_static_key(keys):
+    from cryptography.hazmat.primitives import serialization
+    public_pem = keys[0].public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    manager = TokenManager(public_pem)
+    assert manager.verify_token(make_token(keys[0], "not-in-jwks"))["sub"] == "user-1"
+    with pytest.raises(jwt.InvalidSignatureError):
+        manager.verify_token(make_token(keys[1], "not-in-jwks"))
+
+
+def test_http_source_sends_token():
+    seen = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append(self.headers.get("Authorization"))
+            body = json.dumps({"version": "v1"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/auth/.well-known/policy.json"
+        assert asyncio.run(http_json_source(url, token="policy-secret")()) == {"version": "v1"}
+        asyncio.run(http_json_source(url)())
+    finally:
+        server.shutdown()
+    assert seen == ["Bearer policy-secret", None]
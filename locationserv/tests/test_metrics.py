@@ -0,0 +1,50 @@
+import types
+import asyncio
+import pytest
+from src.metrics import MetricsRegistry, mongo_command_metrics, metrics
+
+
+@pytest.mark.anyio
+async def test_metrics_endpoint(async_client):
+    await async_client.get("/liveness")
+    await async_client.get("/location")
+    await async_client.get("/no-such-route")
+    response = await async_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/liveness",status="200"}' in body
+    assert 'http_requests_total{method="GET",route="/location",status="401"}' in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/liveness",le="+Inf"}' in body
+    assert 'token_verifications_total{result="missing"}' in body
+    assert 'cache_hits_total{cache="token"}' in body
+
+
+def test_mongo_command_timings():
+    mongo_command_metrics.succeeded(types.SimpleNamespace(command_name="find", duration_micros=1500))
+    mongo_command_metrics.failed(types.SimpleNamespace(command_name="insert", duration_micros=20000))
+    lines = metrics.render().splitlines()
+    assert any(line.startswith('mongo_command_duration_seconds_count{command="find"}') for line in lines)
+    assert any(line.startswith('mongo_command_failures_total{command="insert"}') for line in lines)
+
+
+def test_workers_are_merged(tmp_path):
+    registries = [MetricsRegistry(directory=str(tmp_path), process_id=name) for name in ("first", "second")]
+    for registry in registries:
+        registry.counter("requests_total", "Requests", ("route",)).inc("/location")
+    registries[1].flush()
+    assert 'requests_total{route="/location"} 2' in registries[0].render().splitlines()
+
+
+def test_stopped_worker_keeps_its_totals(tmp_path):
+    first, second = (MetricsRegistry(directory=str(tmp_path), process_id=name) for name in ("first", "second"))
+    second.counter("requests_total", "Requests", ("route",)).inc("/location", amount=2)
+    second.gauge("in_flight", "In flight").inc()
+    first.counter("requests_total", "Requests", ("route",)).inc("/location")
+    second.flush()
+    asyncio.run(second.stop())
+    lines = first.render().splitlines()
+    assert not (tmp_path / "second.json").exists()
+    assert 'requests_total{route="/location"} 3' in lines
+    assert not any(line.startswith("in_flight ") for line in lines)
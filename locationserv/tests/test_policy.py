@@ -0,0 +1,86 @@
+import time
+import asyncio
+import jwt
+import fastapi
+import pytest
+from fastapi.testclient import TestClient
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from src.policy import Policy, PolicyStore
+from src.token_manager import TokenManager
+
+DOCUMENT = {
+    "version": "v1",
+    "permissions": ["account.read", "account.write", "location.read"],
+    "roles": {"editor": ["account.read", "account.write"]},
+    "rules": [
+        {"service": "locationserv", "method": "GET", "path": "/location/{location_id}", "permissions": ["location.read"]},
+        {"service": "locationserv", "method": "DELETE", "path": "/location/{location_id}", "permissions": ["role:editor"],
+         "attributes": {"type": ["user"]}},
+        {"service": "adminserver", "method": "GET", "path": "/api/v1/account", "permissions": ["account.read"]},
+    ],
+}
+
+
+class FakeSource:
+    def __init__(self, document):
+        self.document = document
+        self.fail = False
+
+    async def __call__(self):
+        if self.fail:
+            raise OSError("adminserver unreachable")
+        return self.document
+
+
+def test_policy_decisions():
+    policy = Policy(DOCUMENT, "locationserv")
+    compact = {"pm": {"v": "r1", "n": ["account.read", "account.write", "location.read"], "a": {"acct-1": 3, "acct-2": 4}},
+               "type": "user"}
+    assert ("GET", "/api/v1/account") not in policy.rules
+    assert policy.allows(compact, "acct-2", "GET", "/location/{location_id}")
+    assert not policy.allows(compact, "acct-1", "GET", "/location/{location_id}")
+    assert policy.allows(compact, "acct-1", "DELETE", "/location/{location_id}")
+    assert not policy.allows({**compact, "type": "service"}, "acct-1", "DELETE", "/location/{location_id}")
+    full = {"permissions": {"acct-1": ["account.read"]}, "type": "user"}
+    assert not policy.allows(full, "acct-1", "DELETE", "/location/{location_id}")
+    # Endpoints without a rule keep their own permissions
+    assert policy.allows(full, "acct-1", "GET", "/location", ("account.read",))
+    assert not policy.allows(full, "acct-1", "POST", "/location", ("account.write",))
+
+
+def test_store_refresh_keeps_policy_on_failure():
+    source = FakeSource(DOCUMENT)
+    store = PolicyStore(source, service="locationserv")
+    claims = {"permissions": {"acct-1": ["account.read"]}}
+    # Before the first load the endpoint's own permissions apply
+    assert store.allows(claims, "acct-1", "GET", "/location/{location_id}", ("account.read",))
+    assert asyncio.run(store.refresh())
+    assert not store.allows(claims, "acct-1", "GET", "/location/{location_id}", ("account.read",))
+    source.fail = True
+    assert not asyncio.run(store.refresh())
+    assert store.policy.version == "v1"
+
+
+def test_require_permissions_uses_route_template():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    store = PolicyStore(service="locationserv")
+    store.load(DOCUMENT)
+    manager = TokenManager(public_pem, policy_store=store)
+
+    app = fastapi.FastAPI()
+
+    @app.get("/location/{location_id}")
+    async def get_location(location_id: str, user: dict = fastapi.Depends(manager.require_permissions("account.read"))):
+        return {"id": location_id}
+
+    def get(permissions):
+        token = jwt.encode({"sub": "user-1", "account_id": "acct-1", "exp": int(time.time()) + 60,
+                            "permissions": {"acct-1": permissions}}, private_key, algorithm="RS256")
+        return TestClient(app).get("/location/abc", headers={"Authorization": f"Bearer {token}"}).status_code
+
+    assert get(["location.read"]) == 200
+    assert get(["account.read"]) == 403
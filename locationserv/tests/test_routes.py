@@ -1,4 +1,9 @@
+import time
+import jwt
 import pytest
+from bson import ObjectId
+from cryptography.hazmat.primitives.asymmetric import rsa
+from src.token_manager import token_manager
 
 @pytest.mark.anyio
 async def test_liveness(async_client):
@@ -19,4 +24,34 @@ async def test_list_locations_open(async_client):
     """Test the /locations endpoint (open)."""
     response = await async_client.get("/locations")
     assert response.status_code == 200
-    assert "data" in response.json()
\ No newline at end of file
+    assert "data" in response.json()
+
+@pytest.mark.anyio
+async def test_add_location(async_client, monkeypatch):
+    """Test POST /location with a valid token: the stored location is returned."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    monkeypatch.setattr(token_manager, "_verifying_key", private_key.public_key())
+    payload = {"sub": "user-1", "account_id": "acct-1", "permissions": {"acct-1": ["account.write"]},
+               "type": "access", "exp": int(time.time()) + 60}
+    headers = {"Authorization": f"Bearer {jwt.encode(payload, private_key, algorithm='RS256')}"}
+    body = {
+        "_name": "warehouse-1", "account_id": "acct-1", "created_by": "someone-else", "display_name": "Warehouse",
+        "geo_point": {"type": "Point", "coordinates": [-122.3321, 47.6062]},
+        "address": {"countryRegion": {"name": "United States"}, "addressLine": "1 Main St", "adminDistricts": None,
+                    "formattedAddress": "1 Main St, Seattle, WA, United States", "locality": "Seattle",
+                    "postalCode": "98101", "streetName": "Main St", "streetNumber": "1"},
+    }
+    response = await async_client.post("/location", json=body, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["message"] == "OK"
+    inserted = data["inserted_data"]
+    assert ObjectId.is_valid(inserted["id"])
+    assert inserted["name"] == "warehouse-1" and inserted["account_id"] == "acct-1"
+    # The creator is always the caller
+    assert inserted["created_by"] == inserted["modified_by"] == "user-1"
+    assert inserted["geo_point"] == body["geo_point"] and inserted["address"]["locality"] == "Seattle"
+
+    # Another account's location is refused
+    response = await async_client.post("/location", json={**body, "account_id": "acct-2"}, headers=headers)
+    assert response.status_code == 403
@@ -0,0 +1,56 @@
+import time
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from src.token_manager import TokenManager
+from src.token_cache import VerifiedTokenCache
+
+
+@pytest.fixture(scope="module")
+def key_pair():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private_key, public_pem
+
+
+def make_token(private_key, **claims):
+    payload = {"sub": "user-1", "account_id": "acct-1", "exp": int(time.time()) + 60, **claims}
+    return jwt.encode(payload, private_key, algorithm="RS256")
+
+
+def test_verify_token_cached(key_pair):
+    private_key, public_pem = key_pair
+    manager = TokenManager(public_pem, token_cache=VerifiedTokenCache(max_size=10))
+    token = make_token(private_key)
+    assert manager.verify_token(token)["sub"] == "user-1"
+    assert manager.verify_token(token)["sub"] == "user-1"
+    assert manager.token_cache.stats()["hits"] == 1
+
+
+def test_verify_token_rejects_bad_signature_even_when_cache_enabled(key_pair):
+    private_key, public_pem = key_pair
+    manager = TokenManager(public_pem, token_cache=VerifiedTokenCache(max_size=10))
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with pytest.raises(jwt.InvalidSignatureError):
+        manager.verify_token(make_token(other_key))
+    assert manager.token_cache.stats()["size"] == 0
+
+
+def test_expired_token_not_served_from_cache(key_pair):
+    private_key, public_pem = key_pair
+    manager = TokenManager(public_pem, token_cache=VerifiedTokenCache(max_size=10))
+    token = make_token(private_key)
+    manager.token_cache.put(token, {"sub": "user-1", "exp": time.time() - 1})
+    assert manager.token_cache.get(token) is None
+
+
+def test_compact_permission_claims():
+    from src.permission_claims import has_any_permission
+    claims = {"pm": {"v": "abc123", "n": ["account.read", "account.write"], "a": {"acct-1": 1, "acct-2": 3}}}
+    assert has_any_permission(claims, "acct-1", ["account.read"])
+    assert not has_any_permission(claims, "acct-1", ["account.write"])
+    assert has_any_permission(claims, "acct-2", ["account.write"])
+    assert not has_any_permission(claims, "acct-3", ["account.read"])